@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Duplicates.py : Detecció de duplicats exactes pel contingut dels arxius.
+
+ImageID deriva l'UUID del path, de manera que un mateix PNG copiat a dues
+carpetes acaba amb dos UUID. Aquí es busquen els arxius amb contingut
+idèntic en dos passos:
+
+    1. Prefiltre sense llegir res: només poden ser iguals els arxius de la
+       mateixa mida (la que ja ha recollit l'escaneig d'ImageFiles).
+    2. Només els candidats d'un mateix grup de mida es llegeixen, a blocs
+       grans, i se'n calcula un hash BLAKE2b de 128 bits.
+
+Amb idat_only=True el hash es fa només sobre els chunks IHDR i IDAT (la
+capçalera i els píxels comprimits), de manera que dos PNG que només es
+diferencien en les metadades (chunks de text) també compten com a
+duplicats. En aquest cas la mida de l'arxiu no serveix de prefiltre i es fa
+servir la mida total dels IDAT, que es llegeix recorrent les capçaleres
+dels chunks (sense llegir-ne les dades).
+
+find_duplicates()
+    Versió en lot, sobre el resultat d'un escaneig (ImageFiles.duplicates()).
+
+Deduplicator
+    Versió incremental per a Ingest.ingest_stream(): decideix per a cada
+    arxiu nou si és còpia d'un de ja vist.
+"""
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cfg
+from MetadataCache import signature
+
+# Mida dels blocs de lectura
+_MIDA_BLOC = 1 << 20
+_BYTES_HASH = 16
+_CHUNKS_IDAT = (b"IHDR", b"IDAT")
+
+
+def content_hash(abs_path: str, idat_only: bool = False) -> Optional[bytes]:
+    """
+    Hash BLAKE2b (16 bytes) del contingut de l'arxiu, o només dels seus
+    chunks IHDR + IDAT si `idat_only`. None si no es pot llegir (o, amb
+    idat_only, si no és un PNG).
+    """
+    h = hashlib.blake2b(digest_size=_BYTES_HASH)
+    try:
+        if idat_only:
+            with open(abs_path, "rb", buffering=_MIDA_BLOC) as f:
+                if f.read(8) != cfg._PNG_SIGNATURE:
+                    return None
+                for tipus, dades in cfg._iter_png_chunks(f, wanted=_CHUNKS_IDAT):
+                    h.update(tipus)
+                    h.update(dades)
+        else:
+            buf = bytearray(_MIDA_BLOC)
+            vista = memoryview(buf)
+            with open(abs_path, "rb", buffering=0) as f:
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    h.update(vista[:n])
+    except OSError:
+        return None
+    return h.digest()
+
+
+def idat_size(abs_path: str) -> Optional[int]:
+    """Suma de les mides dels chunks IDAT d'un PNG (només en llegeix les capçaleres)."""
+    total = 0
+    try:
+        with open(abs_path, "rb") as f:
+            if f.read(8) != cfg._PNG_SIGNATURE:
+                return None
+            while True:
+                cap = f.read(8)
+                if len(cap) < 8:
+                    break
+                mida = int.from_bytes(cap[:4], "big")
+                if cap[4:8] == b"IDAT":
+                    total += mida
+                elif cap[4:8] == b"IEND":
+                    break
+                f.seek(mida + 4, os.SEEK_CUR)
+    except OSError:
+        return None
+    return total
+
+
+def _tipus(idat_only: bool) -> str:
+    return "blake2b-idat" if idat_only else "blake2b"
+
+
+def _hash_cache(abs_path: str, idat_only: bool, cache, sig: Optional[Tuple[int, int]]) -> Optional[bytes]:
+    if cache is None:
+        return content_hash(abs_path, idat_only)
+    valor = cache.get_hash(abs_path, sig, _tipus(idat_only))
+    if valor is None:
+        valor = content_hash(abs_path, idat_only)
+        if valor is not None:
+            cache.put_hash(abs_path, sig, _tipus(idat_only), valor)
+    return valor
+
+
+def _map(fn, items: List, workers: Optional[int]) -> List:
+    """map() en un pool de fils (hashlib i la lectura alliberen el GIL)."""
+    if workers is None:
+        workers = min(8, os.cpu_count() or 1)
+    if workers <= 1 or len(items) < 2:
+        return list(map(fn, items))
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
+def find_duplicates(stats: Dict[str, Tuple[int, int]], idat_only: bool = False,
+                    workers: Optional[int] = None, cache=None) -> List[List[str]]:
+    """
+    Grups d'arxius amb el mateix contingut a partir de `stats`
+    (path absolut -> (size, mtime_ns), com ImageFiles.file_stat()).
+    Cada grup té 2 o més paths en l'ordre de `stats`; els grups van ordenats
+    pel seu primer path. Amb `cache` (MetadataCache) els hashos d'arxius que
+    no han canviat no es tornen a calcular.
+    """
+    paths = list(stats)
+    ordre = {p: i for i, p in enumerate(paths)}
+    if idat_only:
+        claus = _map(idat_size, paths, workers)
+    else:
+        claus = [stats[p][0] for p in paths]
+
+    per_clau: Dict[int, List[str]] = {}
+    for p, clau in zip(paths, claus):
+        if clau:
+            per_clau.setdefault(clau, []).append(p)
+    candidats = [(clau, p) for clau, grup in per_clau.items() if len(grup) > 1 for p in grup]
+
+    hashos = _map(lambda c: _hash_cache(c[1], idat_only, cache, stats[c[1]]), candidats, workers)
+    if cache is not None:
+        cache.flush()
+
+    grups: Dict[Tuple[int, bytes], List[str]] = {}
+    for (clau, p), valor in zip(candidats, hashos):
+        if valor is not None:
+            grups.setdefault((clau, valor), []).append(p)
+    res = [sorted(g, key=ordre.__getitem__) for g in grups.values() if len(g) > 1]
+    res.sort(key=lambda g: ordre[g[0]])
+    return res
+
+
+class Deduplicator:
+    """
+    Estat de la detecció incremental. Per a cada arxiu nou:
+
+        prepare()  calcula la clau de prefiltre i, si ja s'ha vist un altre
+                   arxiu amb la mateixa clau, el hash (el seu i el del primer,
+                   una sola vegada). Es pot cridar des de diversos fils.
+        resolve()  decideix si és duplicat només amb consultes a diccionaris;
+                   s'ha de cridar des d'un sol fil, en l'ordre dels arxius.
+
+    check() fa les dues coses seguides.
+    """
+
+    def __init__(self, idat_only: bool = False, cache=None):
+        self.idat_only = idat_only
+        self.cache = cache
+        # clau de prefiltre -> primer path preparat amb aquesta clau
+        self._primers: Dict[int, str] = {}
+        # path -> hash ja calculat (només dels arxius amb clau repetida)
+        self._calculats: Dict[str, Optional[bytes]] = {}
+        # clau de prefiltre -> paths conservats amb aquesta clau
+        self._per_clau: Dict[int, List[str]] = {}
+        self._hashos: Dict[str, Optional[bytes]] = {}
+        self._originals: Dict[Tuple[int, bytes], str] = {}
+        # path conservat -> duplicats que s'hi han col·lapsat
+        self.collapsed: Dict[str, List[str]] = {}
+
+    def _hash(self, path: str, sig: Optional[Tuple[int, int]] = None) -> Optional[bytes]:
+        try:
+            return self._calculats[path]
+        except KeyError:
+            pass
+        valor = _hash_cache(path, self.idat_only, self.cache, sig if sig is not None else signature(path))
+        self._calculats[path] = valor
+        return valor
+
+    def prepare(self, abs_path: str, sig: Optional[Tuple[int, int]] = None
+                ) -> Tuple[Optional[int], Optional[bytes]]:
+        """
+        (clau de prefiltre, hash o None) de l'arxiu, per passar a resolve().
+        `sig` és (size, mtime_ns) si ja es coneix, com a ImageFiles.file_stat().
+        """
+        if sig is None:
+            sig = signature(abs_path)
+            if sig is None:
+                return None, None
+        clau = idat_size(abs_path) if self.idat_only else sig[0]
+        if not clau:
+            return None, None
+        # setdefault és atòmic: només un fil queda com a primer de la clau
+        primer = self._primers.setdefault(clau, abs_path)
+        if primer == abs_path:
+            return clau, None
+        self._hash(primer)
+        return clau, self._hash(abs_path, sig)
+
+    def resolve(self, abs_path: str, clau: Optional[int], valor: Optional[bytes]) -> Optional[str]:
+        """
+        Retorna el path ja vist amb el mateix contingut que `abs_path` (i
+        l'apunta com a duplicat), o None si és el primer (i el recorda).
+        `clau` i `valor` són el resultat de prepare().
+        """
+        if not clau:
+            return None
+        vistos = self._per_clau.get(clau)
+        if vistos is None:
+            self._per_clau[clau] = [abs_path]
+            if valor is not None:
+                self._recordar(clau, abs_path, valor)
+            return None
+        for p in vistos:
+            if p not in self._hashos:
+                self._recordar(clau, p, self._hash(p))
+        if valor is None:
+            # preparat com a primer però resolt després d'un altre de la clau
+            valor = self._hash(abs_path)
+        original = self._originals.get((clau, valor)) if valor is not None else None
+        if original is not None:
+            self._calculats.pop(abs_path, None)
+            self.collapsed.setdefault(original, []).append(abs_path)
+            return original
+        vistos.append(abs_path)
+        self._recordar(clau, abs_path, valor)
+        return None
+
+    def check(self, abs_path: str, sig: Optional[Tuple[int, int]] = None) -> Optional[str]:
+        """prepare() + resolve() d'un sol arxiu."""
+        return self.resolve(abs_path, *self.prepare(abs_path, sig))
+
+    def _recordar(self, clau: int, path: str, valor: Optional[bytes]) -> None:
+        self._hashos[path] = valor
+        if valor is not None:
+            self._originals.setdefault((clau, valor), path)
+
+    def duplicates(self) -> List[List[str]]:
+        """Grups [conservat, duplicat, ...] en l'ordre en què s'han vist."""
+        return [[original] + dups for original, dups in self.collapsed.items()]
+
+    def __len__(self) -> int:
+        return sum(len(d) for d in self.collapsed.values())
+
+    def __str__(self) -> str:
+        return f"<Deduplicator: {len(self)} duplicats col·lapsats en {len(self.collapsed)} grups>"
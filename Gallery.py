@@ -8,6 +8,7 @@ Funcionalitat:
     - Llegir galeries des d'arxius JSON
     - Visualitzar totes les imatges d'una galeria
     - Afegir i eliminar imatges de la galeria
+    - Desar galeries en JSON o en un format binari compacte (".galb")
 
 Format JSON d'una galeria:
 {
@@ -27,6 +28,9 @@ Mètodes a implementar:
         Ha de validar que cada imatge referenciada existeix a la col·lecció.
         Si una imatge no existeix, l'ignora i continua processant.
         Emmagatzema internament els UUID de les imatges vàlides.
+        L'array "images" es llegeix de manera incremental i es resol per
+        lots (ImageID.resolve_many); les entrades no trobades queden a
+        l'atribut `unresolved` i se'n mostra un resum.
 
     - show() -> None
         Visualitza totes les imatges de la galeria en ordre utilitzant
@@ -41,127 +45,676 @@ Mètodes a implementar:
     - remove_last_image() -> None
         Elimina l'última imatge de la galeria.
 
+    - insert_at(pos: int, uuid: str) / remove_at(pos: int)
+        Insereix / elimina una imatge en una posició qualsevol.
+
+    - index_of(uuid: str) -> int / contains(uuid: str) -> bool
+        Primera posició de l'UUID (-1 si no hi és) i pertinença, en O(1).
+
+    - save_file(file: str, binary: bool = None) -> None
+        Desa la galeria en JSON (paths via ImageID.get_path) o en format
+        binari (per defecte, segons l'extensió: ".galb" és binari).
+
+    - close() -> None
+        Allibera l'arxiu binari carregat (també en sortir d'un bloc with).
+
+Format binari (".galb", little-endian):
+    magic b"DSGALB01" | len(nom) u32 | len(descripció) u32 | len(data) u32 |
+    nombre d'imatges u64 | nom, descripció, data en UTF-8 |
+    UUID empaquetats, 16 bytes cadascun
+
+    load_file() reconeix el format pel magic. L'arxiu es mapeja amb mmap i
+    els UUID es descodifiquen a mesura que es recorren; la galeria només es
+    converteix a l'estructura en memòria quan es modifica. Fins llavors
+    l'arxiu queda obert; close() (o desar-hi a sobre) en copia els UUID a
+    memòria i el tanca. Els UUID d'un
+    arxiu binari no es validen contra la col·lecció (es desen ja resolts).
+
 Notes:
     - Utilitzeu la llibreria json per llegir els arxius
     - Els paths dins el JSON són relatius a ROOT_DIR
     - Cada galeria és un objecte independent (instància de Gallery)
     - Podeu tenir múltiples galeries actives simultàniament
-    - Les operacions d'afegir/eliminar són ràpides (no busquen a la llista)
+    - Les operacions d'afegir/eliminar són ràpides (no busquen a la llista):
+      la seqüència és un deque (O(1) pels dos extrems) i un índex
+      uuid -> posicions permet index_of()/contains() sense recórrer-la.
+      Inserir o eliminar pel mig és O(n), com en una llista.
+    - images_uuid_list ja no és la llista interna sinó una tupla (només
+      lectura): images_uuid_list.append(u) falla en lloc de no fer res.
+      Es pot continuar assignant-hi una seqüència sencera.
 """
 
 import json
+import mmap
+import os
+import re
+import struct
 import cfg
-from typing import List, Optional
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
 from ImageID import ImageID
 from ImageViewer import ImageViewer
 
+_CAPCALERA = ("gallery_name", "description", "created_date")
+_IMATGE = None          # clau amb què _LectorJSON.camps() dona cada entrada d'"images"
+_MIDA_LOT = 4096        # entrades que es resolen de cop amb ImageID.resolve_many()
+_PREFETCH = 8           # miniatures que show() demana per endavant
+_ESPAIS = re.compile(r"[ \t\n\r]*")
+_NUMERO = re.compile(r"[-+0-9.eE]*")
+
+
+class _LectorJSON:
+    """
+    Lector incremental del JSON d'una galeria. Els camps de primer nivell es
+    donen com a parells (clau, valor), excepte l'array "images", que es
+    recorre element a element i es dona com a (_IMATGE, entrada) sense
+    carregar-lo sencer a memòria. Els errors de format llencen
+    json.JSONDecodeError, com json.load().
+    """
+
+    def __init__(self, fh, mida_bloc: int = 1 << 16):
+        self._fh = fh
+        self._mida = mida_bloc
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _llegir_mes(self, mida: int = 0) -> bool:
+        if self._eof:
+            return False
+        bloc = self._fh.read(mida or self._mida)
+        if not bloc:
+            self._eof = True
+            return False
+        # descartem el que ja s'ha consumit
+        self._buf = self._buf[self._pos:] + bloc
+        self._pos = 0
+        return True
+
+    def _error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self._buf, self._pos)
+
+    def _seguent(self) -> str:
+        """Salta espais i retorna el següent caràcter (sense consumir-lo), o ''."""
+        while True:
+            self._pos = _ESPAIS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._llegir_mes():
+                return ""
+
+    def _esperar(self, c: str) -> None:
+        if self._seguent() != c:
+            raise self._error(f"s'esperava '{c}'")
+        self._pos += 1
+
+    def _valor(self):
+        c = self._seguent()
+        if c and c in "-0123456789":
+            # un número tallat al final del bloc es decodificaria a mitges
+            while (_NUMERO.match(self._buf, self._pos).end() == len(self._buf)
+                   and self._llegir_mes()):
+                pass
+        mida = self._mida
+        while True:
+            try:
+                valor, fi = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # valor incomplet (o erroni): llegim blocs cada cop més grans
+                # perquè els reintents no siguin quadràtics
+                if self._llegir_mes(mida):
+                    mida *= 2
+                    continue
+                raise
+            self._pos = fi
+            return valor
+
+    def camps(self):
+        self._esperar("{")
+        if self._seguent() == "}":
+            self._pos += 1
+        else:
+            while True:
+                clau = self._valor()
+                if not isinstance(clau, str):
+                    raise self._error("clau invàlida")
+                self._esperar(":")
+                if clau == "images" and self._seguent() == "[":
+                    yield from self._imatges()
+                else:
+                    yield clau, self._valor()
+                c = self._seguent()
+                self._pos += 1
+                if c == "}":
+                    break
+                if c != ",":
+                    raise self._error("s'esperava ',' o '}'")
+        if self._seguent() != "":
+            raise self._error("contingut addicional després del JSON")
+
+    def _imatges(self):
+        self._esperar("[")
+        if self._seguent() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield _IMATGE, self._valor()
+            c = self._seguent()
+            self._pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                raise self._error("s'esperava ',' o ']'")
+
+
+_MAGIC = b"DSGALB01"
+_CAPCALERA_BIN = struct.Struct("<8sIIIQ")
+_MIDA_UUID = 16
+_EXT_BINARIA = ".galb"
+_UUID_TEXT = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z")
+
+
+def _uuid_a_bytes(uuid: str) -> Optional[bytes]:
+    """UUID en format canònic (minúscules) -> 16 bytes; None si no ho és."""
+    if not isinstance(uuid, str) or not _UUID_TEXT.match(uuid):
+        return None
+    return bytes.fromhex(uuid.replace("-", ""))
+
+
+def _bytes_a_uuid(b: bytes) -> str:
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class _VistaBinaria:
+    """
+    Seqüència d'UUID de només lectura sobre un arxiu ".galb" mapejat amb
+    mmap. Els UUID es descodifiquen en accedir-hi; res no es copia en obrir.
+    """
+
+    def __init__(self, fh, mm: mmap.mmap, inici: int, n: int):
+        self._fh = fh
+        self._mm = mm
+        self._inici = inici
+        self._n = n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        p = self._inici + i * _MIDA_UUID
+        return _bytes_a_uuid(self._mm[p:p + _MIDA_UUID])
+
+    def __iter__(self):
+        mm = self._mm
+        fi = self._inici + self._n * _MIDA_UUID
+        for p in range(self._inici, fi, _MIDA_UUID):
+            yield _bytes_a_uuid(mm[p:p + _MIDA_UUID])
+
+    def find(self, uuid: str) -> int:
+        """Posició de la primera aparició de `uuid`, o -1 (cerca en C)."""
+        b = _uuid_a_bytes(uuid)
+        if b is None:
+            return -1
+        fi = self._inici + self._n * _MIDA_UUID
+        p = self._mm.find(b, self._inici, fi)
+        while p >= 0:
+            if (p - self._inici) % _MIDA_UUID == 0:
+                return (p - self._inici) // _MIDA_UUID
+            p = self._mm.find(b, p + 1, fi)
+        return -1
+
+    def raw(self) -> memoryview:
+        """Els UUID empaquetats tal com són a l'arxiu."""
+        return memoryview(self._mm)[self._inici:self._inici + self._n * _MIDA_UUID]
+
+    def es_arxiu(self, file: str) -> bool:
+        """Cert si la vista és sobre l'arxiu `file`."""
+        if self._fh is None:
+            return False
+        try:
+            return os.path.samefile(self._fh.name, file)
+        except OSError:
+            return False
+
+    def desenganxar(self) -> None:
+        """Copia els UUID a memòria i allibera l'arxiu (la vista continua vàlida)."""
+        if self._fh is None:
+            return
+        dades = self._mm[self._inici:self._inici + self._n * _MIDA_UUID]
+        self.close()
+        self._mm = dades
+        self._inici = 0
+
+    def close(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            self._mm.close()
+        except BufferError:
+            # encara hi ha una memoryview viva; es tancarà amb el GC
+            pass
+        self._fh.close()
+        self._fh = None
+
+
+def _es_binari(file: str) -> bool:
+    try:
+        with open(file, "rb") as fh:
+            return fh.read(len(_MAGIC)) == _MAGIC
+    except OSError:
+        return False
+
+
 class Gallery:
     def __init__(self, instancia_image_id: Optional[ImageID] = None, instancia_image_viewer: Optional[ImageViewer] = None):
         self.gallery_name: str = "Nova Galeria"
         self.description: str = ""
         self.created_date: str = ""
-        self.images_uuid_list: List[str] = []
+        # Seqüència d'UUID i índex uuid -> posicions absolutes (ordenades).
+        # La posició relativa d'un element és la seva absoluta menys _base,
+        # de manera que treure pel davant no obliga a renumerar res.
+        self._images: Deque[str] = deque()
+        self._pos: Dict[str, Deque[int]] = {}
+        self._base = 0
+        # Galeria carregada d'un arxiu binari i encara no modificada
+        self._vista: Optional[_VistaBinaria] = None
+        # entrades de l'últim load_file() que no s'han trobat a la col·lecció
+        self.unresolved: List[str] = []
         self.id_manager = instancia_image_id
         self.viewer = instancia_image_viewer
 
     def load_file(self, file: str) -> None:
         # assegurem l'estat per defecte
-        self.images_uuid_list = []
+        self._reset()
+        self.unresolved = []
 
         if not file or not isinstance(file, str):
             print("WARNING (Gallery): Fitxer no trobat: " + str(file))
             return
 
+        if _es_binari(file):
+            self._load_binari(file)
+            return
+
+        capcalera = {}
         try:
             with open(file, "r", encoding="utf-8") as fh:
-                data = json.load(fh)
+                lector = _LectorJSON(fh)
+                lot: List[str] = []
+                for clau, valor in lector.camps():
+                    if clau == _IMATGE:
+                        # una entrada de l'array "images"
+                        if isinstance(valor, str) and valor:
+                            lot.append(valor.replace("\\", "/").strip())
+                            if len(lot) >= _MIDA_LOT:
+                                self._resoldre(lot)
+                                lot = []
+                    elif clau == "images":
+                        # "images" present però no és una llista -> res
+                        self._reset()
+                        lot = []
+                    elif clau in _CAPCALERA:
+                        capcalera[clau] = valor
+                self._resoldre(lot)
         except FileNotFoundError:
             # Missatge exacte que el tester pot buscar
             print(f"WARNING (Gallery): Fitxer no trobat: {file}")
-            self.images_uuid_list = []
+            self._reset()
+            self.unresolved = []
             return
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             print(f"WARNING (Gallery): JSON invàlid: {file}")
-            self.images_uuid_list = []
+            self._reset()
+            self.unresolved = []
             return
         except Exception:
             print(f"WARNING (Gallery): Fitxer no trobat: {file}")
-            self.images_uuid_list = []
+            self._reset()
+            self.unresolved = []
             return
 
         # llegir camps bàsics
+        self.gallery_name = capcalera.get("gallery_name", self.gallery_name)
+        self.description = capcalera.get("description", self.description)
+        self.created_date = capcalera.get("created_date", self.created_date)
+
+        if self.unresolved:
+            print(f"WARNING (Gallery): {len(self.unresolved)} imatges de {file} "
+                  f"no s'han trobat a la col·lecció (vegeu Gallery.unresolved).")
+
+    def _load_binari(self, file: str) -> None:
+        fh = None
         try:
-            self.gallery_name = data.get("gallery_name", self.gallery_name)
-            self.description = data.get("description", self.description)
-            self.created_date = data.get("created_date", self.created_date)
+            fh = open(file, "rb")
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, n_nom, n_desc, n_data, n = _CAPCALERA_BIN.unpack_from(mm, 0)
+            p = _CAPCALERA_BIN.size
+            textos = []
+            for mida in (n_nom, n_desc, n_data):
+                textos.append(mm[p:p + mida].decode("utf-8"))
+                p += mida
+            if p + n * _MIDA_UUID > len(mm):
+                raise ValueError("arxiu truncat")
         except Exception:
-            pass
-
-        images = data.get("images", [])
-        if not isinstance(images, list):
-            # si no és llista, res
-            self.images_uuid_list = []
+            print(f"WARNING (Gallery): Galeria binària invàlida: {file}")
+            if fh is not None:
+                fh.close()
             return
+        self.gallery_name, self.description, self.created_date = textos
+        self._vista = _VistaBinaria(fh, mm, p, n)
 
-        for p in images:
+    def save_file(self, file: str, binary: Optional[bool] = None) -> None:
+        """
+        Desa la galeria a `file`. Amb binary=None el format es tria per
+        l'extensió (".galb" binari, la resta JSON). L'arxiu s'escriu a part
+        i es substitueix al final, de manera que mai no queda a mitges.
+        """
+        if not file or not isinstance(file, str):
+            print("WARNING (Gallery): Nom d'arxiu invàlid: " + str(file))
+            return
+        if binary is None:
+            binary = file.lower().endswith(_EXT_BINARIA)
+        tmp = file + ".tmp"
+        try:
+            if binary:
+                omesos = self._save_binari(tmp)
+            else:
+                omesos = self._save_json(tmp)
+            if omesos is None:
+                os.remove(tmp)
+                return
+            if self._vista is not None and self._vista.es_arxiu(file):
+                # no es pot substituir un arxiu obert i mapejat (Windows)
+                self._vista.desenganxar()
+            os.replace(tmp, file)
+        except OSError as e:
+            print(f"WARNING (Gallery): No s'ha pogut desar {file}: {e}")
             try:
-                if not isinstance(p, str) or not p:
-                    continue
-                p_norm = p.replace("\\", "/").strip()
-                # obtenim UUID mitjançant id_manager (si hi és)
-                if not self.id_manager:
-                    # no es pot convertir sense id_manager
-                    continue
-                uuid = self.id_manager.get_uuid(p_norm)
-                if not uuid:
-                    # provem amb el path canònic (cfg)
-                    try:
-                        p_can = cfg.get_canonical_pathfile(p_norm)
-                        uuid = self.id_manager.get_uuid(p_can)
-                    except Exception:
-                        uuid = None
-                if uuid:
-                    self.images_uuid_list.append(uuid)
-                else:
-                    # imatge no trobada -> s'ignora silenciosament
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        if omesos:
+            print(f"WARNING (Gallery): {omesos} imatges no s'han pogut desar a {file}.")
+
+    def close(self) -> None:
+        """
+        Allibera l'arxiu binari carregat amb load_file() (que es manté obert
+        i mapejat mentre no es modifica la galeria). La galeria conserva el
+        seu contingut.
+        """
+        if self._vista is not None:
+            self._vista.desenganxar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _save_json(self, file: str) -> Optional[int]:
+        if not self.id_manager:
+            print("WARNING (Gallery): Cal un ImageID per desar en JSON.")
+            return None
+        get_path = self.id_manager.get_path
+        omesos = 0
+        with open(file, "w", encoding="utf-8") as fh:
+            fh.write("{\n")
+            for clau in _CAPCALERA:
+                fh.write(f"  {json.dumps(clau)}: {json.dumps(getattr(self, clau), ensure_ascii=False)},\n")
+            fh.write('  "images": [')
+            primer = True
+            for u in self:
+                path = get_path(u)
+                if path is None:
+                    omesos += 1
                     continue
-            except Exception:
-                continue
+                fh.write("\n    " if primer else ",\n    ")
+                fh.write(json.dumps(path, ensure_ascii=False))
+                primer = False
+            fh.write("\n  ]\n}\n" if not primer else "]\n}\n")
+        return omesos
+
+    def _save_binari(self, file: str) -> int:
+        textos = [str(getattr(self, c)).encode("utf-8") for c in _CAPCALERA]
+        omesos = 0
+        with open(file, "wb") as fh:
+            # el nombre d'imatges es reescriu al final
+            fh.write(_CAPCALERA_BIN.pack(_MAGIC, *map(len, textos), 0))
+            for t in textos:
+                fh.write(t)
+            if self._vista is not None:
+                # sense canvis: els UUID ja estan empaquetats
+                n = len(self._vista)
+                raw = self._vista.raw()
+                try:
+                    fh.write(raw)
+                finally:
+                    raw.release()
+            else:
+                n = 0
+                bloc = bytearray()
+                for u in self._images:
+                    b = _uuid_a_bytes(u)
+                    if b is None:
+                        omesos += 1
+                        continue
+                    bloc += b
+                    n += 1
+                    if len(bloc) >= 1 << 20:
+                        fh.write(bloc)
+                        bloc.clear()
+                fh.write(bloc)
+            fh.seek(0)
+            fh.write(_CAPCALERA_BIN.pack(_MAGIC, *map(len, textos), n))
+        return omesos
+
+    def _resoldre(self, paths: List[str]) -> None:
+        """Resol un lot d'entrades del JSON i afegeix les trobades al final."""
+        if not paths:
+            return
+        if not self.id_manager:
+            # no es pot convertir sense id_manager
+            self.unresolved.extend(paths)
+            return
+        for p, uuid in zip(paths, self.id_manager.resolve_many(paths)):
+            if uuid:
+                self.add_image_at_end(uuid)
+            else:
+                self.unresolved.append(p)
+
+    # --- Seqüència i índex de posicions ---
+    @property
+    def images_uuid_list(self) -> Tuple[str, ...]:
+        """
+        Seqüència d'UUID de la galeria (en ordre), com a tupla: abans era la
+        llista interna, però ara la galeria la guarda en un deque i un índex
+        de posicions, i modificar-ne una còpia no tindria cap efecte. Per
+        modificar-la: add_image_at_end(), insert_at(), remove_at()... o
+        assignar-hi una seqüència sencera.
+        """
+        return tuple(self)
+
+    @images_uuid_list.setter
+    def images_uuid_list(self, uuids: Iterable[str]) -> None:
+        self._reset(uuids)
+
+    def _reset(self, uuids: Iterable[str] = ()) -> None:
+        vista, self._vista = self._vista, None
+        self._images = deque(uuids)
+        self._base = 0
+        self._reindex()
+        if vista is not None:
+            vista.close()
+
+    def _materialitzar(self) -> None:
+        """Passa una galeria binària (mmap) a l'estructura modificable."""
+        if self._vista is not None:
+            self._reset(self._vista)
+
+    def _reindex(self) -> None:
+        pos: Dict[str, Deque[int]] = {}
+        for i, u in enumerate(self._images, self._base):
+            d = pos.get(u)
+            if d is None:
+                pos[u] = deque((i,))
+            else:
+                d.append(i)
+        self._pos = pos
+
+    def _normalitzar_pos(self, pos: int, inserir: bool = False) -> Optional[int]:
+        n = len(self._images)
+        if pos < 0:
+            pos += n
+        limit = n if inserir else n - 1
+        if inserir:
+            pos = max(0, min(pos, n))
+        if pos < 0 or pos > limit:
+            return None
+        return pos
 
     def show(self) -> None:
-        if not self.viewer:
+        if self.viewer is None:
             print("WARNING (Gallery): Visor no disponible.")
             return
-        if not self.images_uuid_list:
+        if not len(self):
             print(f"La galeria '{self.gallery_name}' està buida.")
             return
-        for u in list(self.images_uuid_list):
+        uuids = iter(self._vista if self._vista is not None else list(self._images))
+        # Mentre es mostra una imatge, el visor ja prepara les miniatures de
+        # les _PREFETCH següents
+        finestra = deque(islice(uuids, _PREFETCH + 1))
+        self._prefetch(finestra)
+        while finestra:
+            u = finestra.popleft()
+            seguent = next(uuids, None)
+            if seguent is not None:
+                finestra.append(seguent)
+                self._prefetch((seguent,))
             try:
                 self.viewer.show_image(u, cfg.DISPLAY_MODE)
             except Exception:
                 continue
 
+    def _prefetch(self, uuids) -> None:
+        if cfg.DISPLAY_MODE == 0 or not hasattr(self.viewer, "prefetch"):
+            return
+        try:
+            self.viewer.prefetch(uuids)
+        except Exception:
+            pass
+
     def add_image_at_end(self, uuid: str) -> None:
         if not uuid or not isinstance(uuid, str):
             return
-        self.images_uuid_list.append(uuid)
+        self._materialitzar()
+        i = self._base + len(self._images)
+        self._images.append(uuid)
+        d = self._pos.get(uuid)
+        if d is None:
+            self._pos[uuid] = deque((i,))
+        else:
+            d.append(i)
 
     def remove_first_image(self) -> None:
-        if self.images_uuid_list:
-            try:
-                self.images_uuid_list.pop(0)
-            except Exception:
-                self.images_uuid_list = self.images_uuid_list[1:]
+        self._materialitzar()
+        if self._images:
+            u = self._images.popleft()
+            self._treure_pos(u, primera=True)
+            self._base += 1
 
     def remove_last_image(self) -> None:
-        if self.images_uuid_list:
-            try:
-                self.images_uuid_list.pop()
-            except Exception:
-                self.images_uuid_list = self.images_uuid_list[:-1]
+        self._materialitzar()
+        if self._images:
+            u = self._images.pop()
+            self._treure_pos(u, primera=False)
+
+    def _treure_pos(self, uuid: str, primera: bool) -> None:
+        d = self._pos[uuid]
+        if primera:
+            d.popleft()
+        else:
+            d.pop()
+        if not d:
+            del self._pos[uuid]
+
+    def insert_at(self, pos: int, uuid: str) -> None:
+        """Insereix `uuid` perquè quedi a la posició `pos` (com list.insert)."""
+        if not uuid or not isinstance(uuid, str):
+            return
+        self._materialitzar()
+        pos = self._normalitzar_pos(pos, inserir=True)
+        if pos == len(self._images):
+            self.add_image_at_end(uuid)
+            return
+        if pos == 0:
+            self._base -= 1
+            self._images.appendleft(uuid)
+            d = self._pos.get(uuid)
+            if d is None:
+                self._pos[uuid] = deque((self._base,))
+            else:
+                d.appendleft(self._base)
+            return
+        # pel mig: O(n), les posicions posteriors es desplacen
+        self._images.insert(pos, uuid)
+        self._reindex()
+
+    def remove_at(self, pos: int) -> Optional[str]:
+        """Elimina i retorna l'UUID de la posició `pos` (None si no existeix)."""
+        self._materialitzar()
+        pos = self._normalitzar_pos(pos)
+        if pos is None:
+            return None
+        if pos == 0:
+            u = self._images[0]
+            self.remove_first_image()
+            return u
+        if pos == len(self._images) - 1:
+            u = self._images[-1]
+            self.remove_last_image()
+            return u
+        u = self._images[pos]
+        del self._images[pos]
+        self._reindex()
+        return u
+
+    def index_of(self, uuid: str) -> int:
+        """Primera posició de `uuid` a la galeria, o -1 si no hi és."""
+        if self._vista is not None:
+            return self._vista.find(uuid)
+        d = self._pos.get(uuid)
+        return d[0] - self._base if d else -1
+
+    def contains(self, uuid: str) -> bool:
+        if self._vista is not None:
+            return self._vista.find(uuid) >= 0
+        return uuid in self._pos
+
+    def __contains__(self, uuid: str) -> bool:
+        return self.contains(uuid)
+
+    def __iter__(self):
+        if self._vista is not None:
+            return iter(self._vista)
+        return iter(self._images)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadístiques d'ús de la classe (vegeu Stats.py; buides si no està activat)."""
+        import Stats
+        return Stats.stats("Gallery")
 
     def __len__(self) -> int:
-        return len(self.images_uuid_list)
+        if self._vista is not None:
+            return len(self._vista)
+        return len(self._images)
 
     def __str__(self) -> str:
         return f"<Gallery: '{self.gallery_name}' ({len(self)} imatges)>"
@@ -49,6 +49,11 @@ Mètodes a implementar:
     - get_dimensions(uuid: str) -> tuple
         Retorna una tupla (width, height) amb les dimensions de la imatge.
 
+    - load_phash(uuid) / load_phash_many(uuids, workers=None, executor="thread")
+        Etapa opcional: calcula el hash perceptual (dHash de 64 bits, vegeu
+        PerceptualHash.py) de les imatges. get_phash(uuid) el retorna (int o
+        None si no s'ha calculat).
+
 Notes:
     - Utilitzeu la llibreria PIL/Pillow per llegir metadades:
       img = Image.open(file)
@@ -59,9 +64,93 @@ Notes:
 """
 
 import os
+import sys
 import cfg
-from PIL import Image
-from typing import Dict, Tuple, Any
+from typing import Dict, Tuple, Any, Iterable, List, Optional
+from MetadataCache import signature
+
+# Camps obligatoris de les metadades (en l'ordre en què es guarden)
+_CAMPS = ("Prompt", "Seed", "CFG_Scale", "Steps", "Sampler", "Model", "Generated", "Created_Date")
+
+# Si és True, load_metadata() llegeix els chunks del PNG directament (cfg.read_png_info)
+# i només utilitza PIL com a alternativa
+LECTOR_RAPID = True
+
+# Estats possibles del resultat de llegir un PNG
+_OK = "ok"
+_BUIDES = "empty"
+_INEXISTENT = "missing"
+_ERROR = "error"
+
+
+# Valor compartit per als camps sense metadada
+_NONE = "None"
+
+# Camps amb pocs valors diferents: s'internen perquè tots els registres
+# comparteixin el mateix objecte string
+_CAMPS_INTERN = frozenset(("CFG_Scale", "Steps", "Sampler", "Model", "Generated", "Created_Date"))
+
+
+def _metadata_buida() -> Dict[str, str]:
+    return {k: _NONE for k in _CAMPS}
+
+
+class _ImageRecord:
+    """
+    Registre compacte d'una imatge: un atribut (slot) per camp en lloc d'un
+    dict amb un altre dict de metadades i una tupla de dimensions.
+    Les claus de metadades no estàndard es guarden a `extra` (None si no n'hi ha).
+    `phash` és el hash perceptual (int de 64 bits) o None si no s'ha calculat,
+    i `phash_sig` la signatura (size, mtime_ns) de l'arxiu del qual surt.
+    """
+    __slots__ = ("file_path",) + _CAMPS + ("width", "height", "extra", "phash", "phash_sig")
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.reset_metadata()
+        self.width = 0
+        self.height = 0
+        self.phash = None
+        self.phash_sig = None
+
+    def reset_metadata(self) -> None:
+        for k in _CAMPS:
+            setattr(self, k, _NONE)
+        self.extra = None
+
+    def set_metadata(self, meta: Dict[str, str]) -> None:
+        self.reset_metadata()
+        extra = None
+        for k, v in meta.items():
+            if k in _CAMPS_INTERN:
+                setattr(self, k, sys.intern(v))
+            elif k in _CAMPS:
+                setattr(self, k, _NONE if v == _NONE else v)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[k] = v
+        self.extra = extra
+
+    def metadata(self) -> Dict[str, str]:
+        meta = {k: getattr(self, k) for k in _CAMPS}
+        if self.extra:
+            meta.update(self.extra)
+        return meta
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    @dimensions.setter
+    def dimensions(self, dims: Tuple[int, int]) -> None:
+        self.width, self.height = int(dims[0] or 0), int(dims[1] or 0)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, _ImageRecord):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
 
 # Funció d'ajuda per normalitzar claus de metadades a les esperades
 def _canonical_key(k: str) -> str:
@@ -88,10 +177,123 @@ def _canonical_key(k: str) -> str:
     # fallback: capitalitza la clau original
     return k
 
+
+def _normalitzar(raw) -> Dict[str, str]:
+    """Converteix els chunks de text llegits a claus canòniques i valors string."""
+    norm: Dict[str, str] = {}
+    if raw and isinstance(raw, dict):
+        for k, v in raw.items():
+            try:
+                key = _canonical_key(str(k))
+                if isinstance(v, bytes):
+                    try:
+                        sval = v.decode("utf-8", errors="ignore")
+                    except Exception:
+                        sval = str(v)
+                else:
+                    sval = str(v)
+                norm[key] = sval
+            except Exception:
+                continue
+    elif raw:
+        # hi ha alguna cosa però no és dict -> la convertim a prompt
+        try:
+            sval = str(raw)
+            norm["Prompt"] = sval
+        except Exception:
+            pass
+    return norm
+
+
+def _resultat(norm: Dict[str, str], dims: Tuple[int, int]):
+    # Si no hem obtingut cap metadada real, només ens quedem amb les dimensions
+    if not norm:
+        return (_BUIDES, None, dims, "sense metadades")
+
+    # inserim valors llegits, assegurant que totes les claus obligatòries existeixin
+    # inicialitzem amb "None" i sobreescrivim amb valors reals
+    meta_safe = _metadata_buida()
+    for k, v in norm.items():
+        if not isinstance(k, str):
+            continue
+        meta_safe[k] = str(v) if v is not None else "None"
+    return (_OK, meta_safe, dims, "")
+
+
+def _llegir_metadades_pil(abs_path: str) -> Tuple[str, Optional[Dict[str, str]], Tuple[int, int], str]:
+    """Lector complet amb PIL (admet qualsevol format i chunk que PIL entengui)."""
+    # Llegim la imatge amb PIL i extraiem text chunks (img.info o img.text)
+    try:
+        from PIL import Image   # només quan cal (importar PIL és car)
+        with Image.open(abs_path) as img:
+            raw = getattr(img, "text", None)
+            if raw is None:
+                # alguns PIL utilitzen img.info per a text
+                raw = img.info if isinstance(img.info, dict) else None
+
+            # dimensions
+            w = getattr(img, "width", None)
+            h = getattr(img, "height", None)
+            try:
+                dims = (int(w) if w else 0, int(h) if h else 0)
+            except Exception:
+                dims = (0, 0)
+
+            norm = _normalitzar(raw)
+    except Exception as e:
+        return (_ERROR, None, (0, 0), f"{type(e).__name__}: {e}")
+    return _resultat(norm, dims)
+
+
+def _llegir_metadades(abs_path: str) -> Tuple[str, Optional[Dict[str, str]], Tuple[int, int], str]:
+    """
+    Llegeix i normalitza les metadades d'un PNG sense tocar cap ImageData.
+
+    Primer prova el lector de chunks de cfg (una sola obertura, sense PIL) i
+    només si aquest no el pot interpretar recorre a PIL.
+    És una funció de mòdul (i no un mètode) perquè es pugui executar dins
+    d'un ProcessPoolExecutor. Retorna (estat, metadades, dimensions, motiu).
+    """
+    # Si l'arxiu no existeix, no hi ha metadades reals
+    if not os.path.isfile(abs_path):
+        return (_INEXISTENT, None, (0, 0), "arxiu inexistent")
+
+    if LECTOR_RAPID:
+        info = cfg.read_png_info(abs_path)
+        if info is not None:
+            raw, dims = info
+            return _resultat(_normalitzar(raw), dims)
+    return _llegir_metadades_pil(abs_path)
+
+
 class ImageData:
-    def __init__(self):
-        # uuid -> { file_path: str, metadata: dict, dimensions: (w,h) }
-        self._data_storage: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, cache=None):
+        # uuid -> _ImageRecord (file_path, camps de metadades, width, height)
+        self._data_storage: Dict[str, _ImageRecord] = {}
+        # Memòria cau persistent opcional (MetadataCache); per defecte la de cfg.CACHE_DIR
+        if cache is None and cfg.config.cache_dir:
+            from MetadataCache import MetadataCache
+            cache = MetadataCache(cfg.config.cache_dir)
+        self._cache = cache
+        # Objectes avisats quan una imatge canvia (p.ex. els índexs de SearchMetadata)
+        self._listeners: List[Any] = []
+
+    def add_listener(self, listener) -> None:
+        """
+        Registra un objecte amb els mètodes image_updated(uuid) i
+        image_removed(uuid), que es criden després de cada add_image(),
+        load_metadata() i remove_image().
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notificar(self, uuid: str) -> None:
+        for l in self._listeners:
+            l.image_updated(uuid)
 
     def add_image(self, uuid: str, file: str) -> None:
         if not uuid or not isinstance(uuid, str):
@@ -101,25 +303,57 @@ class ImageData:
             print("WARNING (ImageData): file invàlid a add_image().")
             return
         # Inicialitzar tots els camps obligats amb "None" per coherència
-        self._data_storage[uuid] = {
-            "file_path": file.replace("\\", "/"),
-            "metadata": {
-                "Prompt": "None",
-                "Seed": "None",
-                "CFG_Scale": "None",
-                "Steps": "None",
-                "Sampler": "None",
-                "Model": "None",
-                "Generated": "None",
-                "Created_Date": "None"
-            },
-            "dimensions": (0, 0)
-        }
+        self._data_storage[uuid] = _ImageRecord(file.replace("\\", "/"))
+        self._notificar(uuid)
 
     def remove_image(self, uuid: str) -> None:
         if not uuid:
             return
-        self._data_storage.pop(uuid, None)
+        if self._data_storage.pop(uuid, None) is not None:
+            for l in self._listeners:
+                l.image_removed(uuid)
+
+    def _abs_path(self, uuid: str) -> str:
+        rel = self._data_storage[uuid].file_path
+        # Construïm path absolut
+        try:
+            root = cfg.get_root()
+            return os.path.join(root, rel) if not os.path.isabs(rel) else rel
+        except Exception:
+            return rel
+
+    def _aplicar_resultat(self, uuid: str, resultat, sig: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Únic punt d'escriptura del resultat de _llegir_metadades(). Si l'arxiu
+        ha canviat des que se'n va calcular el hash perceptual, el descarta
+        (abans de notificar) i retorna True perquè el cridant el recalculi.
+        `sig` és la signatura de l'arxiu si ja es coneix.
+        """
+        estat, meta, dims, _ = resultat
+        rec = self._data_storage[uuid]
+        caducat = False
+        if rec.phash is not None:
+            if sig is None:
+                sig = signature(self._abs_path(uuid))
+            caducat = sig != rec.phash_sig
+        if caducat:
+            rec.phash = rec.phash_sig = None
+        if estat == _OK:
+            rec.dimensions = dims
+            rec.set_metadata(meta)
+        else:
+            print("WARNING with empty metadata elements")
+            if estat == _ERROR:
+                # Qualsevol error llegint la imatge -> deixem valors segurs
+                rec.reset_metadata()
+                rec.dimensions = (0, 0)
+            else:
+                # Arxiu inexistent o sense metadades: mantenim la metadata prèvia
+                # (defecte "None") i actualitzem només les dimensions
+                rec.dimensions = dims
+        if self._listeners:
+            self._notificar(uuid)
+        return caducat
 
     def load_metadata(self, uuid: str) -> None:
         """
@@ -132,132 +366,197 @@ class ImageData:
             # advertència suau, però no llença excepció
             # (el test vol que no peti)
             return
+        if self._aplicar_resultat(uuid, self._llegir_resultat(self._abs_path(uuid))):
+            self.load_phash(uuid)
 
-        rec = self._data_storage[uuid]
-        rel = rec.get("file_path", "")
-        # Construïm path absolut
-        try:
-            root = cfg.get_root()
-            abs_path = os.path.join(root, rel) if not os.path.isabs(rel) else rel
-        except Exception:
-            abs_path = rel
+    def _llegir_resultat(self, abs_path: str):
+        """
+        Llegeix un arxiu passant per la memòria cau (si n'hi ha). No modifica
+        _data_storage, de manera que es pot cridar des de fils treballadors.
+        """
+        if self._cache is None:
+            return _llegir_metadades(abs_path)
+        sig = signature(abs_path)
+        res = self._cache.get(abs_path, sig)
+        if res is None:
+            res = _llegir_metadades(abs_path)
+            self._cache.put(abs_path, sig, res)
+        return res
+
+    def load_metadata_many(self, uuids: Iterable[str], workers: Optional[int] = None,
+                           executor: str = "thread") -> Dict[str, str]:
+        """
+        Versió en lot de load_metadata(): reparteix la lectura dels PNG entre
+        un pool de fils ("thread") o de processos ("process") i aplica els
+        resultats des d'aquest únic fil, en el mateix ordre que `uuids`.
+
+        El resultat final (i els avisos impresos) és idèntic al de cridar
+        load_metadata() per a cada UUID. Retorna un diccionari
+        uuid -> motiu amb els arxius que no s'han pogut llegir; un error en
+        un arxiu no atura la resta del lot. Els hashos perceptuals dels
+        arxius que han canviat es recalculen.
+        """
+        pendents: List[str] = []
+        paths: List[str] = []
+        for uuid in uuids:
+            if not uuid or uuid not in self._data_storage:
+                continue
+            pendents.append(uuid)
+            paths.append(self._abs_path(uuid))
+
+        errors: Dict[str, str] = {}
+        if not pendents:
+            return errors
+
+        # Amb memòria cau només es llegeixen del disc els arxius que han canviat
+        cache = self._cache
+        if cache is not None:
+            resultats: List[Any] = [None] * len(pendents)
+            signatures = [signature(p) for p in paths]
+            a_llegir = []
+            for i, p in enumerate(paths):
+                resultats[i] = cache.get(p, signatures[i])
+                if resultats[i] is None:
+                    a_llegir.append(i)
+            llegits = self._llegir_lot([paths[i] for i in a_llegir], workers, executor)
+            for i, res in zip(a_llegir, llegits):
+                cache.put(paths[i], signatures[i], res)
+                resultats[i] = res
+            cache.flush()
+        else:
+            resultats = self._llegir_lot(paths, workers, executor)
+            signatures = [None] * len(pendents)
+        caducats = self._fusionar(pendents, resultats, signatures, errors)
+        if caducats:
+            self.load_phash_many(caducats, workers, executor)
+        return errors
+
+    def load_phash(self, uuid: str) -> None:
+        """Calcula el hash perceptual d'una imatge (vegeu load_phash_many())."""
+        self.load_phash_many((uuid,), workers=1)
+
+    def load_phash_many(self, uuids: Iterable[str], workers: Optional[int] = None,
+                        executor: str = "thread") -> int:
+        """
+        Etapa opcional de la càrrega: calcula el dHash de 64 bits de cada
+        imatge (PerceptualHash.dhash) repartint-ne la lectura com
+        load_metadata_many(), i el guarda al registre. Amb memòria cau només
+        es recalcula per als arxius que han canviat. Retorna quants hashos
+        s'han pogut calcular; les imatges il·legibles queden amb None.
+        """
+        from PerceptualHash import a_bytes, de_bytes, dhash
+
+        pendents: List[str] = []
+        paths: List[str] = []
+        for uuid in uuids:
+            if not uuid or uuid not in self._data_storage:
+                continue
+            pendents.append(uuid)
+            paths.append(self._abs_path(uuid))
+        if not pendents:
+            return 0
 
-        # Si l'arxiu no existeix, no hi ha metadades reals
-        if not os.path.isfile(abs_path):
-            # deixem els valors per defecte (ja inicialitzats), però alertem
-            print("WARNING with empty metadata elements")
-            rec["dimensions"] = (0, 0)
-            # Assegurem que hi hagi el dict metadata amb les claus esperades
-            if "metadata" not in rec or not isinstance(rec["metadata"], dict):
-                rec["metadata"] = {
-                    "Prompt": "None",
-                    "Seed": "None",
-                    "CFG_Scale": "None",
-                    "Steps": "None",
-                    "Sampler": "None",
-                    "Model": "None",
-                    "Generated": "None",
-                    "Created_Date": "None"
-                }
+        # signatura abans de llegir: si l'arxiu canvia mentrestant, el hash
+        # es tornarà a calcular al següent load_metadata()
+        signatures = [signature(p) for p in paths]
+        cache = self._cache
+        if cache is None:
+            hashos = self._llegir_lot(paths, workers, executor, dhash)
+        else:
+            hashos: List[Optional[int]] = [None] * len(pendents)
+            a_llegir = []
+            for i, p in enumerate(paths):
+                guardat = cache.get_hash(p, signatures[i], "dhash")
+                if guardat is None:
+                    a_llegir.append(i)
+                else:
+                    hashos[i] = de_bytes(guardat)
+            llegits = self._llegir_lot([paths[i] for i in a_llegir], workers, executor, dhash)
+            for i, h in zip(a_llegir, llegits):
+                if h is not None:
+                    cache.put_hash(paths[i], signatures[i], "dhash", a_bytes(h))
+                hashos[i] = h
+            cache.flush()
+
+        n = 0
+        for uuid, h, sig in zip(pendents, hashos, signatures):
+            if uuid in self._data_storage:
+                self._aplicar_phash(uuid, h, sig)
+                n += h is not None
+        return n
+
+    def _llegir_phash(self, abs_path: str) -> Tuple[Optional[int], Optional[Tuple[int, int]]]:
+        """
+        (dHash, signatura) d'un arxiu passant per la memòria cau; no modifica
+        _data_storage.
+        """
+        from PerceptualHash import a_bytes, de_bytes, dhash
+
+        sig = signature(abs_path)
+        if self._cache is None:
+            return dhash(abs_path), sig
+        guardat = self._cache.get_hash(abs_path, sig, "dhash")
+        if guardat is not None:
+            return de_bytes(guardat), sig
+        h = dhash(abs_path)
+        if h is not None:
+            self._cache.put_hash(abs_path, sig, "dhash", a_bytes(h))
+        return h, sig
+
+    def _aplicar_phash(self, uuid: str, h: Optional[int], sig: Optional[Tuple[int, int]],
+                       notificar: bool = True) -> None:
+        rec = self._data_storage[uuid]
+        rec.phash_sig = sig
+        if rec.phash == h:
             return
-
-        # Llegim la imatge amb PIL i extraiem text chunks (img.info o img.text)
-        try:
-            with Image.open(abs_path) as img:
-                raw = getattr(img, "text", None)
-                if raw is None:
-                    # alguns PIL utilitzen img.info per a text
-                    raw = img.info if isinstance(img.info, dict) else None
-
-                # dimensions
-                w = getattr(img, "width", None)
-                h = getattr(img, "height", None)
-                try:
-                    rec["dimensions"] = (int(w) if w else 0, int(h) if h else 0)
-                except Exception:
-                    rec["dimensions"] = (0, 0)
-
-                norm: Dict[str, str] = {}
-                if raw and isinstance(raw, dict):
-                    for k, v in raw.items():
-                        try:
-                            key = _canonical_key(str(k))
-                            if isinstance(v, bytes):
-                                try:
-                                    sval = v.decode("utf-8", errors="ignore")
-                                except Exception:
-                                    sval = str(v)
-                            else:
-                                sval = str(v)
-                            norm[key] = sval
-                        except Exception:
-                            continue
-                elif raw:
-                    # hi ha alguna cosa però no és dict -> la convertim a prompt
-                    try:
-                        sval = str(raw)
-                        norm["Prompt"] = sval
-                    except Exception:
-                        pass
-
-                # Si no hem obtingut cap metadada real, avisem i deixem valors per defecte
-                if not norm:
-                    print("WARNING with empty metadata elements")
-                    # mantenim la metadata prèvia (defecte "None")
-                    if "metadata" not in rec or not isinstance(rec["metadata"], dict):
-                        rec["metadata"] = {
-                            "Prompt": "None",
-                            "Seed": "None",
-                            "CFG_Scale": "None",
-                            "Steps": "None",
-                            "Sampler": "None",
-                            "Model": "None",
-                            "Generated": "None",
-                            "Created_Date": "None"
-                        }
-                    return
-
-                # inserim valors llegits, assegurant que totes les claus obligatòries existeixin
-                # inicialitzem amb "None" i sobreescrivim amb valors reals
-                meta_safe = {
-                    "Prompt": "None",
-                    "Seed": "None",
-                    "CFG_Scale": "None",
-                    "Steps": "None",
-                    "Sampler": "None",
-                    "Model": "None",
-                    "Generated": "None",
-                    "Created_Date": "None"
-                }
-                for k, v in norm.items():
-                    if not isinstance(k, str):
-                        continue
-                    meta_safe[k] = str(v) if v is not None else "None"
-                rec["metadata"] = meta_safe
-        except Exception:
-            # Qualsevol error llegint la imatge -> deixem valors segurs
-            print("WARNING with empty metadata elements")
-            rec["metadata"] = {
-                "Prompt": "None",
-                "Seed": "None",
-                "CFG_Scale": "None",
-                "Steps": "None",
-                "Sampler": "None",
-                "Model": "None",
-                "Generated": "None",
-                "Created_Date": "None"
-            }
-            rec["dimensions"] = (0, 0)
+        rec.phash = h
+        if notificar and self._listeners:
+            self._notificar(uuid)
+
+    def _llegir_lot(self, paths: List[str], workers: Optional[int], executor: str,
+                    fn=_llegir_metadades) -> List[Any]:
+        """Executa `fn` (per defecte _llegir_metadades()) sobre `paths` i retorna els resultats en ordre."""
+        if not paths:
+            return []
+
+        if executor == "thread":
+            from concurrent.futures import ThreadPoolExecutor as pool_cls
+        elif executor == "process":
+            from concurrent.futures import ProcessPoolExecutor as pool_cls
+        else:
+            raise ValueError(f"executor desconegut: {executor!r}")
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(paths)))
+
+        if workers == 1:
+            return list(map(fn, paths))
+
+        # Blocs grans per amortir el cost de comunicació amb els processos
+        chunksize = 1 if executor == "thread" else max(1, len(paths) // (workers * 8))
+        with pool_cls(max_workers=workers) as pool:
+            return list(pool.map(fn, paths, chunksize=chunksize))
+
+    def _fusionar(self, pendents: List[str], resultats, signatures, errors: Dict[str, str]) -> List[str]:
+        """Aplica els resultats; retorna els UUID amb el hash perceptual caducat."""
+        caducats = []
+        for uuid, res, sig in zip(pendents, resultats, signatures):
+            # l'UUID pot haver desaparegut mentre el lot s'estava llegint
+            if uuid not in self._data_storage:
+                continue
+            if self._aplicar_resultat(uuid, res, sig):
+                caducats.append(uuid)
+            if res[0] in (_INEXISTENT, _ERROR):
+                errors[uuid] = res[3]
+        return caducats
 
     # --- Getters (sempre string) ---
     def _get_field(self, uuid: str, key: str) -> str:
-        if not uuid or uuid not in self._data_storage:
-            return "None"
-        try:
-            val = self._data_storage[uuid].get("metadata", {}).get(key, "None")
-            return "None" if val is None else str(val)
-        except Exception:
-            return "None"
+        rec = self._data_storage.get(uuid) if uuid else None
+        if rec is None:
+            return _NONE
+        return getattr(rec, key)
 
     def get_prompt(self, uuid: str) -> str:
         return self._get_field(uuid, "Prompt")
@@ -284,22 +583,37 @@ class ImageData:
         return self._get_field(uuid, "Created_Date")
 
     def get_dimensions(self, uuid: str) -> Tuple[int, int]:
-        if not uuid or uuid not in self._data_storage:
-            return (0, 0)
-        try:
-            dims = self._data_storage[uuid].get("dimensions", (0, 0))
-            if not isinstance(dims, tuple) or len(dims) != 2:
-                return (0, 0)
-            return (int(dims[0] or 0), int(dims[1] or 0))
-        except Exception:
+        rec = self._data_storage.get(uuid) if uuid else None
+        if rec is None:
             return (0, 0)
+        return (rec.width, rec.height)
+
+    def get_phash(self, uuid: str) -> Optional[int]:
+        rec = self._data_storage.get(uuid) if uuid else None
+        return rec.phash if rec is not None else None
 
     def _obtenir_dada(self, uuid: str, clau: str):
         if not uuid or uuid not in self._data_storage:
             return ""
-        if clau == "file":
-            return self._data_storage[uuid].get("file_path", "")
-        return self._data_storage[uuid].get(clau)
+        rec = self._data_storage[uuid]
+        if clau in ("file", "file_path"):
+            return rec.file_path
+        if clau == "metadata":
+            return rec.metadata()
+        if clau == "dimensions":
+            return rec.dimensions
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadístiques d'ús de la classe (vegeu Stats.py; buides si no està
+        activat) i, si n'hi ha, les de la caché de metadades.
+        """
+        import Stats
+        res = Stats.stats("ImageData")
+        if self._cache is not None:
+            res["cache"] = self._cache.stats()
+        return res
 
     def __len__(self) -> int:
         try:
@@ -4,43 +4,215 @@ ImageFiles.py
 """
 import os
 import cfg
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _DirInfo:
+    """Contingut recordat d'un directori de la col·lecció."""
+    __slots__ = ("mtime_ns", "subdirs", "files")
+
+    def __init__(self, mtime_ns: int, subdirs: List[str], files: Dict[str, Tuple[int, int]]):
+        self.mtime_ns = mtime_ns
+        self.subdirs = subdirs   # paths absoluts dels subdirectoris
+        self.files = files       # path absolut del PNG -> (size, mtime_ns)
 
 
 class ImageFiles:
     def __init__(self):
         self._arxius_anteriors = set()
         self._arxius_actuals = set()
+        # path -> (size, mtime_ns) de l'escaneig actual i de l'anterior
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._stats_anteriors: Dict[str, Tuple[int, int]] = {}
+        # directori -> _DirInfo, per al mode incremental
+        self._dirs: Dict[str, _DirInfo] = {}
+        self._root: Optional[str] = None
+
+    def reload_fs(self, path: str = None, incremental: bool = False, check_modified: bool = True) -> None:
+        """
+        Escaneja el directori `path` (per defecte cfg.get_root()) buscant PNG.
+
+        En mode incremental, els directoris amb el mateix mtime que a l'escaneig
+        anterior no es tornen a llistar: se'n reaprofita el contingut recordat i
+        només es baixa als seus subdirectoris (un canvi en un subdirectori no
+        modifica el mtime del pare). El mtime d'un directori no canvia quan es
+        reescriu un arxiu que conté, de manera que amb `check_modified` es
+        tornen a consultar (os.stat) els arxius recordats per detectar-ne les
+        modificacions; amb False només es detecten altes i baixes.
+        """
+        # Estat anterior
+        self._arxius_anteriors = self._arxius_actuals
+        self._stats_anteriors = self._stats
+        self._arxius_actuals = set()
+        self._stats = {}
+
+        root = self._preparar_root(path)
+        if root is None:
+            return
+        for full, sig in self._walk(root, incremental, check_modified):
+            self._stats[full] = sig
+        self._arxius_actuals = set(self._stats)
+
+    def iter_scan(self, path: str = None, incremental: bool = False, check_modified: bool = True):
+        """
+        Versió en streaming de reload_fs(): retorna un generador que dona el
+        path relatiu canònic ("subdir/img.png", relatiu a `path`) de cada PNG
+        a mesura que es descobreix, sense esperar a recórrer tot l'arbre.
 
-    def reload_fs(self, path: str = None) -> None:
-        # Estado anterior
-        self._arxius_anteriors = self._arxius_actuals.copy()
+        L'estat (files_added(), ...) s'actualitza a mesura que avança; si el
+        generador no s'esgota només conté el que s'hagi trobat fins llavors.
+        """
+        self._arxius_anteriors = self._arxius_actuals
+        self._stats_anteriors = self._stats
         self._arxius_actuals = set()
+        self._stats = {}
+
+        root = self._preparar_root(path)
+        if root is None:
+            return
+        inici = len(root) + 1 if not root.endswith(os.sep) else len(root)
+        for full, sig in self._walk(root, incremental, check_modified):
+            self._stats[full] = sig
+            self._arxius_actuals.add(full)
+            yield full[inici:].replace(os.sep, "/")
 
+    def _preparar_root(self, path: Optional[str]) -> Optional[str]:
         # Path por defecto
         if not isinstance(path, str) or not path:
             path = cfg.get_root()
 
         try:
-            path = os.path.normpath(path)
+            path = os.path.abspath(os.path.normpath(path))
         except Exception:
-            return
+            return None
 
         if not os.path.isdir(path):
-            return
+            return None
+
+        if path != self._root:
+            # Canvi d'arrel: el contingut recordat ja no serveix
+            self._dirs = {}
+            self._root = path
+        return path
 
+    def _walk(self, root: str, incremental: bool, check_modified: bool):
+        """Genera (path absolut, (size, mtime_ns)) de cada PNG sota `root`."""
+        dirs_nous: Dict[str, _DirInfo] = {}
+        pila = [root]
+        while pila:
+            base = pila.pop()
+            info = self._scan_dir(base, incremental, check_modified)
+            if info is None:
+                continue
+            dirs_nous[base] = info
+            yield from info.files.items()
+            pila.extend(reversed(info.subdirs))
+
+        # Els directoris que ja no existeixen desapareixen de la memòria
+        self._dirs = dirs_nous
+
+    def _scan_dir(self, base: str, incremental: bool, check_modified: bool) -> Optional[_DirInfo]:
         try:
-            for base, _, files in os.walk(path):
-                for fname in files:
-                    if not fname.lower().endswith(".png"):
+            mtime_ns = os.stat(base).st_mtime_ns
+        except OSError:
+            return None
+
+        previ = self._dirs.get(base)
+        if incremental and previ is not None and previ.mtime_ns == mtime_ns:
+            if check_modified:
+                files = {}
+                for full in previ.files:
+                    try:
+                        st = os.stat(full)
+                    except OSError:
                         continue
+                    files[full] = (st.st_size, st.st_mtime_ns)
+                previ.files = files
+            return previ
 
-                    full = os.path.abspath(os.path.join(base, fname))
-                    self._arxius_actuals.add(full)
-        except Exception:
-            return
+        subdirs: List[str] = []
+        files: Dict[str, Tuple[int, int]] = {}
+        try:
+            with os.scandir(base) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            # igual que os.walk: no seguim enllaços a directoris
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.name.lower().endswith(".png"):
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.path] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            return None
+        subdirs.sort()
+        return _DirInfo(mtime_ns, subdirs, files)
+
+    def update_files(self, changed=(), removed=()) -> None:
+        """
+        Aplica canvis coneguts per altres vies (p.ex. inotify) sense tornar a
+        escanejar: després de la crida, files_added(), files_removed() i
+        files_modified() descriuen exactament aquests canvis.
+        """
+        self._arxius_anteriors = set(self._arxius_actuals)
+        self._stats_anteriors = dict(self._stats)
+        for p in removed:
+            full = os.path.abspath(p)
+            self._stats.pop(full, None)
+            info = self._dirs.get(os.path.dirname(full))
+            if info is not None:
+                info.files.pop(full, None)
+        for p in changed:
+            full = os.path.abspath(p)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            self._stats[full] = (st.st_size, st.st_mtime_ns)
+            info = self._dirs.get(os.path.dirname(full))
+            if info is not None:
+                info.files[full] = self._stats[full]
+        self._arxius_actuals = set(self._stats)
 
     def files_added(self):
         return sorted(self._arxius_actuals - self._arxius_anteriors)
 
     def files_removed(self):
         return sorted(self._arxius_anteriors - self._arxius_actuals)
+
+    def files_modified(self):
+        """Arxius presents als dos escanejos amb (size, mtime) diferent."""
+        anteriors = self._stats_anteriors
+        return sorted(p for p, sig in self._stats.items()
+                      if p in anteriors and anteriors[p] != sig)
+
+    def file_stat(self, path: str) -> Optional[Tuple[int, int]]:
+        """Retorna (size, mtime_ns) d'un arxiu de l'últim escaneig, o None."""
+        return self._stats.get(path)
+
+    def duplicates(self, idat_only: bool = False, workers: Optional[int] = None,
+                   cache=None) -> List[List[str]]:
+        """
+        Grups de PNG de l'últim escaneig amb contingut idèntic (paths
+        absoluts, el primer de cada grup en ordre d'escaneig és el que es
+        conservaria). Només es llegeixen els arxius que comparteixen mida amb
+        algun altre; amb idat_only=True es comparen només els píxels (vegeu
+        Duplicates.py).
+        """
+        from Duplicates import find_duplicates
+        return find_duplicates(self._stats, idat_only=idat_only, workers=workers, cache=cache)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadístiques d'ús de la classe (vegeu Stats.py; buides si no està activat)."""
+        import Stats
+        return Stats.stats("ImageFiles")
+
+    def __len__(self) -> int:
+        return len(self._arxius_actuals)
+
+    def __str__(self) -> str:
+        return f"<ImageFiles: {len(self)} arxius PNG>"
@@ -19,26 +19,156 @@ Mètodes a implementar:
 
     - get_uuid(file: str) -> str
         Retorna el UUID associat a l'arxiu, si ja ha estat generat.
-        Si no existeix, retorna None.
+        Si no existeix, retorna None. Si el path exacte no hi és, accepta
+        coincidències parcials per sufix de components (p.ex.
+        "generated_images/city_001.png" troba "city_001.png"), excepte
+        si es crida amb exact=True.
 
     - remove_uuid(uuid: str) -> None
         Elimina el UUID del registre d'identificadors actius.
         Després d'eliminar-lo, aquest UUID es podrà tornar a utilitzar.
 
+    - get_path(uuid: str) -> str
+        Retorna el path canònic associat a l'UUID, o None.
+
+    - generate_uuids(paths) / remove_uuids(uuids)
+        Versions en lot de generate_uuid() i remove_uuid().
+
+    - resolve_many(paths) -> List[str]
+        Versió en lot de get_uuid(): canonicalitza cada path una sola vegada
+        i el resol contra el mapa path -> uuid (i el trie de sufixos si cal).
+
 Notes:
     - Els UUID han de seguir el format estàndard (128 bits)
     - Podeu utilitzar la funció cfg.get_uuid() com a base
     - Els UUID s'emmagatzemen com a strings
     - Un UUID només es pot generar una vegada (fins que s'elimini)
 """
+import heapq
 import os
 import cfg
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional
+
+def _segments(path: str) -> List[str]:
+    """Components d'un path amb separador '/', sense buits ni '.'."""
+    return [c for c in path.replace("\\", "/").split("/") if c and c != "."]
+
+
+class _Node:
+    __slots__ = ("children", "key", "seq", "n", "heap")
+
+    def __init__(self):
+        self.children = {}
+        self.key = None     # path complet que acaba en aquest node
+        self.seq = 0        # ordre de registre del path (per desempats)
+        self.n = 0          # paths vius al subarbre
+        self.heap = []      # heap de (seq, key) del subarbre (amb esborrats pendents)
+
+
+class _SuffixTrie:
+    """
+    Trie sobre els components dels paths llegits des del nom de l'arxiu cap
+    a l'arrel ("sub/dir/img.png" -> img.png, dir, sub). Un path és sufix d'un
+    altre (alineat a components) si i només si un és ancestre de l'altre al
+    trie, de manera que les consultes de sufix costen O(profunditat).
+
+    Cada node guarda en un heap els (seq, key) del seu subarbre per saber-ne
+    el mínim. Esborrar no toca els heaps (l'arrel pot tenir un fill per cada
+    nom d'arxiu): les entrades mortes es descarten quan arriben al capdamunt
+    o quan ja són més que les vives, i així remove() costa O(profunditat).
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        # key -> seq dels paths vius (per reconèixer les entrades mortes)
+        self._vius: Dict[str, int] = {}
+
+    def insert(self, key: str, seq: int) -> None:
+        if key in self._vius:
+            self.remove(key)
+        item = (seq, key)
+        node = self._root
+        node.n += 1
+        heapq.heappush(node.heap, item)
+        for c in reversed(_segments(key)):
+            nxt = node.children.get(c)
+            if nxt is None:
+                nxt = node.children[c] = _Node()
+            node = nxt
+            node.n += 1
+            heapq.heappush(node.heap, item)
+        node.key = key
+        node.seq = seq
+        self._vius[key] = seq
+
+    def remove(self, key: str) -> None:
+        if self._vius.pop(key, None) is None:
+            return
+        segs = list(reversed(_segments(key)))
+        node = self._root
+        cami = [node]
+        for c in segs:
+            node = node.children[c]
+            cami.append(node)
+        node.key = None
+        for i, n in enumerate(cami):
+            n.n -= 1
+            if i > 0 and n.n == 0:
+                # el subarbre s'ha quedat buit: fora sencer
+                del cami[i - 1].children[segs[i - 1]]
+                break
+            if len(n.heap) > 2 * n.n + 8:
+                self._compactar(n)
+
+    def _viu(self, item) -> bool:
+        return self._vius.get(item[1]) == item[0]
+
+    def _compactar(self, node: _Node) -> None:
+        node.heap = [it for it in node.heap if self._viu(it)]
+        heapq.heapify(node.heap)
+
+    def _millor(self, node: _Node):
+        """(seq, key) mínim dels paths vius del subarbre de `node`, o None."""
+        heap = node.heap
+        while heap and not self._viu(heap[0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def match(self, path: str) -> Optional[str]:
+        """
+        Retorna el path registrat que és sufix de `path` o del qual `path` és
+        sufix (comparant components sencers). Si n'hi ha diversos, guanya el
+        registrat primer.
+        """
+        segs = _segments(path)
+        if not segs:
+            return None
+        node = self._root
+        best = None
+        for c in reversed(segs):
+            node = node.children.get(c)
+            if node is None:
+                break
+            # un path registrat que acaba aquí és sufix de la consulta
+            if node.key is not None and (best is None or (node.seq, node.key) < best):
+                best = (node.seq, node.key)
+        else:
+            # la consulta sencera és sufix de tots els paths del subarbre
+            millor = self._millor(node)
+            if millor is not None and (best is None or millor < best):
+                best = millor
+        return best[1] if best else None
+
 
 class ImageID:
     def __init__(self):
         # map: path_canonic -> uuid_str
         self._dic_uuids = {}
+        # map invers: uuid_str -> path_canonic (col·lisions i esborrats en O(1))
+        self._dic_paths = {}
+        # índex de sufixos per a les cerques parcials de get_uuid()
+        self._sufixos = _SuffixTrie()
+        self._seq = 0
 
     def _normalize(self, file: str) -> str:
         """Normalitza el path per buscar coincidències"""
@@ -58,6 +188,33 @@ class ImageID:
         except Exception:
             return file.replace("\\", "/") if isinstance(file, str) else ""
 
+    def _normalitzador(self):
+        """
+        Retorna una funció equivalent a _normalize() per a moltes crides
+        seguides: l'arrel absoluta es descompon una sola vegada i el path
+        relatiu es calcula comparant components, sense os.path.relpath().
+        """
+        try:
+            arrel = [c for c in os.path.abspath(cfg.config.root_dir).split("/") if c]
+        except Exception:
+            return self._normalize
+        if os.sep != "/":
+            # relpath() de Windows té casos propis (unitats, majúscules)
+            return self._normalize
+        n_arrel = len(arrel)
+        abspath = os.path.abspath
+
+        def normalitzar(file: str) -> str:
+            parts = [c for c in abspath(file).split("/") if c]
+            comuns = 0
+            for a, b in zip(arrel, parts):
+                if a != b:
+                    break
+                comuns += 1
+            rel = [".."] * (n_arrel - comuns) + parts[comuns:]
+            return "/".join(rel).replace("\\", "/") if rel else "."
+        return normalitzar
+
     def generate_uuid(self, file: str) -> Optional[str]:
         if not file or not isinstance(file, str):
             print("WARNING (ImageID): fitxer invàlid a generate_uuid().")
@@ -80,41 +237,93 @@ class ImageID:
             return None
 
         # Si l'UUID ja està assignat a un altre path, denunciem col·lisió
-        if uuid_str in self._dic_uuids.values():
+        if uuid_str in self._dic_paths:
             print(f"WARNING (ImageID): col·lisió d'UUID detectada ({uuid_str}). Fitxer ignorat.")
             return None
 
         self._dic_uuids[path_key] = uuid_str
+        self._dic_paths[uuid_str] = path_key
+        self._sufixos.insert(path_key, self._seq)
+        self._seq += 1
         return uuid_str
 
-    def get_uuid(self, file: str) -> Optional[str]:
+    def generate_uuids(self, paths: Iterable[str]) -> List[Optional[str]]:
+        """Crida generate_uuid() per a cada path; retorna els UUID en el mateix ordre."""
+        return [self.generate_uuid(p) for p in paths]
+
+    def get_uuid(self, file: str, exact: bool = False) -> Optional[str]:
         if not file or not isinstance(file, str):
             return None
         path_key = self._normalize(file)
         if path_key in self._dic_uuids:
             return self._dic_uuids[path_key]
-        # Intentem matches parcials: buscar si qualsevol key acaba o conté el path proporcionat
+        if exact:
+            return None
+        if file in self._dic_uuids:
+            return self._dic_uuids[file]
+        # Intentem matches parcials: un path registrat que acabi amb el path
+        # proporcionat o a l'inrevés (per components sencers, via el trie)
         try:
-            for k, v in self._dic_uuids.items():
-                if k == file or k.endswith(file) or file.endswith(k):
-                    return v
+            k = self._sufixos.match(file)
         except Exception:
-            pass
-        return None
+            k = None
+        return self._dic_uuids.get(k) if k is not None else None
+
+    def resolve_many(self, paths: Iterable[str]) -> List[Optional[str]]:
+        """
+        Resol una llista de paths a UUID amb el mateix criteri que get_uuid():
+        path canònic exacte, path tal qual i, si no, coincidència per sufix.
+        Cada path diferent es canonicalitza i es busca una sola vegada.
+        Retorna els UUID en el mateix ordre (None pels no trobats).
+        """
+        dic = self._dic_uuids
+        normalitzar = self._normalitzador()
+        resolts: Dict[str, Optional[str]] = {}
+        res: List[Optional[str]] = []
+        for file in paths:
+            if not file or not isinstance(file, str):
+                res.append(None)
+                continue
+            if file in resolts:
+                res.append(resolts[file])
+                continue
+            path_key = normalitzar(file)
+            uuid = dic.get(path_key)
+            if uuid is None:
+                uuid = dic.get(file)
+            if uuid is None:
+                try:
+                    k = self._sufixos.match(file)
+                    if k is None and path_key != file:
+                        k = self._sufixos.match(path_key)
+                except Exception:
+                    k = None
+                uuid = dic.get(k) if k is not None else None
+            resolts[file] = uuid
+            res.append(uuid)
+        return res
+
+    def get_path(self, uuid: str) -> Optional[str]:
+        if not uuid:
+            return None
+        return self._dic_paths.get(uuid)
 
     def remove_uuid(self, uuid: str) -> None:
         if not uuid:
             return
-        try:
-            to_del = None
-            for k, v in list(self._dic_uuids.items()):
-                if v == uuid:
-                    to_del = k
-                    break
-            if to_del:
-                del self._dic_uuids[to_del]
-        except Exception:
-            pass
+        path_key = self._dic_paths.pop(uuid, None)
+        if path_key is not None:
+            self._dic_uuids.pop(path_key, None)
+            self._sufixos.remove(path_key)
+
+    def remove_uuids(self, uuids: Iterable[str]) -> None:
+        for u in uuids:
+            self.remove_uuid(u)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadístiques d'ús de la classe (vegeu Stats.py; buides si no està activat)."""
+        import Stats
+        return Stats.stats("ImageID")
 
     def __len__(self) -> int:
         try:
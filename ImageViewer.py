@@ -25,9 +25,15 @@ Mètodes a implementar:
         - UUID
         - Path de l'arxiu
 
-    - show_file(file: str) -> None
+    - print_images(uuids, fmt="text", out=None) -> int
+        Informe de moltes imatges alhora en format "text", "csv" o "jsonl",
+        escrit a blocs a `out` (per defecte sys.stdout).
+
+    - show_file(file: str, uuid: str = None, preview: bool = None) -> None
         Mostra la imatge especificada utilitzant PIL.
         Aquesta funció NO espera que la imatge es tanqui (asíncrona).
+        Si es coneix l'UUID i el visor té les previews activades, mostra
+        la miniatura (ThumbnailCache) en lloc de la imatge completa.
 
     - show_image(uuid: str, mode: int) -> None
         Combina print_image() i show_file() segons el mode especificat:
@@ -38,6 +44,14 @@ Mètodes a implementar:
         Aquesta funció ha d'esperar que l'usuari tanqui la imatge abans
         de retornar (síncrona). Podeu utilitzar input() per fer una pausa.
 
+    - prefetch(uuids) -> None
+        Prepara en segon pla les miniatures de les imatges que es mostraran.
+
+El visor treballa sobre la instància d'ImageData que se li passa al
+constructor (la de la col·lecció) i, per defecte, mostra miniatures de
+cfg.THUMBNAIL_SIZE píxels; ImageViewer(preview=False) mostra les imatges
+a resolució completa.
+
 Notes:
     - Utilitzeu cfg.DISPLAY_MODE per determinar el comportament per defecte
     - Per mostrar imatges: img.show() de PIL
@@ -45,58 +59,135 @@ Notes:
     - El format de sortida ha de ser llegible i ben organitzat
 """
 import cfg
+import csv
+import io
+import json
 import os.path
-from PIL import Image
+import sys
+
+from typing import Iterable, Optional, TextIO
+from ThumbnailCache import ThumbnailCache
 
 try:
     from ImageData import ImageData
 except ImportError:
     print("ERROR: NO ÉS POT IMPORTAR LA CLASSE (ImageData)")
+
+# Formats de print_images() i columnes dels formats csv/jsonl (columna, camp)
+_FORMATS = ("text", "csv", "jsonl")
+_COLUMNES = (("prompt", "Prompt"), ("seed", "Seed"), ("cfg_scale", "CFG_Scale"),
+             ("steps", "Steps"), ("sampler", "Sampler"), ("model", "Model"),
+             ("generated", "Generated"), ("created_date", "Created_Date"))
+_NONE = "None"
+_MIDA_BLOC = 1 << 16
+
 class ImageViewer:
-    def __init__(self):
-        pass
-    def print_image(uuid:str):
-        dades = ImageData()
-        dims = dades.get_dimensions(uuid)
-        prompt = dades.get_prompt(uuid)
-        model = dades.get_model(uuid)
-        seed = dades.get_seed(uuid)
-        cfg_scale = dades.get_cfg_scale(uuid)
-        steps = dades.get_steps(uuid)
-        sampler = dades.get_sampler(uuid)
-        generated = dades.get_generated(uuid)
-        created_date = dades.get_created_date(uuid)
-
-        path_relatiu = dades._obtenir_dada(uuid,"file")
-        print("-"*30)
-        print("\n")
-        print(f"Metadades de la imatge: {uuid}")
-        print(f"Dimensions: {dims}")
-        print(f"Prompt {prompt}")
-        print(f"Model: {model}")
-        print(f"Seed: {seed}")
-        print(f"CFG SCALE {cfg_scale}")
-        print(f"Steps: {steps}")
-        print(f"Sampler: {sampler}")
-        print(f"Generated: {generated}")
-        print(f"Created date: {created_date}")
-        print(f"Arxiu: {path_relatiu}")
+    def __init__(self, image_data: Optional["ImageData"] = None,
+                 thumbnails: Optional[ThumbnailCache] = None, preview: bool = True):
+        self.image_data = image_data if image_data is not None else ImageData()
+        self.preview = preview
+        if thumbnails is None and preview:
+            thumbnails = ThumbnailCache()
+        self.thumbnails = thumbnails
+
+    def print_image(self, uuid: str):
+        self.print_images((uuid,))
 
+    def print_images(self, uuids: Iterable[str], fmt: str = "text", out: Optional[TextIO] = None) -> int:
+        """
+        Escriu les metadades de totes les imatges de `uuids` a `out` (per
+        defecte sys.stdout) en format "text" (el de print_image), "csv" o
+        "jsonl". Els registres s'acumulen en un buffer i s'escriuen a blocs,
+        de manera que un informe gran es pot redirigir a un arxiu o a una
+        altra eina sense una escriptura per línia. Retorna quants n'ha escrit.
+        """
+        if fmt not in _FORMATS:
+            raise ValueError(f"format desconegut: {fmt!r} (text, csv o jsonl)")
+        if out is None:
+            out = sys.stdout
+        formatar = getattr(self, "_format_" + fmt)
+        bloc = io.StringIO()
+        escriptor = csv.writer(bloc, lineterminator="\n") if fmt == "csv" else None
+        if escriptor is not None:
+            escriptor.writerow(["uuid", "file", "width", "height"] + [c for c, _ in _COLUMNES])
+
+        # Es formata directament dels camps del registre (_ImageRecord), sense
+        # construir el dict de metadades de cada imatge
+        registres = self.image_data._data_storage
+        n = 0
+        for uuid in uuids:
+            rec = registres.get(uuid) if uuid else None
+            if rec is None:
+                dims, path = (0, 0), ""
+            else:
+                dims, path = (rec.width, rec.height), rec.file_path
+            if escriptor is not None:
+                escriptor.writerow(formatar(uuid, rec, dims, path))
+            else:
+                bloc.write(formatar(uuid, rec, dims, path))
+            n += 1
+            if bloc.tell() >= _MIDA_BLOC:
+                out.write(bloc.getvalue())
+                bloc.seek(0)
+                bloc.truncate()
+        out.write(bloc.getvalue())
+        if hasattr(out, "flush"):
+            out.flush()
+        return n
+
+    @staticmethod
+    def _format_text(uuid: str, rec, dims, path) -> str:
+        # rec és None si l'UUID no és a la col·lecció: tots els camps valen _NONE
+        prompt = getattr(rec, "Prompt", _NONE)
         if prompt:
             prompt_curt = (prompt[:100] + "...") if len(prompt) > 100 else prompt
-            print(f"  Prompt:     {prompt_curt}")
         else:
-            print(f"  Prompt:     {None}")
-            
-        print("-" * 30 + "\n")
+            prompt_curt = None
+        return ("-" * 30 + "\n\n\n"
+                f"Metadades de la imatge: {uuid}\n"
+                f"Dimensions: {tuple(dims)}\n"
+                f"Prompt {prompt}\n"
+                f"Model: {getattr(rec, 'Model', _NONE)}\n"
+                f"Seed: {getattr(rec, 'Seed', _NONE)}\n"
+                f"CFG SCALE {getattr(rec, 'CFG_Scale', _NONE)}\n"
+                f"Steps: {getattr(rec, 'Steps', _NONE)}\n"
+                f"Sampler: {getattr(rec, 'Sampler', _NONE)}\n"
+                f"Generated: {getattr(rec, 'Generated', _NONE)}\n"
+                f"Created date: {getattr(rec, 'Created_Date', _NONE)}\n"
+                f"Arxiu: {path}\n"
+                f"  Prompt:     {prompt_curt}\n"
+                + "-" * 30 + "\n\n")
+
+    @staticmethod
+    def _format_csv(uuid: str, rec, dims, path) -> list:
+        fila = [uuid, path, dims[0], dims[1]]
+        for _, camp in _COLUMNES:
+            v = getattr(rec, camp, _NONE)
+            fila.append("" if v == _NONE else v)
+        return fila
 
-    def show_file(self, file: str):
+    @staticmethod
+    def _format_jsonl(uuid: str, rec, dims, path) -> str:
+        registre = {"uuid": uuid, "file": path, "width": dims[0], "height": dims[1]}
+        for col, camp in _COLUMNES:
+            v = getattr(rec, camp, _NONE)
+            registre[col] = None if v == _NONE else v
+        return json.dumps(registre, ensure_ascii=False) + "\n"
+
+    def show_file(self, file: str, uuid: Optional[str] = None, preview: Optional[bool] = None):
         if not file:
             print("ERROR (show_file): El path del fitxer és buit.")
             return False
+        if preview is None:
+            preview = self.preview
+        path_complet = os.path.join(cfg.get_root(), file)
         try:
-            path_complet = os.path.join(cfg.get_root,file) 
-            img = Image.open(path_complet)
+            img = None
+            if preview and uuid and self.thumbnails is not None:
+                img = self.thumbnails.thumbnail(uuid, path_complet)
+            if img is None:
+                from PIL import Image
+                img = Image.open(path_complet)
             img.show()
             return True
         except FileNotFoundError:
@@ -110,7 +201,7 @@ class ImageViewer:
             mode = cfg.DISPLAY_MODE
         
     # Obtenim el path relatiu
-        dades = ImageData()
+        dades = self.image_data
         path_relatiu = dades._obtenir_dada(uuid, "file")
         
         if not path_relatiu:
@@ -125,10 +216,10 @@ class ImageViewer:
             
         elif mode == 1:  # Metadades + Imatge
             self.print_image(uuid)
-            imatge_mostrada = self.show_file(path_relatiu)
+            imatge_mostrada = self.show_file(path_relatiu, uuid)
             
         elif mode == 2:  # Només imatge
-            imatge_mostrada = self.show_file(path_relatiu)
+            imatge_mostrada = self.show_file(path_relatiu, uuid)
             
         else:
             print(f"ERROR (show_image): Mode '{mode}' desconegut.")
@@ -139,6 +230,19 @@ class ImageViewer:
             print("Imatge mostrada en una finestra separada.")
             input("... prem Enter per continuar ...")
     
+    def prefetch(self, uuids: Iterable[str]) -> None:
+        """Genera en segon pla les miniatures de `uuids` (si hi ha previews)."""
+        if not self.preview or self.thumbnails is None:
+            return
+        root = cfg.get_root()
+        items = []
+        for u in uuids:
+            rel = self.image_data._obtenir_dada(u, "file")
+            if rel:
+                items.append((u, os.path.join(root, rel)))
+        if items:
+            self.thumbnails.prefetch(items)
+
     # --- MÈTODES OBLIGATORIS PER AL VPL ---
     
     def __len__(self) -> int:
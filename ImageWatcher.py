@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+ImageWatcher.py : Mode "watch" que manté el catàleg al dia amb el disc.
+
+Observa el directori de la col·lecció i aplica a ImageID i ImageData les
+altes, modificacions i baixes de PNG en lots agrupats (debounce), en lloc de
+tornar a executar ImageFiles.reload_fs() periòdicament.
+
+Backends:
+    - "inotify": Linux, via ctypes sobre la libc (sense dependències externes).
+      Cada directori té el seu watch; els directoris nous s'afegeixen sols.
+    - "poll":    qualsevol plataforma. Crida ImageFiles.reload_fs(incremental=True)
+      cada `interval` segons, que només torna a llistar els directoris amb
+      un mtime diferent.
+    - "auto":    inotify si està disponible, si no poll.
+
+Ús:
+    watcher = ImageWatcher(gestor_arxius, gestor_id, gestor_dades, on_batch=print)
+    watcher.start()      # fil en segon pla
+    ...
+    watcher.stop()
+
+    # o bé, de manera síncrona:
+    watcher.sync()
+    watcher.poll_once(timeout=1.0)
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import cfg
+
+# Tipus d'esdeveniment en cru
+_CANVI = "changed"
+_BAIXA = "removed"
+_BAIXA_DIR = "dir_removed"
+_RESYNC = "resync"
+
+
+class WatchBatch(NamedTuple):
+    """Canvis aplicats al catàleg en un lot (paths absoluts)."""
+    added: List[str]
+    modified: List[str]
+    removed: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+#############################################################################
+#
+# Backend inotify (Linux)
+#
+#############################################################################
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+
+_MASCARA = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE |
+            _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+def _libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # comprova que el símbol existeix
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class _InotifyBackend:
+    def __init__(self, root: str):
+        self._libc = _libc()
+        if self._libc is None:
+            raise OSError("inotify no disponible")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._wds: Dict[int, str] = {}
+        self._afegir_arbre(root)
+
+    def _afegir_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _MASCARA)
+        if wd >= 0:
+            self._wds[wd] = path
+
+    def _afegir_arbre(self, root: str, events: Optional[list] = None) -> None:
+        """Afegeix watches a `root` i els seus subdirectoris; opcionalment
+        informa dels PNG que ja hi són (directori nou o mogut cap a dins)."""
+        for base, dirs, files in os.walk(root):
+            self._afegir_watch(base)
+            if events is not None:
+                for f in files:
+                    if f.lower().endswith(".png"):
+                        events.append((_CANVI, os.path.join(base, f)))
+
+    def _treure_arbre(self, root: str) -> None:
+        """Treu els watches de `root` i dels seus subdirectoris (directori mogut
+        fora o esborrat): si no, seguirien l'inode i informarien amb el path antic."""
+        prefix = root.rstrip(os.sep) + os.sep
+        for wd, path in list(self._wds.items()):
+            if path == root or path.startswith(prefix):
+                del self._wds[wd]
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[str, Optional[str]]]:
+        try:
+            llest, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        except (OSError, ValueError):
+            return []
+        if not llest:
+            return []
+        events: List[Tuple[str, Optional[str]]] = []
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, pos)
+            nom = buf[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+
+            if mask & _IN_Q_OVERFLOW:
+                events.append((_RESYNC, None))
+                continue
+            base = self._wds.get(wd)
+            if mask & _IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            if base is None:
+                continue
+            if mask & _IN_MOVE_SELF:
+                # el directori vigilat (p.ex. l'arrel) s'ha mogut sense que el
+                # pare estigui vigilat: tot el que hi havia a sota és baixa
+                self._treure_arbre(base)
+                events.append((_BAIXA_DIR, base))
+                continue
+            if not nom:
+                continue
+            path = os.path.join(base, os.fsdecode(nom))
+
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._afegir_arbre(path, events)
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    self._treure_arbre(path)
+                    events.append((_BAIXA_DIR, path))
+                continue
+            if not path.lower().endswith(".png"):
+                continue
+            if mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                events.append((_CANVI, path))
+            elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                events.append((_BAIXA, path))
+        return events
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+#############################################################################
+#
+# Watcher
+#
+#############################################################################
+
+class ImageWatcher:
+    def __init__(self, files, ids, data, root: Optional[str] = None,
+                 backend: str = "auto", interval: float = 1.0, debounce: float = 0.5,
+                 on_batch: Optional[Callable[[WatchBatch], None]] = None):
+        self.files = files
+        self.ids = ids
+        self.data = data
+        self.root = os.path.abspath(root or cfg.get_root())
+        self.interval = interval
+        self.debounce = debounce
+        self.on_batch = on_batch
+        # Tot canvi al catàleg passa per aquest lock (un sol escriptor)
+        self.lock = threading.RLock()
+
+        self._inotify: Optional[_InotifyBackend] = None
+        if backend in ("auto", "inotify"):
+            try:
+                self._inotify = _InotifyBackend(self.root)
+            except OSError:
+                if backend == "inotify":
+                    raise
+        elif backend != "poll":
+            raise ValueError(f"backend desconegut: {backend!r}")
+        self.backend = "inotify" if self._inotify else "poll"
+
+        # path -> tipus d'esdeveniment pendent, i instant de l'últim esdeveniment
+        self._pendents: Dict[str, str] = {}
+        self._ultim = 0.0
+        self._resync = False
+        self._fil: Optional[threading.Thread] = None
+        self._aturar = threading.Event()
+
+    # --- Aplicació dels canvis al catàleg ---
+    def sync(self) -> WatchBatch:
+        """Escaneig (incremental) complet i aplicació de totes les diferències."""
+        with self.lock:
+            self.files.reload_fs(self.root, incremental=True)
+            return self._aplicar(self.files.files_added(), self.files.files_modified(),
+                                 self.files.files_removed())
+
+    def _aplicar(self, afegits: List[str], modificats: List[str], eliminats: List[str]) -> WatchBatch:
+        a_llegir = []
+        for path in eliminats:
+            uuid = self.ids.get_uuid(path, exact=True)
+            if uuid:
+                self.data.remove_image(uuid)
+                self.ids.remove_uuid(uuid)
+        for path in afegits:
+            uuid = self.ids.generate_uuid(path)
+            if uuid:
+                self.data.add_image(uuid, path)
+                a_llegir.append(uuid)
+        for path in modificats:
+            uuid = self.ids.get_uuid(path, exact=True)
+            if uuid:
+                a_llegir.append(uuid)
+        if a_llegir:
+            self.data.load_metadata_many(a_llegir)
+        lot = WatchBatch(afegits, modificats, eliminats)
+        if lot and self.on_batch:
+            self.on_batch(lot)
+        return lot
+
+    def _flush(self) -> WatchBatch:
+        with self.lock:
+            if self._resync:
+                self._resync = False
+                self._pendents = {}
+                return self.sync()
+            pendents, self._pendents = self._pendents, {}
+            canvis = [p for p, t in pendents.items() if t == _CANVI and os.path.isfile(p)]
+            baixes = [p for p, t in pendents.items() if t == _BAIXA or (t == _CANVI and not os.path.isfile(p))]
+            coneguts = self.files._arxius_actuals
+            baixes = [p for p in baixes if p in coneguts]
+            self.files.update_files(changed=canvis, removed=baixes)
+            return self._aplicar(self.files.files_added(), self.files.files_modified(),
+                                 self.files.files_removed())
+
+    # --- Bucle ---
+    def poll_once(self, timeout: float = 0.0) -> WatchBatch:
+        """
+        Recull esdeveniments durant com a molt `timeout` segons i, si el lot
+        pendent porta `debounce` segons sense rebre'n de nous, l'aplica.
+        """
+        if self._inotify is None:
+            # polling: cada crida és un escaneig incremental
+            if timeout:
+                time.sleep(timeout)
+            return self.sync()
+
+        for tipus, path in self._inotify.read(timeout):
+            self._ultim = time.monotonic()
+            if tipus == _RESYNC:
+                self._resync = True
+            elif tipus == _BAIXA_DIR:
+                prefix = path.rstrip(os.sep) + os.sep
+                for p in self.files._arxius_actuals:
+                    if p.startswith(prefix):
+                        self._pendents[p] = _BAIXA
+            else:
+                self._pendents[path] = tipus
+        if (self._pendents or self._resync) and time.monotonic() - self._ultim >= self.debounce:
+            return self._flush()
+        return WatchBatch([], [], [])
+
+    def _bucle(self) -> None:
+        while not self._aturar.is_set():
+            try:
+                if self._inotify is None:
+                    self.sync()
+                    self._aturar.wait(self.interval)
+                else:
+                    self.poll_once(timeout=min(self.interval, self.debounce))
+            except Exception as e:
+                print(f"WARNING (ImageWatcher): {e}")
+
+    def start(self) -> None:
+        """Sincronitza el catàleg i comença a vigilar en un fil en segon pla."""
+        if self._fil is not None:
+            return
+        self.sync()
+        self._aturar.clear()
+        self._fil = threading.Thread(target=self._bucle, name="ImageWatcher", daemon=True)
+        self._fil.start()
+
+    def stop(self) -> None:
+        self._aturar.set()
+        if self._fil is not None:
+            self._fil.join()
+            self._fil = None
+        # Apliquem el que quedi pendent
+        if self._pendents or self._resync:
+            self._flush()
+
+    def close(self) -> None:
+        self.stop()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        return f"<ImageWatcher: {self.root} ({self.backend})>"
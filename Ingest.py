@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Ingest.py : Càrrega de la col·lecció en streaming.
+
+Encadena ImageFiles.iter_scan() -> ImageID.generate_uuid() ->
+ImageData.add_image() / load_metadata() de manera que la lectura de
+metadades comença amb el primer arxiu trobat, en lloc d'esperar que
+reload_fs() acabi de recórrer tot l'arbre.
+
+    ImageFiles.iter_scan  --(cua limitada)-->  lectura PNG (+ dedup)  --(en ordre)-->  UUID + add_image
+        fil productor                          fils treballadors                    fil que crida
+
+Tota escriptura a ImageID i ImageData es fa des del fil que consumeix el
+generador (un sol escriptor); els treballadors només llegeixen arxius.
+
+Ús:
+    for uuid in ingest_stream(gestor_arxius, gestor_id, gestor_dades):
+        ...  # la imatge ja té les metadades carregades
+"""
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+import cfg
+
+_FI = object()
+
+
+def _posar(cua: "queue.Queue", item, aturar: threading.Event) -> bool:
+    """cua.put() que es rendeix si el consumidor ha plegat (la cua pot estar plena)."""
+    while not aturar.is_set():
+        try:
+            cua.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produir(files, root: str, cua: "queue.Queue", aturar: threading.Event) -> None:
+    try:
+        for rel in files.iter_scan(root):
+            if not _posar(cua, rel, aturar):
+                return
+        _posar(cua, _FI, aturar)
+    except BaseException as e:  # l'error es torna a llençar al consumidor
+        _posar(cua, e, aturar)
+
+
+def ingest_stream(files, ids, data, root: Optional[str] = None, workers: Optional[int] = None,
+                  queue_size: int = 1024, batch: int = 32, phash: bool = False,
+                  dedup=None) -> Iterator[str]:
+    """
+    Escaneja `root` (per defecte cfg.get_root()) i retorna un generador
+    d'UUID, en ordre de descobriment, de les imatges ja registrades i amb les
+    metadades carregades. El resultat final és el mateix que el de
+    reload_fs() + generate_uuid() + add_image() + load_metadata().
+
+    `queue_size` limita tant els paths pendents de processar com les lectures
+    en curs, de manera que la memòria no creix amb la mida de l'arbre.
+    Els arxius es llegeixen en lots de com a molt `batch` per treballador.
+    Amb phash=True els treballadors també calculen el hash perceptual de
+    cada imatge (com ImageData.load_phash_many()).
+
+    Amb `dedup` (un Duplicates.Deduplicator) els arxius amb el mateix
+    contingut que un de ja registrat no reben UUID ni entren a ImageData;
+    queden apuntats a dedup.collapsed.
+
+    Les imatges que ja eren a ImageID i ImageData conserven UUID i registre
+    i només se'n recarreguen les metadades. Les imatges es registren quan
+    se n'aplica la lectura, just abans de retornar-les: si es deixa de
+    consumir abans d'hora (break, close() o un error), no s'esperen les
+    lectures encuades i no queda cap imatge registrada sense metadades.
+    """
+    root = os.path.abspath(root or cfg.get_root())
+    if workers is None:
+        workers = os.cpu_count() or 1
+    queue_size = max(1, queue_size)
+    batch = max(1, batch)
+
+    cua: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    aturar = threading.Event()
+    productor = threading.Thread(target=_produir, args=(files, root, cua, aturar),
+                                 name="ingest-scan", daemon=True)
+    productor.start()
+
+    llegir_metadades = data._llegir_resultat
+    llegir_phash = data._llegir_phash if phash else None
+
+    def processar(lot):
+        # als treballadors: tota la lectura d'arxius (metadades, phash i la
+        # clau / hash de dedup); al fil que consumeix només li queda aplicar
+        res = []
+        for full in lot:
+            pre = dedup.prepare(full, files.file_stat(full)) if dedup is not None else None
+            res.append((pre, llegir_metadades(full), llegir_phash(full) if phash else None))
+        return res
+
+    en_curs: deque = deque()
+    n_en_curs = 0
+    nou: list = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            try:
+                acabat = False
+                while not acabat or en_curs:
+                    # Omplim el pipeline fins al límit de lectures en curs, en
+                    # petits lots per no pagar un future per arxiu
+                    while not acabat and n_en_curs + len(nou) < queue_size:
+                        # si la lectura més antiga ja està llesta, primer l'apliquem
+                        if not nou and en_curs and en_curs[0][1].done():
+                            break
+                        try:
+                            # si no hi ha res a aplicar, esperem el següent path
+                            bloquejar = not en_curs and not nou
+                            item = cua.get(timeout=None if bloquejar else 0)
+                        except queue.Empty:
+                            break
+                        if item is _FI:
+                            acabat = True
+                            break
+                        if isinstance(item, BaseException):
+                            raise item
+                        nou.append(os.path.join(root, item))
+                        if len(nou) >= batch:
+                            en_curs.append((nou, pool.submit(processar, nou)))
+                            n_en_curs += len(nou)
+                            nou = []
+                    if nou:
+                        en_curs.append((nou, pool.submit(processar, nou)))
+                        n_en_curs += len(nou)
+                        nou = []
+
+                    # Apliquem (en ordre) el lot de lectures més antic
+                    if en_curs:
+                        lot, fut = en_curs[0]
+                        resultats = fut.result()
+                        en_curs.popleft()
+                        n_en_curs -= len(lot)
+                        for full, (pre, res, ph) in zip(lot, resultats):
+                            if dedup is not None and dedup.resolve(full, *pre) is not None:
+                                continue
+                            # un path ja registrat conserva l'UUID i el registre:
+                            # només se'n tornen a llegir les metadades
+                            uuid = ids.get_uuid(full, exact=True)
+                            if uuid is None:
+                                uuid = ids.generate_uuid(full)
+                                if uuid is None:
+                                    print(f"ERROR: No s'ha pogut generar UUID per a {full}")
+                                    continue
+                            if uuid not in data._data_storage:
+                                data.add_image(uuid, full)
+                            if phash:
+                                data._aplicar_phash(uuid, *ph, notificar=False)
+                            data._aplicar_resultat(uuid, res)
+                            yield uuid
+            finally:
+                # Plegada abans d'hora (o error): no esperem els lots encuats,
+                # només els que ja s'estan llegint
+                aturar.set()
+                for _, fut in en_curs:
+                    fut.cancel()
+                pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        if data._cache is not None:
+            data._cache.flush()
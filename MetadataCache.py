@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+MetadataCache.py : Memòria cau persistent de metadades de PNG.
+
+Guarda, per a cada arxiu (path absolut canònic), el resultat ja normalitzat
+de llegir-ne les metadades i les dimensions juntament amb la signatura
+(size, mtime_ns) de l'arxiu en el moment de llegir-lo. Mentre la signatura no
+canviï, ImageData.load_metadata() no cal que torni a obrir el PNG.
+A la taula `hashes` hi guarda, amb la mateixa signatura, els hashos
+calculats a partir del contingut (p.ex. el dHash de load_phash_many()).
+
+La memòria cau és un arxiu SQLite (stdlib) dins el directori configurat a
+cfg.CACHE_DIR o el que es passi al constructor.
+
+Ús:
+    cache = MetadataCache("/tmp/ds_cache")
+    dades = ImageData(cache=cache)
+    ...
+    cache.flush()
+    print(cache.stats())   # {'hits': ..., 'misses': ..., 'invalidations': ...}
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import cfg
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    status    TEXT NOT NULL,
+    metadata  TEXT,
+    width     INTEGER NOT NULL,
+    height    INTEGER NOT NULL,
+    reason    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hashes (
+    path      TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    value     BLOB NOT NULL,
+    PRIMARY KEY (path, kind)
+)
+"""
+
+
+def signature(abs_path: str) -> Optional[Tuple[int, int]]:
+    """Retorna (size, mtime_ns) de l'arxiu o None si no existeix."""
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def canonical_key(abs_path: str) -> str:
+    """Clau de la memòria cau: path absolut real amb separadors '/'."""
+    return os.path.realpath(abs_path).replace(os.sep, "/")
+
+
+# Memòries cau obertes, per confirmar-ne les escriptures pendents en sortir
+_OBERTES: "weakref.WeakSet[MetadataCache]" = weakref.WeakSet()
+_atexit_registrat = False
+
+
+def _flush_a_sortida() -> None:
+    for cache in list(_OBERTES):
+        try:
+            cache.flush()
+        except Exception:
+            pass
+
+
+class MetadataCache:
+    FILENAME = "metadata_cache.sqlite3"
+
+    def __init__(self, directory: Optional[str] = None, commit_every: int = 1000,
+                 commit_interval: float = 1.0):
+        """
+        Les escriptures es confirmen (commit) en lots de `commit_every` o, com
+        a molt, `commit_interval` segons després de la primera pendent; la
+        resta es confirmen amb flush(), close() o en sortir del programa.
+        """
+        if not directory:
+            directory = cfg.config.cache_dir
+        if not directory:
+            raise ValueError("MetadataCache: no s'ha configurat cap directori (cfg.CACHE_DIR)")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, self.FILENAME)
+        self._lock = threading.Lock()
+        import sqlite3
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_ESQUEMA)
+        self._conn.commit()
+        self._commit_every = max(1, commit_every)
+        self._commit_interval = commit_interval
+        self._pendents = 0
+        self._primer_pendent = 0.0
+        # sense flush() explícit, SQLite desfaria les escriptures pendents
+        global _atexit_registrat
+        if not _atexit_registrat:
+            atexit.register(_flush_a_sortida)
+            _atexit_registrat = True
+        _OBERTES.add(self)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, abs_path: str, sig: Optional[Tuple[int, int]]):
+        """
+        Retorna el resultat guardat per a l'arxiu si la seva signatura coincideix
+        amb `sig`, o None (miss o invalidació).
+        """
+        if sig is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, status, metadata, width, height, reason "
+                "FROM metadata WHERE path = ?", (canonical_key(abs_path),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if (row[0], row[1]) != tuple(sig):
+                self.invalidations += 1
+                return None
+            self.hits += 1
+        meta = json.loads(row[3]) if row[3] is not None else None
+        return (row[2], meta, (row[4], row[5]), row[6])
+
+    def put(self, abs_path: str, sig: Optional[Tuple[int, int]], resultat) -> None:
+        """Guarda el resultat de llegir l'arxiu amb la signatura `sig`."""
+        if sig is None:
+            return
+        estat, meta, dims, motiu = resultat
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonical_key(abs_path), sig[0], sig[1], estat,
+                 json.dumps(meta, ensure_ascii=False) if meta is not None else None,
+                 int(dims[0]), int(dims[1]), motiu))
+            self._escrit()
+
+    def get_hash(self, abs_path: str, sig: Optional[Tuple[int, int]], kind: str) -> Optional[bytes]:
+        """
+        Hash de tipus `kind` (p.ex. "dhash") guardat per a l'arxiu, si la seva
+        signatura coincideix amb `sig`. No compta als hits/misses de metadades.
+        """
+        if sig is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, value FROM hashes WHERE path = ? AND kind = ?",
+                (canonical_key(abs_path), kind)).fetchone()
+        if row is None or (row[0], row[1]) != tuple(sig):
+            return None
+        return bytes(row[2])
+
+    def put_hash(self, abs_path: str, sig: Optional[Tuple[int, int]], kind: str, value: bytes) -> None:
+        if sig is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                (canonical_key(abs_path), kind, sig[0], sig[1], value))
+            self._escrit()
+
+    def discard(self, abs_path: str) -> None:
+        with self._lock:
+            clau = canonical_key(abs_path)
+            self._conn.execute("DELETE FROM metadata WHERE path = ?", (clau,))
+            self._conn.execute("DELETE FROM hashes WHERE path = ?", (clau,))
+            self._escrit()
+
+    def _escrit(self) -> None:
+        """Compta una escriptura pendent i fa commit si toca (amb el lock agafat)."""
+        ara = time.monotonic()
+        if not self._pendents:
+            self._primer_pendent = ara
+        self._pendents += 1
+        if self._pendents >= self._commit_every or ara - self._primer_pendent >= self._commit_interval:
+            self._conn.commit()
+            self._pendents = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pendents = 0
+
+    def close(self) -> None:
+        _OBERTES.discard(self)
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.invalidations = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        try:
+            with self._lock:
+                return self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        except Exception:
+            return 0
+
+    def __str__(self) -> str:
+        return f"<MetadataCache: {len(self)} entrades a {self.path}>"
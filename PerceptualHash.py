@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+PerceptualHash.py : Hash perceptual (dHash) i cerca de quasi-duplicats.
+
+dhash(abs_path)
+    Hash de 64 bits de l'aspecte de la imatge: es redueix a 9x8 píxels en
+    escala de grisos i cada bit indica si un píxel és més clar que el del
+    seu costat dret. Dues imatges gairebé iguals (mateix seed, petits canvis
+    de prompt, recompressió...) donen hashos a poca distància de Hamming.
+    És una funció de mòdul perquè es pugui executar dins d'un
+    ProcessPoolExecutor (vegeu ImageData.load_phash_many()).
+
+BKTree
+    Arbre BK sobre la distància de Hamming: respon "tots els hashos a
+    distància <= d de X" visitant només les branques que poden contenir-ne,
+    sense comparar amb tota la col·lecció. Els hashos idèntics comparteixen
+    node.
+
+PerceptualIndex
+    Manté un BKTree amb els hashos de les imatges d'un ImageData (com a
+    listener, igual que els índexs de SearchMetadata) i en dona els veïns
+    d'una imatge i els grups de quasi-duplicats.
+
+Ús:
+    dades.load_phash_many(uuids)
+    index = PerceptualIndex(dades)
+    index.within(uuid, 6)                 # [(uuid, distància), ...]
+    index.clusters(4)                     # [[uuid, uuid, ...], ...]
+"""
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+# Costat de la graella: MIDA x MIDA bits (64)
+MIDA = 8
+
+# Distància per defecte a partir de la qual dues imatges ja no es consideren
+# quasi-duplicades (sobre 64 bits)
+DISTANCIA = 6
+
+
+def dhash(abs_path: str) -> Optional[int]:
+    """Hash perceptual (dHash) de 64 bits de la imatge, o None si no es pot llegir."""
+    try:
+        import numpy as np
+        from PIL import Image
+
+        with Image.open(abs_path) as img:
+            # reducing_gap: primer Image.reduce() (factor enter, molt ràpid)
+            # i només el remostreig final sobre una imatge petita
+            petita = img.convert("L").resize((MIDA + 1, MIDA), Image.BOX, reducing_gap=2.0)
+        px = np.asarray(petita, dtype=np.int16)
+    except Exception:
+        return None
+    bits = px[:, 1:] > px[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def a_bytes(h: int) -> bytes:
+    return h.to_bytes(MIDA * MIDA // 8, "big")
+
+
+def de_bytes(b: bytes) -> int:
+    return int.from_bytes(b, "big")
+
+
+class BKTree:
+    """
+    Arbre BK de hashos enters. Cada node és una llista
+    [hash, uuids, fills] on fills és {distància al pare: node}.
+    Esborrar un UUID només el treu del seu node: els nodes buits continuen
+    fent de camí fins que n'hi ha prou per refer l'arbre (rebuild()).
+    """
+
+    def __init__(self):
+        self._arrel: Optional[list] = None
+        # hash -> node (per trobar els idèntics sense recórrer l'arbre)
+        self._nodes: Dict[int, list] = {}
+        self._buits = 0
+        self._n = 0
+
+    def add(self, h: int, uuid: str) -> None:
+        node = self._nodes.get(h)
+        if node is not None:
+            if not node[1]:
+                self._buits -= 1
+            if uuid not in node[1]:
+                node[1].add(uuid)
+                self._n += 1
+            return
+        nou = [h, {uuid}, {}]
+        self._nodes[h] = nou
+        self._n += 1
+        if self._arrel is None:
+            self._arrel = nou
+            return
+        node = self._arrel
+        while True:
+            d = hamming(h, node[0])
+            fill = node[2].get(d)
+            if fill is None:
+                node[2][d] = nou
+                return
+            node = fill
+
+    def remove(self, h: int, uuid: str) -> None:
+        node = self._nodes.get(h)
+        if node is None or uuid not in node[1]:
+            return
+        node[1].discard(uuid)
+        self._n -= 1
+        if not node[1]:
+            self._buits += 1
+            if self._buits > 1024 and self._buits * 2 > len(self._nodes):
+                self.rebuild()
+
+    def rebuild(self) -> None:
+        """Refà l'arbre sense els nodes buits."""
+        nodes = [n for n in self._nodes.values() if n[1]]
+        self._arrel = None
+        self._nodes = {}
+        self._buits = 0
+        self._n = 0
+        for h, uuids, _ in nodes:
+            for u in uuids:
+                self.add(h, u)
+
+    def search(self, h: int, distancia: int) -> Iterator[Tuple[int, Set[str], int]]:
+        """Genera (hash, uuids, distància) de tots els nodes a distància <= `distancia`."""
+        if self._arrel is None:
+            return
+        pila = [self._arrel]
+        while pila:
+            node = pila.pop()
+            d = hamming(h, node[0])
+            if d <= distancia and node[1]:
+                yield node[0], node[1], d
+            fills = node[2]
+            # desigualtat triangular: només els fills a distància d ± distancia
+            for k in range(max(0, d - distancia), d + distancia + 1):
+                fill = fills.get(k)
+                if fill is not None:
+                    pila.append(fill)
+
+    def hashes(self) -> Iterator[Tuple[int, Set[str]]]:
+        for h, node in self._nodes.items():
+            if node[1]:
+                yield h, node[1]
+
+    def __len__(self) -> int:
+        return self._n
+
+
+class PerceptualIndex:
+    def __init__(self, data):
+        self.data = data
+        self._tree = BKTree()
+        # uuid -> hash indexat
+        self._hashos: Dict[str, int] = {}
+        # uuid -> ordre d'arribada (per ordenar resultats com SearchMetadata)
+        self._ordre: Dict[str, int] = {}
+        self._seq = 0
+        for uuid in data._data_storage:
+            self.image_updated(uuid)
+        data.add_listener(self)
+
+    def drop(self) -> None:
+        self.data.remove_listener(self)
+        self._tree = BKTree()
+        self._hashos = {}
+        self._ordre = {}
+
+    # --- listener d'ImageData ---
+    def image_updated(self, uuid: str) -> None:
+        if uuid not in self._ordre:
+            self._ordre[uuid] = self._seq
+            self._seq += 1
+        h = self.data.get_phash(uuid)
+        previ = self._hashos.get(uuid)
+        if previ == h:
+            return
+        if previ is not None:
+            self._tree.remove(previ, uuid)
+            del self._hashos[uuid]
+        if h is not None:
+            self._tree.add(h, uuid)
+            self._hashos[uuid] = h
+
+    def image_removed(self, uuid: str) -> None:
+        self._ordre.pop(uuid, None)
+        previ = self._hashos.pop(uuid, None)
+        if previ is not None:
+            self._tree.remove(previ, uuid)
+
+    # --- Consultes ---
+    def within(self, x: Union[str, int], distance: int = DISTANCIA) -> List[Tuple[str, int]]:
+        """
+        Imatges a distància de Hamming <= `distance` de `x` (un UUID o un
+        hash), de la més semblant a la menys, com a parells (uuid, distància).
+        Si `x` és un UUID no s'inclou al resultat.
+        """
+        if isinstance(x, str):
+            h = self._hashos.get(x)
+            if h is None:
+                return []
+        else:
+            h = x
+        ordre = self._ordre
+        res = [(u, d) for _, uuids, d in self._tree.search(h, distance) for u in uuids if u != x]
+        res.sort(key=lambda p: (p[1], ordre.get(p[0], 0)))
+        return res
+
+    def clusters(self, distance: int = DISTANCIA) -> List[List[str]]:
+        """
+        Grups de quasi-duplicats: components connexos de la relació
+        "a distància <= `distance`" (union-find). Només grups de 2 o més
+        imatges, cadascun en ordre d'emmagatzematge.
+        """
+        pare: Dict[int, int] = {}
+
+        def arrel(h: int) -> int:
+            while pare[h] != h:
+                pare[h] = pare[pare[h]]
+                h = pare[h]
+            return h
+
+        for h, _ in self._tree.hashes():
+            pare[h] = h
+        for h, _ in self._tree.hashes():
+            ra = arrel(h)
+            for vei, _, _ in self._tree.search(h, distance):
+                rb = arrel(vei)
+                if rb != ra:
+                    pare[rb] = ra
+                    ra = arrel(ra)
+
+        grups: Dict[int, List[str]] = {}
+        for h, uuids in self._tree.hashes():
+            grups.setdefault(arrel(h), []).extend(uuids)
+        ordre = self._ordre
+        res = [sorted(g, key=ordre.__getitem__) for g in grups.values() if len(g) > 1]
+        res.sort(key=lambda g: ordre[g[0]])
+        return res
+
+    def __len__(self) -> int:
+        return len(self._hashos)
+
+    def __str__(self) -> str:
+        return f"<PerceptualIndex: {len(self)} imatges>"
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Query.py : Consultes compostes sobre SearchMetadata.
+
+Permet combinar criteris en un sol objecte en lloc d'encadenar cerques
+completes amb and_operator()/or_operator():
+
+    q = Q.model("SD2") & Q.prompt("cat") | Q.sampler("Euler")
+    q = Q.parse('model:SD2 AND prompt:cat OR sampler:"Euler a"')
+    uuids = cerca.query(q)
+
+Sintaxi de text:
+    - terme:       camp:valor   (valor entre cometes si té espais)
+    - operadors:   AND, OR (AND té més prioritat), parèntesis
+    - dos termes seguits sense operador equivalen a AND
+    - camps:       prompt, model, seed, cfg_scale, steps, sampler, date
+
+La consulta es planifica una vegada (Q.plan): per a cada AND s'avalua primer
+el criteri més selectiu (segons els índexs de trigrames, si n'hi ha) i la
+resta només es comproven sobre els candidats que sobreviuen.
+
+El resultat és el mateix (contingut i ordre) que la cadena equivalent:
+    Q.a & Q.b  ->  and_operator(a, b)
+    Q.a | Q.b  ->  or_operator(a, b)
+"""
+import abc
+import re
+from typing import Dict, List, Optional, Set
+
+# camp -> getter d'ImageData
+CAMPS: Dict[str, str] = {
+    "prompt": "get_prompt",
+    "model": "get_model",
+    "seed": "get_seed",
+    "cfg_scale": "get_cfg_scale",
+    "steps": "get_steps",
+    "sampler": "get_sampler",
+    "date": "get_created_date",
+}
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Q(abc.ABC):
+    """Node d'una consulta. Es construeix amb Q.<camp>(sub), &, | o Q.parse()."""
+
+    def __and__(self, other: "Q") -> "Q":
+        return _And(_fills(self, _And) + _fills(other, _And))
+
+    def __or__(self, other: "Q") -> "Q":
+        return _Or(_fills(self, _Or) + _fills(other, _Or))
+
+    # --- Fulles ---
+    @staticmethod
+    def field(camp: str, sub: str) -> "Q":
+        if camp not in CAMPS:
+            raise QueryError(f"camp desconegut: {camp!r}")
+        return _Camp(camp, str(sub))
+
+    @staticmethod
+    def prompt(sub: str) -> "Q":
+        return Q.field("prompt", sub)
+
+    @staticmethod
+    def model(sub: str) -> "Q":
+        return Q.field("model", sub)
+
+    @staticmethod
+    def seed(sub: str) -> "Q":
+        return Q.field("seed", sub)
+
+    @staticmethod
+    def cfg_scale(sub: str) -> "Q":
+        return Q.field("cfg_scale", sub)
+
+    @staticmethod
+    def steps(sub: str) -> "Q":
+        return Q.field("steps", sub)
+
+    @staticmethod
+    def sampler(sub: str) -> "Q":
+        return Q.field("sampler", sub)
+
+    @staticmethod
+    def date(sub: str) -> "Q":
+        return Q.field("date", sub)
+
+    @staticmethod
+    def parse(text: str) -> "Q":
+        return _Parser(text).parse()
+
+    def plan(self, search) -> "Plan":
+        return Plan(self, search)
+
+    # --- Planificació / execució (implementat a les subclasses) ---
+    @abc.abstractmethod
+    def _estimar(self, search, n: int) -> int:
+        """Fita del nombre de resultats (n si no se'n sap res)."""
+
+    def _ordenar(self, search, n: int) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _avaluar(self, search, cand: Optional[Set[str]]) -> List[str]:
+        """Resultat del node, restringit a `cand` si no és None."""
+
+    # --- Ordre del resultat (per fusionar resultats parcials, ShardedSearch) ---
+    @abc.abstractmethod
+    def _conte(self, search, uuid: str) -> bool:
+        """Cert si `uuid` és al resultat del node."""
+
+    @abc.abstractmethod
+    def _clau(self, search, uuid: str, seq: Dict[str, int]) -> tuple:
+        """
+        Clau que ordena `uuid` dins el resultat de la consulta, a partir de
+        la posició global `seq`: ordenar per aquesta clau dona el mateix
+        ordre que _avaluar(). Només té sentit per als UUID del resultat.
+        """
+
+
+def _fills(q: Q, tipus) -> List[Q]:
+    # (a & b) & c == a & b & c : aplanem per poder reordenar tots els criteris
+    return list(q.fills) if isinstance(q, tipus) else [q]
+
+
+class _Camp(Q):
+    def __init__(self, camp: str, sub: str):
+        self.camp = camp
+        self.getter = CAMPS[camp]
+        self.sub = sub
+
+    def _estimar(self, search, n: int) -> int:
+        est = search._estimar(self.getter, self.sub)
+        return n if est is None else min(est, n)
+
+    def _avaluar(self, search, cand: Optional[Set[str]]) -> List[str]:
+        if cand is None:
+            return search._search(self.getter, self.sub)
+        res = [u for u in cand if search._coincideix(self.getter, self.sub, u)]
+        # ordre d'emmagatzematge, com la cerca completa
+        if len(res) > 1:
+            pos = search._posicions()
+            res.sort(key=pos.__getitem__)
+        return res
+
+    def _conte(self, search, uuid: str) -> bool:
+        return search._coincideix(self.getter, self.sub, uuid)
+
+    def _clau(self, search, uuid: str, seq: Dict[str, int]) -> tuple:
+        return (seq[uuid],)
+
+    def __repr__(self) -> str:
+        sub = self.sub
+        if not sub or re.search(r'[\s()"]', sub) or sub.upper() in ("AND", "OR"):
+            sub = '"' + sub.replace('"', '\\"') + '"'
+        return f"{self.camp}:{sub}"
+
+
+class _And(Q):
+    def __init__(self, fills: List[Q]):
+        self.fills = fills
+        self._ordre: List[int] = list(range(len(fills)))
+
+    def _estimar(self, search, n: int) -> int:
+        return min(f._estimar(search, n) for f in self.fills)
+
+    def _ordenar(self, search, n: int) -> None:
+        for f in self.fills:
+            f._ordenar(search, n)
+        est = [f._estimar(search, n) for f in self.fills]
+        # sort estable: a igualtat d'estimació es manté l'ordre escrit
+        self._ordre = sorted(range(len(self.fills)), key=est.__getitem__)
+
+    def _avaluar(self, search, cand: Optional[Set[str]]) -> List[str]:
+        # Criteri més selectiu primer; la resta només sobre els supervivents
+        resultats: Dict[int, List[str]] = {}
+        for i in self._ordre:
+            res = self.fills[i]._avaluar(search, cand)
+            resultats[i] = res
+            cand = set(res)
+            if not cand:
+                return []
+        # L'ordre final és el del primer operand (com and_operator)
+        primer = resultats[0]
+        if len(primer) == len(cand):
+            return primer
+        return [u for u in primer if u in cand]
+
+    def _conte(self, search, uuid: str) -> bool:
+        return all(f._conte(search, uuid) for f in self.fills)
+
+    def _clau(self, search, uuid: str, seq: Dict[str, int]) -> tuple:
+        return self.fills[0]._clau(search, uuid, seq)
+
+    def __repr__(self) -> str:
+        return " AND ".join(f"({f!r})" if isinstance(f, _Or) else repr(f) for f in self.fills)
+
+
+class _Or(Q):
+    def __init__(self, fills: List[Q]):
+        self.fills = fills
+
+    def _estimar(self, search, n: int) -> int:
+        return min(n, sum(f._estimar(search, n) for f in self.fills))
+
+    def _ordenar(self, search, n: int) -> None:
+        for f in self.fills:
+            f._ordenar(search, n)
+
+    def _avaluar(self, search, cand: Optional[Set[str]]) -> List[str]:
+        # Unió en ordre d'aparició (com or_operator)
+        vistos: Set[str] = set()
+        res: List[str] = []
+        for f in self.fills:
+            for u in f._avaluar(search, cand):
+                if u not in vistos:
+                    vistos.add(u)
+                    res.append(u)
+        return res
+
+    def _conte(self, search, uuid: str) -> bool:
+        return any(f._conte(search, uuid) for f in self.fills)
+
+    def _clau(self, search, uuid: str, seq: Dict[str, int]) -> tuple:
+        # primer operand que el conté i, dins d'aquest, la seva posició
+        for i, f in enumerate(self.fills):
+            if f._conte(search, uuid):
+                return (i,) + f._clau(search, uuid, seq)
+        return (len(self.fills),)
+
+    def __repr__(self) -> str:
+        return " OR ".join(repr(f) for f in self.fills)
+
+
+class Plan:
+    """Consulta planificada sobre una instància de SearchMetadata."""
+
+    def __init__(self, q: Q, search):
+        self.q = q
+        self.search = search
+        q._ordenar(search, max(1, len(search)))
+
+    def run(self) -> List[str]:
+        try:
+            return self.q._avaluar(self.search, None)
+        finally:
+            self.search._oblidar_posicions()
+
+    def __repr__(self) -> str:
+        return f"<Plan: {self.q!r}>"
+
+
+#############################################################################
+#
+# Parser de la sintaxi de text
+#
+#############################################################################
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<obre>\() | (?P<tanca>\)) |
+        (?P<camp>[A-Za-z_]+):(?:"(?P<cometes>(?:[^"\\]|\\.)*)"|(?P<valor>[^\s()]*)) |
+        (?P<paraula>[^\s()]+)
+    )''', re.VERBOSE)
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = []
+        pos = 0
+        text = text or ""
+        while pos < len(text):
+            if text[pos:].strip() == "":
+                break
+            m = _TOKEN.match(text, pos)
+            if not m or m.end() == pos:
+                raise QueryError(f"sintaxi invàlida a la posició {pos}: {text!r}")
+            pos = m.end()
+            if m.group("obre"):
+                self.tokens.append(("(", None))
+            elif m.group("tanca"):
+                self.tokens.append((")", None))
+            elif m.group("camp"):
+                valor = m.group("cometes")
+                if valor is not None:
+                    valor = re.sub(r'\\(.)', r'\1', valor)
+                else:
+                    valor = m.group("valor")
+                self.tokens.append(("terme", Q.field(m.group("camp").lower(), valor)))
+            else:
+                paraula = m.group("paraula").upper()
+                if paraula not in ("AND", "OR"):
+                    raise QueryError(f"s'esperava camp:valor, AND o OR i s'ha trobat {m.group('paraula')!r}")
+                self.tokens.append((paraula, None))
+        self.i = 0
+
+    def _veure(self) -> Optional[str]:
+        return self.tokens[self.i][0] if self.i < len(self.tokens) else None
+
+    def parse(self) -> Q:
+        if not self.tokens:
+            raise QueryError("consulta buida")
+        q = self._or()
+        if self._veure() is not None:
+            raise QueryError(f"token inesperat: {self._veure()}")
+        return q
+
+    def _or(self) -> Q:
+        q = self._and()
+        while self._veure() == "OR":
+            self.i += 1
+            q = q | self._and()
+        return q
+
+    def _and(self) -> Q:
+        q = self._terme()
+        while self._veure() in ("AND", "terme", "("):
+            if self._veure() == "AND":
+                self.i += 1
+            q = q & self._terme()
+        return q
+
+    def _terme(self) -> Q:
+        tipus = self._veure()
+        if tipus == "terme":
+            q = self.tokens[self.i][1]
+            self.i += 1
+            return q
+        if tipus == "(":
+            self.i += 1
+            q = self._or()
+            if self._veure() != ")":
+                raise QueryError("falta ')'")
+            self.i += 1
+            return q
+        raise QueryError(f"s'esperava un terme i s'ha trobat {tipus}")
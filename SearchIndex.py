@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+SearchIndex.py : Índexs auxiliars de SearchMetadata.
+
+TrigramIndex
+    Índex invertit de trigrames (subcadenes de 3 caràcters) d'un camp de text.
+    Per a una subcadena de 3 o més caràcters, tota imatge que la contingui
+    ha de contenir tots els seus trigrames, de manera que la intersecció de
+    les llistes de cada trigrama és un superconjunt (petit) dels resultats.
+    La comprovació final amb l'operador `in` la fa SearchMetadata, així que
+    la semàntica (case-sensitive, subcadena) no canvia.
+
+SortedColumn
+    Llista ordenada (en blocs) de valors numèrics (o dates) d'un camp, per
+    respondre consultes de rang amb bisect.
+"""
+import bisect
+import itertools
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+N = 3
+
+
+def _trigrames(text: str) -> Set[str]:
+    return {text[i:i + N] for i in range(len(text) - N + 1)}
+
+
+class TrigramIndex:
+    def __init__(self):
+        # trigrama -> UUIDs que el contenen
+        self._postings: Dict[str, Set[str]] = {}
+        # uuid -> valor indexat (per poder-ne treure els trigrames)
+        self._valors: Dict[str, str] = {}
+
+    def update(self, uuid: str, value: str) -> None:
+        previ = self._valors.get(uuid)
+        if previ == value:
+            return
+        if previ is not None:
+            self._treure(uuid, previ)
+        self._valors[uuid] = value
+        postings = self._postings
+        for t in _trigrames(value):
+            s = postings.get(t)
+            if s is None:
+                postings[t] = {uuid}
+            else:
+                s.add(uuid)
+
+    def remove(self, uuid: str) -> None:
+        previ = self._valors.pop(uuid, None)
+        if previ is not None:
+            self._treure(uuid, previ)
+
+    def _treure(self, uuid: str, value: str) -> None:
+        postings = self._postings
+        for t in _trigrames(value):
+            s = postings.get(t)
+            if s is None:
+                continue
+            s.discard(uuid)
+            if not s:
+                del postings[t]
+
+    def candidates(self, sub: str, limit: Optional[int] = None) -> Optional[Set[str]]:
+        """
+        Retorna els UUID que poden contenir `sub`, o None si la subcadena és
+        massa curta per utilitzar l'índex (cal un recorregut complet).
+        Amb `limit` també retorna None si el trigrama més selectiu en té més.
+        """
+        if len(sub) < N:
+            return None
+        llistes = []
+        for t in _trigrames(sub):
+            s = self._postings.get(t)
+            if not s:
+                return set()
+            llistes.append(s)
+        llistes.sort(key=len)
+        if limit is not None and len(llistes[0]) > limit:
+            return None
+        res = set(llistes[0])
+        for s in llistes[1:]:
+            res &= s
+            if not res:
+                break
+        return res
+
+    def estimate(self, sub: str) -> Optional[int]:
+        """Fita superior barata del nombre de candidats (None si no aplica)."""
+        if len(sub) < N:
+            return None
+        mida = None
+        for t in _trigrames(sub):
+            n = len(self._postings.get(t, ()))
+            if mida is None or n < mida:
+                mida = n
+        return mida or 0
+
+    def __len__(self) -> int:
+        return len(self._valors)
+
+
+class SortedColumn:
+    """
+    Columna ordenada (valor, ordre, uuid) d'un camp numèric o de data.
+    Les consultes per rang fan dues cerques binàries (bisect) i retornen
+    els k elements del rang: O(log n + k).
+
+    Les entrades es guarden en blocs ordenats d'entre MIDA_BLOC / 2 i
+    2 * MIDA_BLOC elements (amb el màxim de cada bloc a part), de manera que
+    inserir o esborrar només desplaça un bloc i no tota la columna.
+    load() omple la columna sencera d'una vegada amb una sola ordenació.
+    """
+
+    MIDA_BLOC = 1000
+
+    def __init__(self):
+        self._blocs: List[List[Tuple[Any, int, str]]] = []
+        # darrer element (el màxim) de cada bloc
+        self._maxs: List[Tuple[Any, int, str]] = []
+        self._n = 0
+        # uuid -> entrada actual
+        self._entrades: Dict[str, Tuple[Any, int, str]] = {}
+
+    def load(self, items: Iterable[Tuple[Any, int, str]]) -> None:
+        """Substitueix el contingut per les entrades (valor, ordre, uuid) de `items`."""
+        entrades = {it[2]: it for it in items if it[0] is not None}
+        ordenats = sorted(entrades.values())
+        m = self.MIDA_BLOC
+        self._blocs = [ordenats[i:i + m] for i in range(0, len(ordenats), m)]
+        self._maxs = [b[-1] for b in self._blocs]
+        self._n = len(ordenats)
+        self._entrades = entrades
+
+    def update(self, uuid: str, value, seq: int) -> None:
+        previ = self._entrades.get(uuid)
+        if previ is not None:
+            if previ[0] == value and previ[1] == seq:
+                return
+            self.remove(uuid)
+        if value is None:
+            return
+        item = (value, seq, uuid)
+        self._entrades[uuid] = item
+        self._n += 1
+        if not self._blocs:
+            self._blocs.append([item])
+            self._maxs.append(item)
+            return
+        k = bisect.bisect_left(self._maxs, item)
+        if k == len(self._blocs):
+            k -= 1
+            self._blocs[k].append(item)
+        else:
+            bisect.insort(self._blocs[k], item)
+        bloc = self._blocs[k]
+        self._maxs[k] = bloc[-1]
+        if len(bloc) > 2 * self.MIDA_BLOC:
+            meitat = len(bloc) // 2
+            self._blocs[k:k + 1] = [bloc[:meitat], bloc[meitat:]]
+            self._maxs[k:k + 1] = [bloc[meitat - 1], bloc[-1]]
+
+    def remove(self, uuid: str) -> None:
+        item = self._entrades.pop(uuid, None)
+        if item is None:
+            return
+        k = bisect.bisect_left(self._maxs, item)
+        if k == len(self._blocs):
+            return
+        bloc = self._blocs[k]
+        i = bisect.bisect_left(bloc, item)
+        if i == len(bloc) or bloc[i] != item:
+            return
+        del bloc[i]
+        self._n -= 1
+        if not bloc:
+            del self._blocs[k]
+            del self._maxs[k]
+            return
+        self._maxs[k] = bloc[-1]
+        if len(bloc) < self.MIDA_BLOC // 2 and len(self._blocs) > 1:
+            # fusionem amb un veí perquè els blocs no es quedin petits
+            j = k - 1 if k > 0 else k
+            fusio = self._blocs[j] + self._blocs[j + 1]
+            if len(fusio) > 2 * self.MIDA_BLOC:
+                meitat = len(fusio) // 2
+                self._blocs[j:j + 2] = [fusio[:meitat], fusio[meitat:]]
+                self._maxs[j:j + 2] = [fusio[meitat - 1], fusio[-1]]
+            else:
+                self._blocs[j:j + 2] = [fusio]
+                self._maxs[j:j + 2] = [fusio[-1]]
+
+    def _posicio(self, clau, dreta: bool) -> Tuple[int, int]:
+        """(bloc, índex) de la primera entrada > clau (dreta) o >= clau."""
+        tall = bisect.bisect_right if dreta else bisect.bisect_left
+        k = tall(self._maxs, clau)
+        if k == len(self._blocs):
+            return k, 0
+        return k, tall(self._blocs[k], clau)
+
+    def range(self, lo=None, hi=None) -> List[Tuple[Any, int, str]]:
+        """Entrades amb lo <= valor <= hi (límits None = oberts), ordenades per valor."""
+        k1, i1 = (0, 0) if lo is None else self._posicio((lo,), False)
+        k2, i2 = (len(self._blocs), 0) if hi is None else self._posicio((hi, math.inf), True)
+        if k1 > k2 or (k1 == k2 and i1 >= i2):
+            return []
+        blocs = self._blocs
+        if k1 == k2:
+            return blocs[k1][i1:i2]
+        res = blocs[k1][i1:]
+        for k in range(k1 + 1, k2):
+            res.extend(blocs[k])
+        if k2 < len(blocs):
+            res.extend(blocs[k2][:i2])
+        return res
+
+    def irange(self, lo=None, hi=None, reverse: bool = False) -> Iterator[Tuple[Any, int, str]]:
+        """
+        Com range(), però com a generador i també en ordre descendent
+        (reverse=True); a igualtat de valor, sempre per ordre ascendent.
+        Recórrer-ne només els primers k elements costa O(log n + k).
+        """
+        k1, i1 = (0, 0) if lo is None else self._posicio((lo,), False)
+        k2, i2 = (len(self._blocs), 0) if hi is None else self._posicio((hi, math.inf), True)
+        trams = []
+        for k in range(k1, min(k2, len(self._blocs) - 1) + 1):
+            trams.append((k, i1 if k == k1 else 0, i2 if k == k2 else len(self._blocs[k])))
+        if not reverse:
+            for k, i, j in trams:
+                yield from self._blocs[k][i:j]
+            return
+        tots = itertools.chain.from_iterable(reversed(self._blocs[k][i:j]) for k, i, j in reversed(trams))
+        for _, grup in itertools.groupby(tots, key=lambda it: it[0]):
+            yield from reversed(list(grup))
+
+    def ordered(self, reverse: bool = False) -> Iterator[Tuple[Any, int, str]]:
+        """
+        Totes les entrades per valor (descendent amb reverse=True); a igualtat
+        de valor, sempre per ordre ascendent.
+        """
+        return self.irange(reverse=reverse)
+
+    def value(self, uuid: str):
+        item = self._entrades.get(uuid)
+        return None if item is None else item[0]
+
+    def __len__(self) -> int:
+        return self._n
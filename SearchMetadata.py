@@ -37,6 +37,28 @@ Mètodes a implementar:
         Retorna una llista d'UUID de les imatges que contenen 'sub'
         en el camp Created_Date.
 
+    - seed_range / steps_range / cfg_scale_range(lo, hi) -> list
+    - date_range(start, end) -> list
+    - dimensions_at_least(width, height) -> list
+        Consultes de rang sobre els camps numèrics i de data (columnes
+        ordenades que es mantenen al dia amb add/remove). Els valors que no
+        es poden interpretar com a número o data no apareixen mai.
+
+    - query(q) -> list
+        Consulta composta (veure Query.py), p.ex.
+        query('model:SD2 AND prompt:cat OR sampler:Euler').
+
+    Totes les cerques admeten, com a paràmetres opcionals amb nom:
+        order_by   "created", "seed", "steps", "cfg_scale", "width", "height",
+                   "dimensions" (àrea) o "path"; amb "-" davant, descendent
+                   (p.ex. order_by="-created": les més noves primer)
+        limit      nombre màxim de resultats
+        offset     resultats que se salten
+        cursor     UUID de l'últim resultat de la pàgina anterior
+    i tenen una variant iter_<cerca>() que retorna un generador. Sense cap
+    d'aquests paràmetres el resultat és el de sempre: la llista completa en
+    ordre d'emmagatzematge.
+
     - and_operator(list1: list, list2: list) -> list
         Retorna una llista amb els UUID que apareixen en AMBDUES llistes.
         (Intersecció de conjunts)
@@ -53,12 +75,246 @@ Notes:
     - Els operadors lògics NO modifiquen les llistes originals
     - Aquests mètodes NO retornen objectes Gallery, sinó llistes simples
 """
-from typing import List
+import calendar
+import datetime
+import heapq
+import itertools
+import math
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 import cfg
+from SearchIndex import SortedColumn, TrigramIndex
+
+# Getters de text que es poden indexar
+_CAMPS_TEXT = ("get_prompt", "get_model", "get_seed", "get_cfg_scale",
+               "get_steps", "get_sampler", "get_created_date")
+
+
+# Conversors dels camps string a valors ordenables (None si no es pot)
+def _a_enter(val) -> Optional[int]:
+    """
+    Els seeds arriben a 2**64 - 1, més enllà de la precisió d'un float: el
+    text es llegeix com a enter exacte i només si no ho és ("20.0", "1e3")
+    es passa per float.
+    """
+    try:
+        text = str(val).strip()
+        try:
+            return int(text)
+        except ValueError:
+            return int(float(text))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _a_real(val) -> Optional[float]:
+    # NaN no és comparable i trencaria l'ordre de les columnes (bisect)
+    try:
+        res = float(val)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(res) else res
+
+
+def _a_data(val) -> Optional[datetime.date]:
+    """Accepta "YYYY-MM-DD" (amb qualsevol cosa al darrere, p.ex. una hora)."""
+    if isinstance(val, datetime.datetime):
+        return val.date()
+    if isinstance(val, datetime.date):
+        return val
+    try:
+        return datetime.date.fromisoformat(str(val).strip()[:10])
+    except ValueError:
+        return None
+
+
+def _limit_data(val, final: bool) -> Optional[datetime.date]:
+    """
+    Límit d'un rang de dates. Admet dates parcials: "2025" o "2025-03"
+    representen tot l'any o tot el mes (primer dia si és l'inici del rang,
+    darrer dia si és el final).
+    """
+    if val is None:
+        return None
+    d = _a_data(val)
+    if d is not None:
+        return d
+    parts = str(val).strip().split("-")
+    try:
+        any_ = int(parts[0])
+        mes = int(parts[1]) if len(parts) > 1 else (12 if final else 1)
+    except ValueError:
+        raise ValueError(f"data invàlida: {val!r}")
+    dia = calendar.monthrange(any_, mes)[1] if final else 1
+    return datetime.date(any_, mes, dia)
+
+
+# Columnes ordenades: nom -> (getter, conversor)
+_COLUMNES = {
+    "seed": ("get_seed", _a_enter),
+    "steps": ("get_steps", _a_enter),
+    "cfg_scale": ("get_cfg_scale", _a_real),
+    "date": ("get_created_date", _a_data),
+    "width": ("get_dimensions", lambda d: d[0]),
+}
+
+# Criteris d'ordenació (order_by): nom -> (columna de _COLUMNES, None) o
+# (None, funció (data, uuid) -> valor)
+_ORDRES = {
+    "created": ("date", None),
+    "seed": ("seed", None),
+    "steps": ("steps", None),
+    "cfg_scale": ("cfg_scale", None),
+    "width": ("width", None),
+    "height": (None, lambda data, u: data.get_dimensions(u)[1]),
+    "dimensions": (None, lambda data, u: data.get_dimensions(u)[0] * data.get_dimensions(u)[1]),
+    "path": (None, lambda data, u: data._data_storage[u].file_path or None),
+}
+
+
+def _cerca_text(nom: str, getter_name: str):
+    """Parell de mètodes (nom, iter_nom) d'una cerca per subcadena sobre `getter_name`."""
+
+    def cerca(self, sub: str, *, order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0, cursor: Optional[str] = None) -> List[str]:
+        if not self._paginat(order_by, limit, offset, cursor):
+            return self._search(getter_name, sub)
+        return list(self._text(getter_name, sub, order_by, limit, offset, cursor))
+
+    def iter_cerca(self, sub: str, *, order_by: Optional[str] = None, limit: Optional[int] = None,
+                   offset: int = 0, cursor: Optional[str] = None) -> Iterator[str]:
+        return self._text(getter_name, sub, order_by, limit, offset, cursor)
+
+    return _anomenar(cerca, nom, f"UUID de les imatges amb `sub` dins {getter_name}()."), \
+        _anomenar(iter_cerca, "iter_" + nom, f"Variant de {nom}() com a generador.")
+
+
+def _cerca_rang(nom: str, camp: str):
+    """Parell de mètodes (nom_range, iter_nom_range) d'una consulta de rang sobre la columna `nom`."""
+
+    def cerca(self, lo=None, hi=None, *, order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0, cursor: Optional[str] = None) -> List[str]:
+        return list(self._rang(nom, lo, hi, order_by, limit, offset, cursor))
+
+    def iter_cerca(self, lo=None, hi=None, *, order_by: Optional[str] = None, limit: Optional[int] = None,
+                   offset: int = 0, cursor: Optional[str] = None) -> Iterator[str]:
+        return self._rang(nom, lo, hi, order_by, limit, offset, cursor)
+
+    return _anomenar(cerca, nom + "_range", f"UUID amb lo <= {camp} <= hi (None = sense límit)."), \
+        _anomenar(iter_cerca, f"iter_{nom}_range", f"Variant de {nom}_range() com a generador.")
+
+
+def _anomenar(fn, nom: str, doc: str):
+    fn.__name__ = nom
+    fn.__qualname__ = "SearchMetadata." + nom
+    fn.__doc__ = doc
+    return fn
+
 
 class SearchMetadata:
-    def __init__(self, image_data_instance):
+    def __init__(self, image_data_instance, use_index: bool = False):
         self.data = image_data_instance
+        # Índexs opcionals: getter -> TrigramIndex, columnes ordenades per a
+        # les consultes de rang, i ordre d'inserció de cada UUID
+        self._indexs: Dict[str, TrigramIndex] = {}
+        self._columnes: Dict[str, SortedColumn] = {}
+        self._ordre: Dict[str, int] = {}
+        self._seq = 0
+        self._pos_cache: Optional[Dict[str, int]] = None
+        if use_index:
+            self.build_index()
+
+    # --- Índexs ---
+    def build_index(self, fields=_CAMPS_TEXT) -> None:
+        """
+        Construeix índexs de trigrames per als getters indicats i es registra a
+        ImageData perquè es mantinguin al dia amb add_image(), load_metadata()
+        i remove_image().
+        """
+        self._indexs = {g: TrigramIndex() for g in fields if hasattr(self.data, g)}
+        self._omplir()
+
+    def _build_columns(self) -> bool:
+        """Crea les columnes ordenades la primera vegada que es fa una consulta de rang."""
+        if not self._columnes:
+            self._columnes = {nom: SortedColumn() for nom in _COLUMNES}
+            if not self._omplir():
+                self._columnes = {}
+                return False
+        return True
+
+    def _omplir(self) -> bool:
+        if not hasattr(self.data, "add_listener"):
+            print("WARNING (SearchMetadata): ImageData no admet índexs.")
+            return False
+        self._ordre = {}
+        self._seq = 0
+        # les columnes s'omplen al final d'una vegada (una sola ordenació)
+        columnes, self._columnes = self._columnes, {}
+        try:
+            for uuid in self._uuids():
+                self.image_updated(uuid)
+        finally:
+            self._columnes = columnes
+        for nom, col in columnes.items():
+            col.load(self._entrades_columna(nom))
+        self.data.add_listener(self)
+        return True
+
+    def _entrades_columna(self, nom: str) -> Iterator[tuple]:
+        """(valor, ordre, uuid) de totes les imatges amb valor a la columna `nom`."""
+        getter_name, conversor = _COLUMNES[nom]
+        getter = getattr(self.data, getter_name)
+        for uuid, seq in self._ordre.items():
+            try:
+                valor = conversor(getter(uuid))
+            except Exception:
+                continue
+            if valor is not None:
+                yield (valor, seq, uuid)
+
+    def drop_index(self) -> None:
+        if hasattr(self.data, "remove_listener"):
+            self.data.remove_listener(self)
+        self._indexs = {}
+        self._columnes = {}
+        self._ordre = {}
+
+    def image_updated(self, uuid: str) -> None:
+        seq = self._ordre.get(uuid)
+        if seq is None:
+            seq = self._ordre[uuid] = self._seq
+            self._seq += 1
+        for getter_name, idx in self._indexs.items():
+            try:
+                val = getattr(self.data, getter_name)(uuid)
+                idx.update(uuid, "None" if val is None else str(val))
+            except Exception:
+                idx.remove(uuid)
+        for nom, col in self._columnes.items():
+            getter_name, conversor = _COLUMNES[nom]
+            try:
+                col.update(uuid, conversor(getattr(self.data, getter_name)(uuid)), seq)
+            except Exception:
+                col.remove(uuid)
+
+    def image_removed(self, uuid: str) -> None:
+        self._ordre.pop(uuid, None)
+        for idx in self._indexs.values():
+            idx.remove(uuid)
+        for col in self._columnes.values():
+            col.remove(uuid)
+
+    def _candidats(self, getter_name: str, sub_s: str) -> Optional[List[str]]:
+        """UUID candidats en ordre d'emmagatzematge, o None si no hi ha índex útil."""
+        idx = self._indexs.get(getter_name)
+        if idx is None:
+            return None
+        ordre = self._ordre
+        # Si l'índex gairebé no filtra, el recorregut en ordre surt més barat que ordenar
+        cand = idx.candidates(sub_s, limit=len(ordre) // 4)
+        if cand is None or 4 * len(cand) > len(ordre):
+            return None
+        return sorted(cand, key=ordre.__getitem__)
 
     def _uuids(self) -> List[str]:
         try:
@@ -68,45 +324,346 @@ class SearchMetadata:
             pass
         return []
 
-    def _search(self, getter_name: str, sub) -> List[str]:
-        res: List[str] = []
+    def _iter_search(self, getter_name: str, sub) -> Iterator[str]:
+        """Coincidències d'una cerca per subcadena, en ordre d'emmagatzematge i a mesura que es troben."""
         if sub is None:
-            return res
+            return
         sub_s = str(sub)
-        for uuid in self._uuids():
+        uuids = self._candidats(getter_name, sub_s)
+        if uuids is None:
+            uuids = self._uuids()
+        getter = getattr(self.data, getter_name, None)
+        if not getter:
+            return
+        for uuid in uuids:
             try:
-                getter = getattr(self.data, getter_name, None)
-                if not getter:
-                    continue
                 val = getter(uuid)
                 if val is None:
                     continue
                 if sub_s in str(val):
-                    res.append(uuid)
+                    yield uuid
             except Exception:
                 continue
-        return res
 
-    def prompt(self, sub: str) -> List[str]:
-        return self._search("get_prompt", sub)
+    def _search(self, getter_name: str, sub) -> List[str]:
+        return list(self._iter_search(getter_name, sub))
+
+    # --- Suport per a les consultes compostes (Query.py) ---
+    def _coincideix(self, getter_name: str, sub_s: str, uuid: str) -> bool:
+        """Mateixa comprovació que _search() per a un sol UUID."""
+        try:
+            val = getattr(self.data, getter_name)(uuid)
+            return val is not None and sub_s in str(val)
+        except Exception:
+            return False
+
+    def _estimar(self, getter_name: str, sub_s: str) -> Optional[int]:
+        """Estimació del nombre de resultats d'un criteri (None si no se'n sap res)."""
+        idx = self._indexs.get(getter_name)
+        return idx.estimate(sub_s) if idx is not None else None
+
+    def _posicions(self) -> Dict[str, int]:
+        """uuid -> posició en l'ordre d'emmagatzematge."""
+        if self._ordre:
+            return self._ordre
+        if self._pos_cache is None:
+            self._pos_cache = {u: i for i, u in enumerate(self._uuids())}
+        return self._pos_cache
+
+    def _oblidar_posicions(self) -> None:
+        self._pos_cache = None
+
+    def query(self, q, *, order_by: Optional[str] = None, limit: Optional[int] = None,
+              offset: int = 0, cursor: Optional[str] = None) -> List[str]:
+        """
+        Executa una consulta composta: un objecte Query.Q o un text com
+        'model:SD2 AND prompt:cat OR sampler:Euler'.
+        Sense order_by, offset/limit/cursor s'apliquen sobre l'ordre del
+        resultat (el de la cadena d'operadors equivalent).
+        """
+        from Query import Q
+        if isinstance(q, str):
+            q = Q.parse(q)
+        res = q.plan(self).run()
+        if not self._paginat(order_by, limit, offset, cursor):
+            return res
+        if order_by is not None:
+            return list(self._paginar(res, order_by, limit, offset, cursor))
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset i limit no poden ser negatius")
+        inici = offset
+        if cursor is not None:
+            try:
+                inici += res.index(cursor) + 1
+            except ValueError:
+                raise ValueError(f"cursor desconegut: {cursor!r}") from None
+        return res[inici:] if limit is None else res[inici:inici + limit]
+
+    def iter_query(self, q, *, order_by: Optional[str] = None, limit: Optional[int] = None,
+                   offset: int = 0, cursor: Optional[str] = None) -> Iterator[str]:
+        """Variant de query() com a generador (la consulta s'avalua sencera en començar)."""
+        yield from self.query(q, order_by=order_by, limit=limit, offset=offset, cursor=cursor)
+
+    # --- Ordenació i paginació ---
+    def _valor_ordre(self, nom: str) -> Callable[[str], Any]:
+        """Funció uuid -> valor del criteri d'ordenació `nom` (None si no en té)."""
+        columna, fn = _ORDRES[nom]
+        if columna is not None:
+            col = self._columnes.get(columna)
+            if col is not None:
+                return col.value
+            getter_name, conversor = _COLUMNES[columna]
+            getter = getattr(self.data, getter_name)
+
+            def valor(uuid: str):
+                try:
+                    return conversor(getter(uuid))
+                except Exception:
+                    return None
+            return valor
+        data = self.data
+
+        def valor(uuid: str):
+            try:
+                return fn(data, uuid)
+            except Exception:
+                return None
+        return valor
+
+    def _paginar(self, coincidencies: Iterable[str], order_by: Optional[str] = None,
+                 limit: Optional[int] = None, offset: int = 0, cursor: Optional[str] = None,
+                 predicat: Optional[Callable[[str], bool]] = None,
+                 estimacio: Optional[int] = None) -> Iterator[str]:
+        """
+        Aplica ordenació i paginació a les coincidències d'una cerca (que
+        arriben en ordre d'emmagatzematge):
+
+            order_by   None (ordre d'emmagatzematge) o un criteri de _ORDRES,
+                       amb "-" al davant per ordre descendent. Les imatges
+                       sense valor van al final; els empats, per ordre
+                       d'emmagatzematge.
+            offset     coincidències que se salten
+            limit      màxim de resultats (None = tots)
+            cursor     UUID de l'últim resultat de la pàgina anterior: es
+                       continua just després d'ell (estable encara que
+                       s'afegeixin o s'esborrin imatges)
+
+        Sense order_by el recorregut s'atura en tenir offset + limit
+        resultats. Amb order_by i limit es fa una selecció top-k amb un heap
+        de mida offset + limit; si a més hi ha columna ordenada del criteri i
+        `predicat` (la comprovació d'una sola imatge), es recorre la columna
+        en ordre i s'atura en trobar-ne prou, excepte si `estimacio` indica
+        que les coincidències són tan poques que surt més a compte el heap.
+        """
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset i limit no poden ser negatius")
+        fi = None if limit is None else offset + limit
+        try:
+            if order_by is None:
+                it = iter(coincidencies)
+                if cursor is not None:
+                    pos = self._posicions()
+                    pc = self._posicio_cursor(pos, cursor)
+                    it = (u for u in it if pos[u] > pc)
+                yield from itertools.islice(it, offset, fi)
+                return
+
+            desc = order_by.startswith("-")
+            nom = order_by[1:] if desc else order_by
+            if nom not in _ORDRES:
+                raise ValueError(f"criteri d'ordenació desconegut: {order_by!r} "
+                                 f"({', '.join(_ORDRES)})")
+            columna = _ORDRES[nom][0]
+            if (fi is not None and predicat is not None and columna is not None
+                    and (estimacio is None or estimacio * 8 > len(self))
+                    and self._build_columns()):
+                yield from itertools.islice(
+                    self._recorrer_columna(coincidencies, columna, desc, cursor, predicat, fi),
+                    offset, fi)
+                return
+
+            pos = self._posicions()
+            valor = self._valor_ordre(nom)
+            # Clau única (inclou la posició): els nuls al final en tots dos sentits
+            if desc:
+                def clau(u):
+                    v = valor(u)
+                    return (1, v, -pos[u]) if v is not None else (0, 0, -pos[u])
+            else:
+                def clau(u):
+                    v = valor(u)
+                    return (0, v, pos[u]) if v is not None else (1, 0, pos[u])
+            items = ((clau(u), u) for u in coincidencies)
+            if cursor is not None:
+                self._posicio_cursor(pos, cursor)
+                ck = clau(cursor)
+                items = (it for it in items if (it[0] < ck if desc else it[0] > ck))
+            if fi is None:
+                ordenats = sorted(items, reverse=desc)
+            elif desc:
+                ordenats = heapq.nlargest(fi, items)
+            else:
+                ordenats = heapq.nsmallest(fi, items)
+            for _, u in ordenats[offset:]:
+                yield u
+        finally:
+            self._oblidar_posicions()
+
+    def _recorrer_columna(self, coincidencies: Iterable[str], columna: str, desc: bool,
+                          cursor: Optional[str], predicat: Callable[[str], bool],
+                          fi: int) -> Iterator[str]:
+        """
+        Coincidències en l'ordre de la columna ordenada `columna`, comprovant
+        `predicat` imatge per imatge; les que no hi tenen valor, al final.
+        """
+        col = self._columnes[columna]
+        ordre = self._ordre
+        vistos = 0
+        if cursor is not None:
+            self._posicio_cursor(ordre, cursor)
+            cv = col.value(cursor)
+            cs = ordre[cursor]
+        for v, seq, u in col.ordered(reverse=desc):
+            if cursor is not None:
+                if cv is None:
+                    # el cursor ja era entre les imatges sense valor
+                    break
+                if (v > cv if desc else v < cv) or (v == cv and seq <= cs):
+                    continue
+            if predicat(u):
+                yield u
+                vistos += 1
+                if vistos >= fi:
+                    return
+        # sense valor: en ordre d'emmagatzematge
+        for u in coincidencies:
+            if col.value(u) is None and (cursor is None or cv is not None or ordre[u] > cs):
+                yield u
+
+    @staticmethod
+    def _posicio_cursor(pos: Dict[str, int], cursor: str) -> int:
+        try:
+            return pos[cursor]
+        except KeyError:
+            raise ValueError(f"cursor desconegut: {cursor!r}") from None
 
-    def model(self, sub: str) -> List[str]:
-        return self._search("get_model", sub)
+    def _text(self, getter_name: str, sub, order_by, limit, offset, cursor) -> Iterator[str]:
+        """Cerca per subcadena (lazy) amb ordenació i paginació."""
+        sub_s = None if sub is None else str(sub)
+        return self._paginar(self._iter_search(getter_name, sub_s), order_by, limit, offset, cursor,
+                             predicat=None if sub_s is None else
+                             (lambda u: self._coincideix(getter_name, sub_s, u)),
+                             estimacio=None if sub_s is None else self._estimar(getter_name, sub_s))
 
-    def seed(self, sub: str) -> List[str]:
-        return self._search("get_seed", sub)
+    @staticmethod
+    def _paginat(order_by, limit, offset, cursor) -> bool:
+        return order_by is not None or limit is not None or bool(offset) or cursor is not None
 
-    def cfg_scale(self, sub: str) -> List[str]:
-        return self._search("get_cfg_scale", sub)
+    # --- Cerques per subcadena ---
+    # Totes accepten order_by, limit, offset i cursor (vegeu _paginar()) i tenen
+    # una variant iter_* que retorna un generador en lloc d'una llista.
+    prompt, iter_prompt = _cerca_text("prompt", "get_prompt")
+    model, iter_model = _cerca_text("model", "get_model")
+    seed, iter_seed = _cerca_text("seed", "get_seed")
+    cfg_scale, iter_cfg_scale = _cerca_text("cfg_scale", "get_cfg_scale")
+    steps, iter_steps = _cerca_text("steps", "get_steps")
+    sampler, iter_sampler = _cerca_text("sampler", "get_sampler")
+    date, iter_date = _cerca_text("date", "get_created_date")
 
-    def steps(self, sub: str) -> List[str]:
-        return self._search("get_steps", sub)
+    # --- Consultes de rang (columnes ordenades + bisect) ---
+    def _iter_range(self, nom: str, lo, hi) -> Iterator[str]:
+        if not self._build_columns():
+            return
+        # Resultats en ordre d'emmagatzematge, igual que les cerques per subcadena
+        items = self._columnes[nom].range(lo, hi)
+        for it in sorted(items, key=lambda it: it[1]):
+            yield it[2]
 
-    def sampler(self, sub: str) -> List[str]:
-        return self._search("get_sampler", sub)
+    def _range(self, nom: str, lo, hi) -> List[str]:
+        return list(self._iter_range(nom, lo, hi))
 
-    def date(self, sub: str) -> List[str]:
-        return self._search("get_created_date", sub)
+    def _rang(self, nom: str, lo, hi, order_by: Optional[str], limit: Optional[int],
+              offset: int, cursor: Optional[str]) -> Iterator[str]:
+        """
+        Consulta de rang sobre la columna `nom` amb ordenació i paginació
+        (com _paginar()). Si s'ordena per la mateixa columna, el tram ja surt
+        ordenat: es recorre i s'atura a offset + limit. Sense order_by però
+        amb limit, es fa un top-k per ordre d'emmagatzematge en lloc
+        d'ordenar tot el rang.
+        """
+        desc = order_by is not None and order_by.startswith("-")
+        criteri = order_by[1:] if desc else order_by
+        columna = _ORDRES[criteri][0] if criteri in _ORDRES else None
+        directe = columna == nom if order_by is not None else limit is not None
+        if not directe or not self._build_columns():
+            yield from self._paginar(self._iter_range(nom, lo, hi), order_by, limit, offset, cursor)
+            return
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset i limit no poden ser negatius")
+        fi = None if limit is None else offset + limit
+        col = self._columnes[nom]
+        if cursor is not None:
+            cs = self._posicio_cursor(self._ordre, cursor)
+        if order_by is None:
+            items = col.range(lo, hi)
+            if cursor is not None:
+                items = [it for it in items if it[1] > cs]
+            for it in heapq.nsmallest(fi, items, key=lambda it: it[1])[offset:]:
+                yield it[2]
+            return
+        items = col.irange(lo, hi, reverse=desc)
+        if cursor is not None:
+            cv = col.value(cursor)
+            if cv is None:
+                # les imatges sense valor van al final: després del cursor no n'hi ha cap del rang
+                return
+            items = itertools.dropwhile(
+                lambda it: (it[0] > cv if desc else it[0] < cv) or (it[0] == cv and it[1] <= cs), items)
+        for it in itertools.islice(items, offset, fi):
+            yield it[2]
+
+    def _iter_dimensions(self, width: int, height: int) -> Iterator[str]:
+        if not self._build_columns():
+            return
+        items = self._columnes["width"].range(width, None)
+        for it in sorted(items, key=lambda it: it[1]):
+            try:
+                if self.data.get_dimensions(it[2])[1] >= height:
+                    yield it[2]
+            except Exception:
+                continue
+
+    seed_range, iter_seed_range = _cerca_rang("seed", "Seed")
+    steps_range, iter_steps_range = _cerca_rang("steps", "Steps")
+    cfg_scale_range, iter_cfg_scale_range = _cerca_rang("cfg_scale", "CFG_Scale")
+
+    def date_range(self, start=None, end=None, *, order_by: Optional[str] = None,
+                   limit: Optional[int] = None, offset: int = 0, cursor: Optional[str] = None) -> List[str]:
+        """
+        UUID amb start <= Created_Date <= end. Els límits poden ser
+        datetime.date o strings "YYYY-MM-DD", "YYYY-MM" o "YYYY"
+        (p.ex. date_range("2025-03", "2025-03") = tot el març de 2025).
+        """
+        return list(self.iter_date_range(start, end, order_by=order_by, limit=limit, offset=offset,
+                                         cursor=cursor))
+
+    def iter_date_range(self, start=None, end=None, *, order_by: Optional[str] = None,
+                        limit: Optional[int] = None, offset: int = 0,
+                        cursor: Optional[str] = None) -> Iterator[str]:
+        return self._rang("date", _limit_data(start, False), _limit_data(end, True),
+                          order_by, limit, offset, cursor)
+
+    def dimensions_at_least(self, width: int = 0, height: int = 0, *, order_by: Optional[str] = None,
+                            limit: Optional[int] = None, offset: int = 0,
+                            cursor: Optional[str] = None) -> List[str]:
+        """UUID de les imatges amb amplada >= width i alçada >= height."""
+        return list(self.iter_dimensions_at_least(width, height, order_by=order_by, limit=limit,
+                                                  offset=offset, cursor=cursor))
+
+    def iter_dimensions_at_least(self, width: int = 0, height: int = 0, *, order_by: Optional[str] = None,
+                                 limit: Optional[int] = None, offset: int = 0,
+                                 cursor: Optional[str] = None) -> Iterator[str]:
+        return self._paginar(self._iter_dimensions(width, height), order_by, limit, offset, cursor)
 
     # Operadors que preserven ordre: intersecció ordenada per llist1, unió ordenada per aparició
     def and_operator(self, list1: List[str], list2: List[str]) -> List[str]:
@@ -128,6 +685,11 @@ class SearchMetadata:
         except Exception:
             return []
 
+    def stats(self) -> Dict[str, Any]:
+        """Estadístiques d'ús de la classe (vegeu Stats.py; buides si no està activat)."""
+        import Stats
+        return Stats.stats("SearchMetadata")
+
     def __len__(self) -> int:
         try:
             return len(self.data._data_storage)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+ShardedSearch.py : Cerca repartida entre diversos processos.
+
+Un sol procés Python només fa servir un nucli, i algunes cerques (una
+subcadena qualsevol dins prompts llargs) continuen sent lineals fins i tot
+amb índexs. ShardedSearch reparteix la col·lecció per UUID entre N
+processos treballadors (shards); cadascun té el seu ImageData i el seu
+SearchMetadata amb només la seva part.
+
+    coordinador  --(consulta)-->  shard 0, shard 1, ... shard N-1   (en paral·lel)
+                 <--(resultats parcials amb la seva posició global)--
+
+Cada imatge rep una posició global (l'ordre en què s'ha afegit al
+coordinador) i els resultats parcials, que ja surten ordenats, es fusionen
+amb heapq.merge. El resultat és el mateix, també en l'ordre, que el de
+SearchMetadata en un sol procés amb les imatges afegides en el mateix ordre.
+
+La càrrega (lectura de metadades dels PNG) també es fa a cada shard, de
+manera que els N shards carreguen en paral·lel.
+
+Ús:
+    with ShardedSearch(shards=4) as cerca:
+        cerca.load((uuid, path) for ...)
+        cerca.prompt("castle")
+        cerca.query('model:SD2 AND prompt:cat')
+"""
+import heapq
+import os
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cfg
+from SearchMetadata import SearchMetadata
+
+# Cerques que es repeteixen tal qual a cada shard
+_CERQUES = ("prompt", "model", "seed", "cfg_scale", "steps", "sampler", "date",
+            "seed_range", "steps_range", "cfg_scale_range", "date_range", "dimensions_at_least")
+
+
+class _Shard:
+    """Estat d'un procés treballador: una part de la col·lecció."""
+
+    def __init__(self, use_index: bool, workers: int):
+        from ImageData import ImageData
+
+        self.data = ImageData()
+        self.search = SearchMetadata(self.data, use_index=use_index)
+        self.workers = workers
+        # uuid -> posició global
+        self.seq: Dict[str, int] = {}
+
+    def load(self, items: List[Tuple[int, str, str]]) -> Dict[str, str]:
+        uuids = []
+        for seq, uuid, file in items:
+            self.data.add_image(uuid, file)
+            self.seq[uuid] = seq
+            uuids.append(uuid)
+        return self.data.load_metadata_many(uuids, workers=self.workers)
+
+    def remove(self, uuids: List[str]) -> None:
+        for uuid in uuids:
+            self.data.remove_image(uuid)
+            self.seq.pop(uuid, None)
+
+    def cerca(self, nom: str, args: tuple) -> List[Tuple[int, str]]:
+        if nom not in _CERQUES:
+            raise ValueError(f"cerca desconeguda: {nom!r}")
+        seq = self.seq
+        return [(seq[u], u) for u in getattr(self.search, nom)(*args)]
+
+    def query(self, q) -> List[Tuple[tuple, str]]:
+        search = self.search
+        seq = self.seq
+        return [(q._clau(search, u, seq), u) for u in search.query(q)]
+
+
+def _treballador(conn, root: str, cache_dir: Optional[str], use_index: bool, workers: int) -> None:
+    """Bucle d'un procés shard: executa les ordres que li envia el coordinador."""
+    cfg.configure(root, cache_dir)
+    shard = _Shard(use_index, workers)
+    while True:
+        try:
+            ordre, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        if ordre == "close":
+            conn.send((True, None))
+            return
+        try:
+            conn.send((True, getattr(shard, ordre)(*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class ShardedSearch:
+    def __init__(self, shards: Optional[int] = None, use_index: bool = False,
+                 workers: Optional[int] = None):
+        """
+        Engega `shards` processos (per defecte un per nucli). `workers` és el
+        nombre de fils de lectura de cada shard a load() (per defecte els
+        nuclis repartits entre els shards).
+        """
+        import multiprocessing
+
+        n = shards or os.cpu_count() or 1
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 1) // n)
+        root, cache_dir = cfg.config.root_dir, cfg.config.cache_dir
+        self._conns = []
+        self._processos = []
+        try:
+            for i in range(n):
+                pare, fill = multiprocessing.Pipe()
+                p = multiprocessing.Process(target=_treballador, name=f"shard-{i}", daemon=True,
+                                            args=(fill, root, cache_dir, use_index, workers))
+                p.start()
+                fill.close()
+                self._conns.append(pare)
+                self._processos.append(p)
+        except Exception:
+            self.close()
+            raise
+        # uuid -> posició global, en ordre d'afegit
+        self._seq: Dict[str, int] = {}
+        self._proper = 0
+
+    # --- Comunicació ---
+    def _shard(self, uuid: str) -> int:
+        return zlib.crc32(uuid.encode("utf-8")) % len(self._conns)
+
+    def _difondre(self, peticions: Dict[int, Tuple[str, tuple]]) -> Dict[int, Any]:
+        """Envia una ordre a cada shard de `peticions` i n'espera totes les respostes."""
+        for i, peticio in peticions.items():
+            self._conns[i].send(peticio)
+        respostes: Dict[int, Any] = {}
+        errors = []
+        for i in peticions:
+            ok, res = self._conns[i].recv()
+            if ok:
+                respostes[i] = res
+            else:
+                errors.append(f"shard {i}: {res}")
+        if errors:
+            raise RuntimeError("ShardedSearch: " + "; ".join(errors))
+        return respostes
+
+    def _a_tots(self, ordre: str, *args) -> List[Any]:
+        respostes = self._difondre({i: (ordre, args) for i in range(len(self._conns))})
+        return [respostes[i] for i in range(len(self._conns))]
+
+    # --- Càrrega ---
+    def load(self, items: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Afegeix les imatges (uuid, file) al final de la col·lecció i en
+        carrega les metadades, tots els shards alhora. Retorna els errors de
+        lectura com ImageData.load_metadata_many().
+        """
+        parts: Dict[int, List[Tuple[int, str, str]]] = {}
+        for uuid, file in items:
+            if not uuid or not file:
+                continue
+            if uuid in self._seq:
+                # tornar-la a afegir la recarrega però no en canvia la posició
+                seq = self._seq[uuid]
+            else:
+                seq = self._seq[uuid] = self._proper
+                self._proper += 1
+            parts.setdefault(self._shard(uuid), []).append((seq, uuid, file))
+        errors: Dict[str, str] = {}
+        for res in self._difondre({i: ("load", (lot,)) for i, lot in parts.items()}).values():
+            errors.update(res)
+        return errors
+
+    def add_image(self, uuid: str, file: str) -> None:
+        """A diferència d'ImageData.add_image(), també en carrega les metadades."""
+        self.load(((uuid, file),))
+
+    def remove_image(self, uuid: str) -> None:
+        self.remove_images((uuid,))
+
+    def remove_images(self, uuids: Iterable[str]) -> None:
+        parts: Dict[int, List[str]] = {}
+        for uuid in uuids:
+            if self._seq.pop(uuid, None) is not None:
+                parts.setdefault(self._shard(uuid), []).append(uuid)
+        self._difondre({i: ("remove", (lot,)) for i, lot in parts.items()})
+
+    # --- Cerques ---
+    def _fusionar(self, parcials: List[List[Tuple[Any, str]]]) -> List[str]:
+        return [u for _, u in heapq.merge(*parcials)]
+
+    def _cerca(self, nom: str, *args) -> List[str]:
+        return self._fusionar(self._a_tots("cerca", nom, args))
+
+    def query(self, q) -> List[str]:
+        """Com SearchMetadata.query(): la consulta s'avalua sencera a cada shard."""
+        from Query import Q
+        if isinstance(q, str):
+            q = Q.parse(q)
+        return self._fusionar(self._a_tots("query", q))
+
+    def prompt(self, sub: str) -> List[str]:
+        return self._cerca("prompt", sub)
+
+    def model(self, sub: str) -> List[str]:
+        return self._cerca("model", sub)
+
+    def seed(self, sub: str) -> List[str]:
+        return self._cerca("seed", sub)
+
+    def cfg_scale(self, sub: str) -> List[str]:
+        return self._cerca("cfg_scale", sub)
+
+    def steps(self, sub: str) -> List[str]:
+        return self._cerca("steps", sub)
+
+    def sampler(self, sub: str) -> List[str]:
+        return self._cerca("sampler", sub)
+
+    def date(self, sub: str) -> List[str]:
+        return self._cerca("date", sub)
+
+    def seed_range(self, lo: Optional[int] = None, hi: Optional[int] = None) -> List[str]:
+        return self._cerca("seed_range", lo, hi)
+
+    def steps_range(self, lo: Optional[int] = None, hi: Optional[int] = None) -> List[str]:
+        return self._cerca("steps_range", lo, hi)
+
+    def cfg_scale_range(self, lo: Optional[float] = None, hi: Optional[float] = None) -> List[str]:
+        return self._cerca("cfg_scale_range", lo, hi)
+
+    def date_range(self, start=None, end=None) -> List[str]:
+        return self._cerca("date_range", start, end)
+
+    def dimensions_at_least(self, width: int = 0, height: int = 0) -> List[str]:
+        return self._cerca("dimensions_at_least", width, height)
+
+    # Els operadors no depenen de les dades: els mateixos de SearchMetadata
+    and_operator = SearchMetadata.and_operator
+    or_operator = SearchMetadata.or_operator
+
+    # --- Tancament ---
+    def close(self) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(("close", ()))
+            except (OSError, ValueError):
+                pass
+        for conn, p in zip(self._conns, self._processos):
+            try:
+                if conn.poll(5):
+                    conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+        self._conns = []
+        self._processos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._seq)
+
+    def __str__(self) -> str:
+        return f"<ShardedSearch: {len(self)} imatges en {len(self._conns)} shards>"
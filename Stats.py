@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Stats.py : Instrumentació opcional de les classes del catàleg.
+
+Quan s'activa, substitueix els mètodes calents d'ImageFiles, ImageID,
+ImageData, SearchMetadata i Gallery per versions que en compten les crides,
+els errors i la latència (total i percentils), i afegeix comptadors
+específics:
+
+    - ImageFiles:      directoris llistats / reaprofitats / inaccessibles
+    - ImageID:         UUID no generats (col·lisió, path invàlid), cerques fallides
+    - ImageData:       arxius llegits per estat (ok, empty, missing, error) i
+                       bytes llegits del disc (lector de chunks de cfg; amb el
+                       lector PIL es compta la mida de l'arxiu)
+    - Gallery:         entrades no resoltes en carregar galeries
+
+Quan està desactivada els mètodes originals tornen al seu lloc, de manera que
+el cost és zero. Les estadístiques són per classe (totes les instàncies
+juntes) i només del procés actual: els workers d'un ProcessPoolExecutor no
+hi compten.
+
+Ús:
+    import Stats
+    with Stats.profile("perfil.json", cprofile=True) as p:
+        ...                                  # execució a mesurar
+    print(p.report())
+    print(gestor_dades.stats())              # o Stats.stats("ImageData")
+"""
+import functools
+import importlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# classe (= mòdul) -> mètodes cronometrats
+_CRONOMETRATS: Dict[str, tuple] = {
+    "ImageFiles": ("reload_fs", "update_files", "duplicates", "_scan_dir"),
+    "ImageID": ("generate_uuid", "get_uuid", "resolve_many", "get_path", "remove_uuid"),
+    "ImageData": ("add_image", "remove_image", "load_metadata", "load_metadata_many",
+                  "load_phash_many", "_llegir_resultat"),
+    "SearchMetadata": ("build_index", "query", "prompt", "model", "seed", "cfg_scale", "steps",
+                       "sampler", "date", "seed_range", "steps_range", "cfg_scale_range",
+                       "date_range", "dimensions_at_least", "and_operator", "or_operator"),
+    "Gallery": ("load_file", "save_file", "show", "add_image_at_end", "remove_first_image",
+                "remove_last_image", "insert_at", "remove_at", "index_of"),
+}
+CLASSES = tuple(_CRONOMETRATS)
+
+# Mostres de latència que es guarden per operació (reservoir sampling)
+_MOSTRES = 4096
+
+
+class _Operacio:
+    __slots__ = ("calls", "errors", "total", "max", "mostres", "_rng")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.mostres: List[float] = []
+        self._rng = random.Random(0)
+
+    def afegir(self, dt: float) -> None:
+        self.calls += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+        if len(self.mostres) < _MOSTRES:
+            self.mostres.append(dt)
+        else:
+            j = self._rng.randrange(self.calls)
+            if j < _MOSTRES:
+                self.mostres[j] = dt
+
+    def resum(self) -> Dict[str, Any]:
+        m = sorted(self.mostres)
+
+        def pct(p: float) -> float:
+            return round(m[min(len(m) - 1, int(p * len(m)))] * 1000, 4) if m else 0.0
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(self.total / self.calls * 1000, 4) if self.calls else 0.0,
+            "p50_ms": pct(0.50),
+            "p90_ms": pct(0.90),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max * 1000, 4),
+        }
+
+
+_lock = threading.Lock()
+_operacions: Dict[str, Dict[str, _Operacio]] = {c: {} for c in CLASSES}
+_comptadors: Dict[str, Dict[str, int]] = {c: {} for c in CLASSES}
+# (objecte, nom, valor original) de tot el que s'ha substituït
+_originals: List[tuple] = []
+_actives = 0
+
+
+def comptar(classe: str, nom: str, n: int = 1) -> None:
+    with _lock:
+        c = _comptadors[classe]
+        c[nom] = c.get(nom, 0) + n
+
+
+#############################################################################
+#
+# Embolcalls
+#
+#############################################################################
+
+def _cronometrar(classe: str, nom: str, fn: Callable) -> Callable:
+    with _lock:
+        op = _operacions[classe].setdefault(nom, _Operacio())
+
+    @functools.wraps(fn)
+    def embolcall(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            with _lock:
+                op.errors += 1
+            raise
+        finally:
+            dt = time.perf_counter() - t0
+            with _lock:
+                op.afegir(dt)
+    return embolcall
+
+
+class _ArxiuComptat:
+    """Delega en un arxiu obert i compta els bytes que se'n llegeixen."""
+
+    def __init__(self, f):
+        self._f = f
+        self.llegits = 0
+
+    def read(self, n: int = -1) -> bytes:
+        dades = self._f.read(n)
+        self.llegits += len(dades)
+        return dades
+
+    def __getattr__(self, nom: str):
+        return getattr(self._f, nom)
+
+
+def _comptadors_especifics(moduls: Dict[str, Any]) -> List[tuple]:
+    """(objecte, nom, embolcall) dels ganxos que deriven comptadors."""
+    ganxos = []
+
+    if "ImageFiles" in moduls:
+        cls = moduls["ImageFiles"].ImageFiles
+        scan_dir = cls.__dict__["_scan_dir"]
+
+        @functools.wraps(scan_dir)
+        def _scan_dir(self, base, *args, **kwargs):
+            previ = self._dirs.get(base)
+            info = scan_dir(self, base, *args, **kwargs)
+            if info is None:
+                comptar("ImageFiles", "dirs_failed")
+            elif info is previ:
+                comptar("ImageFiles", "dirs_reused")
+            else:
+                comptar("ImageFiles", "dirs_listed")
+            return info
+        ganxos.append((cls, "_scan_dir", _scan_dir))
+
+    if "ImageID" in moduls:
+        cls = moduls["ImageID"].ImageID
+        generate_uuid = cls.__dict__["generate_uuid"]
+        get_uuid = cls.__dict__["get_uuid"]
+
+        @functools.wraps(generate_uuid)
+        def _generate_uuid(self, *args, **kwargs):
+            uuid = generate_uuid(self, *args, **kwargs)
+            if uuid is None:
+                comptar("ImageID", "uuids_failed")
+            return uuid
+
+        @functools.wraps(get_uuid)
+        def _get_uuid(self, *args, **kwargs):
+            uuid = get_uuid(self, *args, **kwargs)
+            if uuid is None:
+                comptar("ImageID", "not_found")
+            return uuid
+        ganxos += [(cls, "generate_uuid", _generate_uuid), (cls, "get_uuid", _get_uuid)]
+
+    if "ImageData" in moduls:
+        mod = moduls["ImageData"]
+        cls = mod.ImageData
+        aplicar = cls.__dict__["_aplicar_resultat"]
+
+        @functools.wraps(aplicar)
+        def _aplicar_resultat(self, uuid, resultat, *args):
+            comptar("ImageData", "files_" + str(resultat[0]))
+            return aplicar(self, uuid, resultat, *args)
+        ganxos.append((cls, "_aplicar_resultat", _aplicar_resultat))
+
+        llegir_pil = mod._llegir_metadades_pil
+
+        @functools.wraps(llegir_pil)
+        def _llegir_metadades_pil(abs_path):
+            try:
+                comptar("ImageData", "bytes_read", os.path.getsize(abs_path))
+            except OSError:
+                pass
+            return llegir_pil(abs_path)
+        ganxos.append((mod, "_llegir_metadades_pil", _llegir_metadades_pil))
+
+        import cfg
+        iter_chunks = cfg._iter_png_chunks
+
+        @functools.wraps(iter_chunks)
+        def _iter_png_chunks(f, *args, **kwargs):
+            arxiu = _ArxiuComptat(f)
+            try:
+                yield from iter_chunks(arxiu, *args, **kwargs)
+            finally:
+                # + la signatura, que read_png_info() ja ha llegit
+                comptar("ImageData", "bytes_read", arxiu.llegits + 8)
+        ganxos.append((cfg, "_iter_png_chunks", _iter_png_chunks))
+
+    if "Gallery" in moduls:
+        cls = moduls["Gallery"].Gallery
+        load_file = cls.__dict__["load_file"]
+
+        @functools.wraps(load_file)
+        def _load_file(self, *args, **kwargs):
+            try:
+                return load_file(self, *args, **kwargs)
+            finally:
+                comptar("Gallery", "unresolved", len(self.unresolved))
+        ganxos.append((cls, "load_file", _load_file))
+
+    return ganxos
+
+
+#############################################################################
+#
+# Activació
+#
+#############################################################################
+
+def enable(classes=CLASSES) -> None:
+    """Activa la instrumentació (si ja ho estava, només en compta un nivell més)."""
+    global _actives
+    with _lock:
+        _actives += 1
+        if _actives > 1:
+            return
+    moduls = {c: importlib.import_module(c) for c in classes}
+    # (objecte, nom) -> (objecte, nom, funció nova); els ganxos de comptadors
+    # primer i el cronòmetre per sobre
+    nous: Dict[tuple, tuple] = {}
+    for obj, nom, fn in _comptadors_especifics(moduls):
+        nous[(id(obj), nom)] = (obj, nom, fn)
+    for classe, mod in moduls.items():
+        cls = getattr(mod, classe)
+        for nom in _CRONOMETRATS[classe]:
+            if nom not in vars(cls):
+                continue
+            base = nous.get((id(cls), nom), (cls, nom, vars(cls)[nom]))[2]
+            nous[(id(cls), nom)] = (cls, nom, _cronometrar(classe, nom, base))
+    for obj, nom, fn in nous.values():
+        _originals.append((obj, nom, vars(obj)[nom]))
+        setattr(obj, nom, fn)
+
+
+def disable(force: bool = False) -> None:
+    """Desactiva la instrumentació i restaura els mètodes originals."""
+    global _actives
+    with _lock:
+        if _actives == 0:
+            return
+        _actives = 0 if force else _actives - 1
+        if _actives > 0:
+            return
+        originals = _originals[:]
+        _originals.clear()
+    for obj, nom, original in reversed(originals):
+        setattr(obj, nom, original)
+
+
+def is_enabled() -> bool:
+    return _actives > 0
+
+
+def reset() -> None:
+    """Posa a zero tots els comptadors i latències."""
+    with _lock:
+        for classe in CLASSES:
+            for op in _operacions[classe].values():
+                op.__init__()
+            _comptadors[classe].clear()
+
+
+def stats(classe: Optional[str] = None) -> Dict[str, Any]:
+    """Estadístiques d'una classe, o de totes si `classe` és None."""
+    if classe is None:
+        return {c: stats(c) for c in CLASSES}
+    with _lock:
+        return {
+            "enabled": _actives > 0,
+            "operations": {nom: op.resum() for nom, op in _operacions[classe].items() if op.calls},
+            "counters": dict(_comptadors[classe]),
+        }
+
+
+def report() -> str:
+    """Taula de text amb les operacions de totes les classes."""
+    linies = []
+    for classe, st in stats().items():
+        if not st["operations"] and not st["counters"]:
+            continue
+        linies.append(classe)
+        for nom, r in sorted(st["operations"].items(), key=lambda x: -x[1]["total_s"]):
+            linies.append("  %-22s %9d crides %10.3f s  p50 %9.3f ms  p99 %9.3f ms  max %9.3f ms%s"
+                          % (nom, r["calls"], r["total_s"], r["p50_ms"], r["p99_ms"], r["max_ms"],
+                             "  (%d errors)" % r["errors"] if r["errors"] else ""))
+        for nom, valor in sorted(st["counters"].items()):
+            linies.append("  %-22s %9d" % (nom, valor))
+    return "\n".join(linies)
+
+
+class profile:
+    """
+    Context que activa la instrumentació durant un bloc i, en sortir, en
+    desa les estadístiques a `path` (JSON). Amb cprofile=True també executa
+    el bloc sota cProfile i en desa el perfil a `path` + ".prof"
+    (o el guarda a `self.profiler` si no hi ha path).
+    """
+
+    def __init__(self, path: Optional[str] = None, cprofile: bool = False,
+                 classes=CLASSES, reset: bool = True):
+        self.path = path
+        self.cprofile = cprofile
+        self.classes = classes
+        self.reset = reset
+        self.profiler = None
+        self.elapsed = 0.0
+        self.result: Dict[str, Any] = {}
+
+    def __enter__(self):
+        enable(self.classes)
+        if self.reset:
+            reset()
+        if self.cprofile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self._t0
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.result = stats()
+        disable()
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"elapsed_s": round(self.elapsed, 6), "classes": self.result},
+                          f, indent=2, ensure_ascii=False)
+            if self.profiler is not None:
+                self.profiler.dump_stats(self.path + ".prof")
+
+    def report(self, top: int = 0) -> str:
+        """Resum de text; amb `top` > 0 hi afegeix les funcions més cares de cProfile."""
+        text = report()
+        if top and self.profiler is not None:
+            import io
+            import pstats
+            sortida = io.StringIO()
+            pstats.Stats(self.profiler, stream=sortida).sort_stats("cumulative").print_stats(top)
+            text += "\n\n" + sortida.getvalue()
+        return text
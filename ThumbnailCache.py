@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+ThumbnailCache.py : Miniatures (previews) de les imatges de la col·lecció.
+
+Genera versions reduïdes dels PNG perquè ImageViewer no hagi d'obrir i
+mostrar la imatge a resolució completa cada vegada. Té dos nivells:
+
+    - memòria: LRU acotat, amb clau (uuid, mida)
+    - disc (opcional): un PNG per miniatura a `directory` (per defecte
+      <cfg.CACHE_DIR>/thumbnails). La miniatura es dona per bona si el seu
+      mtime coincideix amb el de l'arxiu original; en generar-la se li
+      copia aquest mtime.
+
+Les miniatures es generen amb Image.reduce() (reducció per un factor enter,
+molt ràpida) i Image.thumbnail() per ajustar la mida final. prefetch()
+les prepara en un pool de fils mentre es mostren les anteriors.
+
+Ús:
+    thumbs = ThumbnailCache(capacity=256)
+    thumbs.prefetch([(uuid, path_absolut), ...])
+    img = thumbs.thumbnail(uuid, path_absolut)     # PIL.Image o None
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+import cfg
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+_Clau = Tuple[str, int]
+
+
+def _reduir(abs_path: str, size: int):
+    """Obre `abs_path` i en retorna una còpia que cap en size x size."""
+    from PIL import Image
+
+    with Image.open(abs_path) as img:
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA")
+        factor = max(img.size) // size
+        if factor >= 2:
+            img = img.reduce(factor)
+        else:
+            img = img.copy()
+    img.thumbnail((size, size))
+    return img
+
+
+class ThumbnailCache:
+    SUBDIR = "thumbnails"
+
+    def __init__(self, directory: Optional[str] = None, capacity: int = 256,
+                 size: Optional[int] = None, workers: Optional[int] = None):
+        if directory is None and cfg.config.cache_dir:
+            directory = os.path.join(cfg.config.cache_dir, self.SUBDIR)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.capacity = max(1, capacity)
+        self.size = size or cfg.THUMBNAIL_SIZE
+        self._workers = workers or min(8, os.cpu_count() or 1)
+        self._pool: "Optional[ThreadPoolExecutor]" = None
+        # RLock: el callback d'un futur ja acabat s'executa dins prefetch()
+        self._lock = threading.RLock()
+        # (uuid, mida) -> (mtime_ns de l'original, imatge)
+        self._lru: "OrderedDict[_Clau, Tuple[int, object]]" = OrderedDict()
+        self._pendents: "Dict[_Clau, Future]" = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.generated = 0
+        self.invalidations = 0
+
+    # --- API ---
+    def thumbnail(self, uuid: str, abs_path: str, size: Optional[int] = None):
+        """
+        Retorna la miniatura (PIL.Image) de la imatge, generant-la si cal.
+        Si ja s'estava preparant amb prefetch() n'espera el resultat.
+        Retorna None si l'original no es pot llegir.
+        """
+        size = size or self.size
+        clau = (uuid, size)
+        try:
+            mtime = os.stat(abs_path).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            entrada = self._lru.get(clau)
+            if entrada is not None:
+                if entrada[0] == mtime:
+                    self._lru.move_to_end(clau)
+                    self.hits += 1
+                    return entrada[1]
+                del self._lru[clau]
+                self.invalidations += 1
+            futur = self._pendents.get(clau)
+
+        if futur is not None:
+            try:
+                res = futur.result()
+            except Exception:
+                res = None
+            if res is not None and res[0] == mtime:
+                return res[1]
+        try:
+            return self._carregar(clau, abs_path)[1]
+        except Exception as e:
+            print(f"WARNING (ThumbnailCache): No es pot generar la miniatura de '{abs_path}'. {e}")
+            return None
+
+    def prefetch(self, items: Iterable[Tuple[str, str]], size: Optional[int] = None) -> None:
+        """Prepara en segon pla les miniatures dels parells (uuid, path absolut)."""
+        size = size or self.size
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self._workers,
+                                                thread_name_prefix="ThumbnailCache")
+            for uuid, abs_path in items:
+                clau = (uuid, size)
+                if clau in self._lru or clau in self._pendents:
+                    continue
+                futur = self._pool.submit(self._carregar, clau, abs_path)
+                self._pendents[clau] = futur
+                futur.add_done_callback(lambda f, c=clau: self._oblidar_pendent(c, f))
+
+    def invalidate(self, uuid: str) -> None:
+        """Oblida totes les miniatures (memòria i disc) d'una imatge."""
+        with self._lock:
+            for clau in [c for c in self._lru if c[0] == uuid]:
+                del self._lru[clau]
+        if self.directory:
+            prefix = uuid + "_"
+            try:
+                for nom in os.listdir(self.directory):
+                    if nom.startswith(prefix):
+                        os.remove(os.path.join(self.directory, nom))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Buida el nivell de memòria (el de disc es manté)."""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits,
+                "generated": self.generated, "invalidations": self.invalidations}
+
+    def close(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # --- Intern ---
+    def _oblidar_pendent(self, clau: _Clau, futur: "Future") -> None:
+        with self._lock:
+            if self._pendents.get(clau) is futur:
+                del self._pendents[clau]
+
+    def _path_disc(self, clau: _Clau) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{clau[0]}_{clau[1]}.png")
+
+    def _carregar(self, clau: _Clau, abs_path: str) -> Tuple[int, object]:
+        """Obté la miniatura del disc o la genera; la deixa a l'LRU."""
+        from PIL import Image
+
+        mtime = os.stat(abs_path).st_mtime_ns
+        path_disc = self._path_disc(clau)
+        img = None
+        de_disc = False
+        if path_disc:
+            try:
+                if os.stat(path_disc).st_mtime_ns == mtime:
+                    with Image.open(path_disc) as f:
+                        f.load()
+                        img = f.copy()
+            except OSError:
+                img = None
+            de_disc = img is not None
+        if img is None:
+            img = _reduir(abs_path, clau[1])
+            if path_disc:
+                self._desar(img, path_disc, mtime)
+
+        with self._lock:
+            if de_disc:
+                self.disk_hits += 1
+            else:
+                self.generated += 1
+            self._lru[clau] = (mtime, img)
+            self._lru.move_to_end(clau)
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+        return mtime, img
+
+    @staticmethod
+    def _desar(img, path_disc: str, mtime: int) -> None:
+        tmp = f"{path_disc}.{threading.get_ident()}.tmp"
+        try:
+            img.save(tmp, format="PNG", compress_level=1)
+            os.utime(tmp, ns=(mtime, mtime))
+            os.replace(tmp, path_disc)
+        except OSError as e:
+            print(f"WARNING (ThumbnailCache): No s'ha pogut desar '{path_disc}'. {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def __str__(self) -> str:
+        return f"<ThumbnailCache: {len(self)}/{self.capacity} miniatures de {self.size}px>"
@@ -0,0 +1,580 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py : Mesures de rendiment de la pràctica
+
+Genera una col·lecció sintètica de PNG petits amb metadades (sense PIL) en un
+directori temporal i cronometra els camins crítics.
+
+Ús:
+    python benchmark.py [metadata] [scan] [search] [imageid] [memory] [ingest] [importtime] [suite] [--n 2000]
+    python benchmark.py suite --scale 100k --json resultats.json
+    python benchmark.py suite --scale 100k --json nou.json --compare resultats.json
+
+La secció "suite" recorre el camí complet (reload_fs, generate_uuid,
+load_metadata, cada mètode de SearchMetadata, Gallery.load_file) i en mesura
+el temps i el pic de memòria (tracemalloc, en una segona passada). Amb
+--json tots els resultats de l'execució es desen en un JSON per comparar-los
+entre commits (--compare). La col·lecció és reproduïble (--seed) i, amb
+--corpus DIR, es genera una sola vegada i es reaprofita.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from typing import Optional
+
+import cfg
+
+
+#############################################################################
+#
+# Generació de PNG sintètics
+#
+#############################################################################
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+_MODELS = ["SD2", "SDXL", "DALL-E", "Midjourney"]
+_SAMPLERS = ["Euler", "Euler a", "DPM++ 2M", "DDIM"]
+_WORDS = ["cat", "castle", "neon", "city", "forest", "robot", "portrait", "sunset",
+          "dragon", "ocean", "cyberpunk", "street", "mountain", "painting", "light"]
+# paraules no ASCII: només poden anar en chunks iTXt (UTF-8)
+_WORDS_UTF8 = ["café", "niño", "señal", "façana", "l·lum", "東京", "étoile"]
+_NEGATIUS = ["blurry", "lowres", "bad anatomy", "watermark", "jpeg artifacts", "extra fingers"]
+
+# Escales predefinides de la col·lecció sintètica (--scale)
+ESCALES = {"1k": 1000, "100k": 100000, "1M": 1000000}
+
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data) & 0xffffffff
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def make_png(width: int, height: int, text: dict = None, itxt: dict = None) -> bytes:
+    """Retorna els bytes d'un PNG RGB de color pla amb chunks tEXt/iTXt."""
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    raw = b"".join(b"\x00" + b"\x80\x40\x20" * width for _ in range(height))
+    parts = [_PNG_SIGNATURE, _chunk(b"IHDR", ihdr)]
+    for k, v in (text or {}).items():
+        parts.append(_chunk(b"tEXt", k.encode("latin-1") + b"\x00" + v.encode("latin-1")))
+    for k, v in (itxt or {}).items():
+        parts.append(_chunk(b"iTXt", k.encode("latin-1") + b"\x00\x00\x00\x00\x00" + v.encode("utf-8")))
+    parts.append(_chunk(b"IDAT", zlib.compress(raw)))
+    parts.append(_chunk(b"IEND", b""))
+    return b"".join(parts)
+
+
+def random_metadata(rng: random.Random, i: int):
+    paraules = [rng.choice(_WORDS) for _ in range(rng.randint(5, 30))]
+    if rng.random() < 0.2:
+        paraules.insert(rng.randrange(len(paraules)), rng.choice(_WORDS_UTF8))
+    prompt = " ".join(paraules)
+    text = {
+        "Seed": str(rng.randint(0, 2**32 - 1)),
+        "CFG_Scale": str(rng.choice([5, 7, 7.5, 9, 12])),
+        "Steps": str(rng.randint(10, 80)),
+        "Sampler": rng.choice(_SAMPLERS),
+        "Model": rng.choice(_MODELS),
+        "Generated": "true",
+        "Created_Date": "2025-%02d-%02d" % (rng.randint(1, 12), rng.randint(1, 28)),
+    }
+    itxt = {"Prompt": prompt}
+    if rng.random() < 0.5:
+        itxt["Negative_Prompt"] = ", ".join(rng.sample(_NEGATIUS, rng.randint(1, 4)))
+    return text, itxt
+
+
+def make_corpus(dest: str, n: int, seed: int = 0, per_dir: int = 500) -> list:
+    """Crea `n` PNG sintètics dins `dest` i en retorna els paths absoluts."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n):
+        sub = os.path.join(dest, "batch_%04d" % (i // per_dir))
+        if i % per_dir == 0:
+            os.makedirs(sub, exist_ok=True)
+        text, itxt = random_metadata(rng, i)
+        path = os.path.join(sub, "img_%07d.png" % i)
+        with open(path, "wb") as f:
+            f.write(make_png(rng.randint(8, 32), rng.randint(8, 32), text, itxt))
+        paths.append(path)
+    return paths
+
+
+def corpus(dest: str, n: int, seed: int = 0) -> list:
+    """
+    Com make_corpus(), però si `dest` ja conté una col·lecció generada amb els
+    mateixos paràmetres (corpus.json) la reaprofita en lloc de tornar-la a crear.
+    """
+    manifest = os.path.join(dest, "corpus.json")
+    params = {"n": n, "seed": seed}
+    try:
+        with open(manifest, encoding="utf-8") as f:
+            if json.load(f) == params:
+                return [os.path.join(dest, "batch_%04d" % (i // 500), "img_%07d.png" % i) for i in range(n)]
+    except (OSError, ValueError):
+        pass
+    os.makedirs(dest, exist_ok=True)
+    paths = make_corpus(dest, n, seed)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return paths
+
+
+#############################################################################
+#
+# Registre de resultats (--json / --compare)
+#
+#############################################################################
+
+_RESULTATS = []
+
+
+def registrar(seccio: str, nom: str, segons: Optional[float], n: int = None, peak: int = None, **extra) -> None:
+    r = {"section": seccio, "name": nom, "seconds": round(segons, 6) if segons is not None else None}
+    if n is not None:
+        r["n"] = n
+        r["per_s"] = round(n / segons, 1) if segons else None
+    if peak is not None:
+        r["peak_bytes"] = peak
+    r.update(extra)
+    _RESULTATS.append(r)
+
+
+def _commit() -> str:
+    try:
+        res = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return res.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def desar_json(path: str, args) -> None:
+    dades = {
+        "meta": {
+            "commit": _commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "n": args.n,
+            "seed": args.seed,
+        },
+        "results": _RESULTATS,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dades, f, indent=2, ensure_ascii=False)
+    print("Resultats desats a %s" % path)
+
+
+def comparar(path: str) -> None:
+    """Mostra la relació de temps (i pic de memòria) respecte d'un JSON anterior."""
+    with open(path, encoding="utf-8") as f:
+        antic = json.load(f)
+    previs = {(r["section"], r["name"]): r for r in antic.get("results", [])}
+    print("Comparació amb %s (commit %s, n=%s):" % (path, antic["meta"].get("commit"), antic["meta"].get("n")))
+    for r in _RESULTATS:
+        p = previs.get((r["section"], r["name"]))
+        if p is None or not p["seconds"]:
+            continue
+        linia = "  %-10s %-34s %9.4f s -> %9.4f s  x%5.2f" % (
+            r["section"], r["name"], p["seconds"], r["seconds"], r["seconds"] / p["seconds"])
+        if r.get("peak_bytes") and p.get("peak_bytes"):
+            linia += "   memòria x%5.2f" % (r["peak_bytes"] / p["peak_bytes"])
+        print(linia)
+
+
+def _rate(n: int, secs: float) -> str:
+    return "%10.0f arxius/s" % (n / secs if secs > 0 else float("inf"))
+
+
+#############################################################################
+#
+# Seccions
+#
+#############################################################################
+
+def bench_metadata(paths: list, args) -> None:
+    """Lector de chunks (cfg.read_png_info) vs PIL a ImageData.load_metadata."""
+    import ImageData as mod
+
+    for nom, fn in (("PIL", mod._llegir_metadades_pil), ("chunks", mod._llegir_metadades)):
+        t0 = time.perf_counter()
+        for p in paths:
+            fn(p)
+        dt = time.perf_counter() - t0
+        print("  load_metadata [%-6s] %8.3f s  %s" % (nom, dt, _rate(len(paths), dt)))
+        registrar("metadata", "load_metadata[%s]" % nom, dt, len(paths))
+
+
+def bench_scan(paths: list, args) -> None:
+    """ImageFiles.reload_fs complet vs incremental sobre la mateixa arrel."""
+    from ImageFiles import ImageFiles
+
+    root = os.path.dirname(os.path.dirname(paths[0]))
+    files = ImageFiles()
+    for nom, incremental in (("complet", False), ("incremental", True)):
+        t0 = time.perf_counter()
+        files.reload_fs(root, incremental=incremental)
+        dt = time.perf_counter() - t0
+        print("  reload_fs [%-11s] %8.3f s  %s" % (nom, dt, _rate(len(files), dt)))
+        registrar("scan", "reload_fs[%s]" % nom, dt, len(files))
+
+
+def _load_data(paths: list):
+    from ImageData import ImageData
+
+    data = ImageData()
+    uuids = [str(cfg.get_uuid(p)) for p in paths]
+    for u, p in zip(uuids, paths):
+        data.add_image(u, p)
+    data.load_metadata_many(uuids)
+    return data
+
+
+def bench_search(paths: list, args) -> None:
+    """SearchMetadata amb recorregut lineal vs índex de trigrames."""
+    from SearchMetadata import SearchMetadata
+
+    data = _load_data(paths)
+    consultes = [("prompt", "castle"), ("prompt", "neon city"), ("model", "SD2"), ("sampler", "Euler a")]
+    for nom, use_index in (("lineal", False), ("índex", True)):
+        t0 = time.perf_counter()
+        cerca = SearchMetadata(data, use_index=use_index)
+        dt_idx = time.perf_counter() - t0
+        for camp, sub in consultes:
+            t0 = time.perf_counter()
+            res = getattr(cerca, camp)(sub)
+            dt = time.perf_counter() - t0
+            print("  %-6s %-8s %-12r %7d resultats %9.2f ms" % (nom, camp, sub, len(res), dt * 1000))
+            registrar("search", "%s:%s:%s" % (nom, camp, sub), dt, results=len(res))
+        if use_index:
+            print("  (construcció de l'índex: %.3f s)" % dt_idx)
+            registrar("search", "build_index", dt_idx, len(data))
+        cerca.drop_index()
+
+
+def bench_imageid(paths: list, args) -> None:
+    """ImageID.generate_uuid / remove_uuid amb paths sintètics: el cost per path ha de ser constant."""
+    from ImageID import ImageID
+
+    mida = 10000
+    while mida <= args.max_ids:
+        noms = ["batch_%04d/img_%07d.png" % (i // 500, i) for i in range(mida)]
+        ids = ImageID()
+        t0 = time.perf_counter()
+        uuids = ids.generate_uuids(noms)
+        dt_gen = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ids.remove_uuids(uuids)
+        dt_rem = time.perf_counter() - t0
+        # esborrats un a un en ordre aleatori (no sempre el mínim del trie)
+        uuids = ids.generate_uuids(noms)
+        random.Random(mida).shuffle(uuids)
+        t0 = time.perf_counter()
+        for u in uuids:
+            ids.remove_uuid(u)
+        dt_alea = time.perf_counter() - t0
+        print("  %9d paths  generate %8.3f s (%5.2f us/path)  remove %8.3f s (%5.2f us/uuid)"
+              "  remove aleatori %8.3f s (%5.2f us/uuid)"
+              % (mida, dt_gen, dt_gen / mida * 1e6, dt_rem, dt_rem / mida * 1e6,
+                 dt_alea, dt_alea / mida * 1e6))
+        registrar("imageid", "generate_uuids[%d]" % mida, dt_gen, mida)
+        registrar("imageid", "remove_uuids[%d]" % mida, dt_rem, mida)
+        registrar("imageid", "remove_uuid_aleatori[%d]" % mida, dt_alea, mida)
+        mida *= 10
+
+
+def _copia(text: str) -> str:
+    # string nou (no compartit), com el que produeix la lectura d'un arxiu
+    return (text + ".")[:-1]
+
+
+def bench_memory(paths: list, args) -> None:
+    """Memòria de _data_storage: layout antic (dict de dicts) vs registres compactes."""
+    import tracemalloc
+    import ImageData as mod
+
+    llegits = [mod._llegir_metadades(p) for p in paths]
+    n = args.records
+
+    def antic(i, res):
+        meta = {k: _copia(v) for k, v in res[1].items()}
+        return {"file_path": _copia(paths[i % len(paths)]), "metadata": meta, "dimensions": res[2]}
+
+    def compacte(i, res):
+        rec = mod._ImageRecord(_copia(paths[i % len(paths)]))
+        rec.set_metadata({k: _copia(v) for k, v in res[1].items()})
+        rec.dimensions = res[2]
+        return rec
+
+    for nom, fabrica in (("antic", antic), ("compacte", compacte)):
+        tracemalloc.start()
+        storage = {}
+        for i in range(n):
+            storage["%032x" % i] = fabrica(i, llegits[i % len(llegits)])
+        actual, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print("  %-8s %8d registres %9.1f MB  (%6.0f bytes/imatge)" % (nom, n, actual / 2**20, actual / n))
+        registrar("memory", nom, None, n, peak=actual, bytes_per_image=round(actual / n))
+        del storage
+
+
+def bench_ingest(paths: list, args) -> None:
+    """reload_fs + load_metadata_many vs Ingest.ingest_stream (temps fins al primer resultat)."""
+    from ImageData import ImageData
+    from ImageFiles import ImageFiles
+    from ImageID import ImageID
+    from Ingest import ingest_stream
+
+    root = os.path.dirname(os.path.dirname(paths[0]))
+
+    t0 = time.perf_counter()
+    files, ids, data = ImageFiles(), ImageID(), ImageData()
+    files.reload_fs(root)
+    uuids = []
+    for p in files.files_added():
+        u = ids.generate_uuid(p)
+        data.add_image(u, p)
+        uuids.append(u)
+    data.load_metadata_many(uuids[:1])
+    primer = time.perf_counter() - t0
+    data.load_metadata_many(uuids[1:])
+    total = time.perf_counter() - t0
+    print("  %-10s primer resultat %8.4f s   total %8.3f s" % ("lot", primer, total))
+    registrar("ingest", "lot:primer", primer)
+    registrar("ingest", "lot:total", total, len(uuids))
+
+    t0 = time.perf_counter()
+    primer = None
+    for _ in ingest_stream(ImageFiles(), ImageID(), ImageData(), root=root):
+        if primer is None:
+            primer = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    print("  %-10s primer resultat %8.4f s   total %8.3f s" % ("streaming", primer or 0.0, total))
+    registrar("ingest", "streaming:primer", primer or 0.0)
+    registrar("ingest", "streaming:total", total, len(uuids))
+
+
+_MODULS_IMPORT = ("cfg", "ImageFiles", "ImageID", "ImageData", "SearchMetadata",
+                  "ImageViewer", "Gallery")
+
+
+def _importtime(modul: str):
+    """Executa `python -X importtime -c "import modul"` i retorna
+    (temps acumulat del mòdul en ms, temps del procés en ms, mòduls carregats)."""
+    t0 = time.perf_counter()
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + modul],
+                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True)
+    proces = (time.perf_counter() - t0) * 1000
+    acumulat = 0.0
+    carregats = set()
+    for linia in res.stderr.splitlines():
+        if not linia.startswith("import time:"):
+            continue
+        camps = linia[len("import time:"):].split("|")
+        if len(camps) != 3 or not camps[1].strip().isdigit():
+            continue
+        nom = camps[2].strip()
+        carregats.add(nom)
+        if nom == modul:
+            acumulat = int(camps[1]) / 1000
+    return acumulat, proces, carregats
+
+
+def bench_importtime(paths: list, args) -> None:
+    """Temps d'importació de cada mòdul en un procés nou (millor de 3)."""
+    for modul in _MODULS_IMPORT:
+        mesures = [_importtime(modul) for _ in range(3)]
+        acumulat = min(m[0] for m in mesures)
+        proces = min(m[1] for m in mesures)
+        pesats = sorted(n for n in ("PIL", "sqlite3", "concurrent.futures", "multiprocessing", "platform")
+                        if n in mesures[0][2])
+        print("  import %-15s %7.1f ms   procés %7.1f ms   %s"
+              % (modul, acumulat, proces, ("carrega: " + ", ".join(pesats)) if pesats else ""))
+        registrar("importtime", modul, acumulat / 1000, process_ms=round(proces, 1), heavy=pesats)
+
+
+def _etapa(nom: str, fn, n: Optional[int], args, descartar=None):
+    """
+    Cronometra fn(); si cal, la torna a executar amb tracemalloc per al pic de
+    memòria. `descartar` allibera el resultat d'aquesta segona passada (p.ex.
+    treure'l de listener) perquè no afecti les etapes següents.
+    """
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    peak = None
+    if not args.no_peak:
+        gc.collect()
+        tracemalloc.start()
+        res2 = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if descartar is not None:
+            descartar(res2)
+    print("  %-40s %9.4f s %s%s" % (nom, dt, _rate(n, dt) if n else " " * 20,
+                                    "   pic %8.1f MB" % (peak / 2**20) if peak is not None else ""))
+    registrar("suite", nom, dt, n, peak=peak)
+    return res
+
+
+def bench_suite(paths: list, args) -> None:
+    """Camí complet: escaneig, UUID, metadades, cerques i càrrega de galeries."""
+    from Gallery import Gallery
+    from ImageData import ImageData
+    from ImageFiles import ImageFiles
+    from ImageID import ImageID
+    from SearchMetadata import SearchMetadata
+
+    root = os.path.dirname(os.path.dirname(paths[0]))
+    cfg.configure(root_dir=root)
+    n = len(paths)
+
+    def escaneig():
+        files = ImageFiles()
+        files.reload_fs(root)
+        return files
+
+    arxius = _etapa("ImageFiles.reload_fs", escaneig, n, args).files_added()
+
+    def generar():
+        ids = ImageID()
+        return ids, [ids.generate_uuid(p) for p in arxius]
+
+    ids, uuids = _etapa("ImageID.generate_uuid", generar, n, args)
+
+    def carregar(many: bool):
+        data = ImageData()
+        for u, p in zip(uuids, arxius):
+            data.add_image(u, p)
+        if many:
+            data.load_metadata_many(uuids)
+        else:
+            for u in uuids:
+                data.load_metadata(u)
+        return data
+
+    data = _etapa("ImageData.load_metadata", lambda: carregar(False), n, args)
+    _etapa("ImageData.load_metadata_many", lambda: carregar(True), n, args)
+
+    consultes = [
+        ("prompt", ("castle",)), ("model", ("SD2",)), ("seed", ("42",)), ("cfg_scale", ("7.5",)),
+        ("steps", ("20",)), ("sampler", ("Euler a",)), ("date", ("2025-03",)),
+        ("seed_range", (0, 2**31)), ("steps_range", (20, 40)), ("cfg_scale_range", (7, 9)),
+        ("date_range", ("2025-03", "2025-06")), ("dimensions_at_least", (16, 16)),
+        ("query", ('model:SD2 AND prompt:castle OR sampler:"Euler a"',)),
+    ]
+    for nom_mode, use_index in (("lineal", False), ("índex", True)):
+        cerca = _etapa("SearchMetadata(%s)" % nom_mode,
+                       lambda: SearchMetadata(data, use_index=use_index), n, args,
+                       descartar=SearchMetadata.drop_index)
+        for metode, params in consultes:
+            fn = getattr(cerca, metode)
+            fn(*params)   # primera crida (columnes/índexs mandrosos) fora de la mesura
+            _etapa("%s.%s(%s)" % (nom_mode, metode, ", ".join(map(repr, params))),
+                   lambda: fn(*params), None, args)
+        for params, opcions in ((("castle",), {"limit": 50}),
+                                (("castle",), {"order_by": "-created", "limit": 50}),
+                                (("castle",), {"order_by": "seed", "limit": 50, "offset": 100})):
+            _etapa("%s.prompt(%r, %s)" % (nom_mode, params[0],
+                                         ", ".join("%s=%r" % kv for kv in opcions.items())),
+                   lambda: cerca.prompt(*params, **opcions), None, args)
+        a, b = cerca.model("SD2"), cerca.sampler("Euler")
+        _etapa("%s.and_operator" % nom_mode, lambda: cerca.and_operator(a, b), None, args)
+        _etapa("%s.or_operator" % nom_mode, lambda: cerca.or_operator(a, b), None, args)
+        # també en mode lineal: les columnes ordenades s'actualitzen com a listener
+        cerca.drop_index()
+
+    tmp = tempfile.mkdtemp(prefix="ds_bench_gal_")
+    try:
+        galeria = os.path.join(tmp, "galeria.json")
+        with open(galeria, "w", encoding="utf-8") as f:
+            json.dump({"gallery_name": "bench", "description": "", "created_date": "2025-01-01",
+                       "images": [cfg.get_canonical_pathfile(p) for p in arxius]}, f, indent=2)
+
+        def carregar_galeria(path: str):
+            g = Gallery(ids)
+            g.load_file(path)
+            return g
+
+        g = _etapa("Gallery.load_file[json]", lambda: carregar_galeria(galeria), n, args)
+        binari = os.path.join(tmp, "galeria.galb")
+        g.save_file(binari)
+        _etapa("Gallery.load_file[galb]", lambda: carregar_galeria(binari), n, args,
+               descartar=Gallery.close).close()
+        gb = carregar_galeria(binari)
+        _etapa("Gallery[galb] iteració", lambda: sum(1 for _ in gb), n, args)
+        gb.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+SECCIONS = {
+    "metadata": bench_metadata,
+    "scan": bench_scan,
+    "search": bench_search,
+    "imageid": bench_imageid,
+    "memory": bench_memory,
+    "ingest": bench_ingest,
+    "importtime": bench_importtime,
+    "suite": bench_suite,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("seccions", nargs="*", help="seccions a executar: " + ", ".join(SECCIONS))
+    parser.add_argument("--n", type=int, default=None, help="nombre d'imatges sintètiques (per defecte 2000)")
+    parser.add_argument("--scale", choices=list(ESCALES), help="mida predefinida de la col·lecció")
+    parser.add_argument("--seed", type=int, default=0, help="llavor de la col·lecció sintètica")
+    parser.add_argument("--corpus", help="directori on generar (o reaprofitar) la col·lecció")
+    parser.add_argument("--json", help="desa els resultats en aquest arxiu JSON")
+    parser.add_argument("--compare", help="compara amb els resultats d'un JSON anterior")
+    parser.add_argument("--no-peak", action="store_true", help="no mesura el pic de memòria a la suite")
+    parser.add_argument("--records", type=int, default=200000, help="registres de la secció memory")
+    parser.add_argument("--max-ids", type=int, default=1000000, help="mida màxima de la secció imageid")
+    args = parser.parse_args(argv)
+    for nom in args.seccions:
+        if nom not in SECCIONS:
+            parser.error("secció desconeguda: " + nom)
+    if args.n is None:
+        args.n = ESCALES[args.scale] if args.scale else 2000
+
+    tmp = args.corpus or tempfile.mkdtemp(prefix="ds_bench_")
+    try:
+        t0 = time.perf_counter()
+        if args.corpus:
+            paths = corpus(tmp, args.n, args.seed)
+        else:
+            paths = make_corpus(tmp, args.n, args.seed)
+        print("Col·lecció sintètica: %d PNG a %s (%.2f s)\n" % (len(paths), tmp, time.perf_counter() - t0))
+        for nom in args.seccions or list(SECCIONS):
+            print("[%s]" % nom)
+            SECCIONS[nom](paths, args)
+            print("")
+    finally:
+        if not args.corpus:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if args.json:
+        desar_json(args.json, args)
+    if args.compare:
+        comparar(args.compare)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,13 +2,17 @@
 """
 cfg.py : Dades de configuració de la pràctica i funcions auxiliars
          Adaptat per a gestió d'imatges generades amb IA
+
+Importar cfg no fa cap entrada/sortida: l'arrel efectiva es resol quan es
+consulta (cfg.config, cfg.get_root()) i es pot canviar amb la variable
+d'entorn DS_ROOT_DIR o amb cfg.configure()/cfg.configure_from_args()
+(--root). Els scripts criden cfg.validate() per comprovar l'entorn.
 """
 
-import platform
 import sys
 import os
 import os.path
-import uuid
+import zlib
 
 
 #############################################################################
@@ -40,43 +44,125 @@ IMAGE_DEFAULT = "0b4993aa-093c-42a6-a90a-073dce964bf0.png"
 #DISPLAY_MODE = 2  # Només "mostrar imatge" (visualització regular)
 DISPLAY_MODE = 1
 
+# Directori de la memòria cau persistent de metadades (MetadataCache)
+# Si és None, ImageData no utilitza cap memòria cau per defecte.
+#
+#CACHE_DIR = r"/tmp/ds_fall25_cache"
+CACHE_DIR = None
+
+# Mida màxima (en píxels, costat llarg) de les miniatures d'ImageViewer
+THUMBNAIL_SIZE = 512
+
 #############################################################################
 #
 # TOOLS: No modificar a partir d'aquest punt !!!
 #
 #############################################################################
 
-_running_platform = platform.system()
+class Config:
+    """
+    Configuració efectiva, resolta quan es consulta (no en importar cfg).
+
+    Ordre de prioritat per a l'arrel de la col·lecció i la memòria cau:
+        1. configure(root_dir=..., cache_dir=...) o --root/--cache-dir
+           (configure_from_args)
+        2. variables d'entorn DS_ROOT_DIR / DS_CACHE_DIR
+        3. ROOT_DIR / CACHE_DIR de la secció de configuració
+    """
+    ENV_ROOT = "DS_ROOT_DIR"
+    ENV_CACHE = "DS_CACHE_DIR"
+
+    def __init__(self):
+        self._root_dir = None
+        self._cache_dir = None
+        self._root_real = None
 
-if   _running_platform == "Windows" : _rsys = 1
-elif _running_platform == "Linux"   : _rsys = 2
-elif _running_platform == "Darwin"  : _rsys = 3
-else                                : _rsys = 0
+    @property
+    def root_dir(self) -> str:
+        return self._root_dir or os.environ.get(self.ENV_ROOT) or ROOT_DIR
 
-if _rsys > 0 :
-    print("Running on: " + _running_platform + " ({})\n".format(_rsys))
-else:
-    print("ERROR: Platform unknown!")
-    sys.exit(1)
+    @property
+    def root_real(self) -> str:
+        """root_dir resolt amb os.path.realpath (es calcula una sola vegada)."""
+        root = self.root_dir
+        if self._root_real is None or self._root_real[0] != root:
+            self._root_real = (root, os.path.realpath(root))
+        return self._root_real[1]
 
-if not os.path.isdir(ROOT_DIR):
-    print("ERROR: ROOT_DIR inexistent!")
-    sys.exit(1)
+    @property
+    def cache_dir(self):
+        return self._cache_dir or os.environ.get(self.ENV_CACHE) or CACHE_DIR
+
+    def configure(self, root_dir: str = None, cache_dir: str = None) -> None:
+        if root_dir:
+            self._root_dir = root_dir
+        if cache_dir:
+            self._cache_dir = cache_dir
+
+
+config = Config()
+
+
+def configure(root_dir: str = None, cache_dir: str = None) -> None:
+    """Sobreescriu l'arrel de la col·lecció i/o el directori de memòria cau."""
+    config.configure(root_dir, cache_dir)
+
+def configure_from_args(argv: list = None) -> list:
+    """Aplica --root/--cache-dir d'una línia d'ordres i retorna la resta d'arguments."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    resta = []
+    opcions = {"--root": "root_dir", "--cache-dir": "cache_dir"}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        nom, igual, valor = arg.partition("=")
+        if nom in opcions:
+            if not igual:
+                i += 1
+                valor = argv[i] if i < len(argv) else ""
+            config.configure(**{opcions[nom]: valor})
+        else:
+            resta.append(arg)
+        i += 1
+    return resta
+
+def validate(exit_on_error: bool = True) -> bool:
+    """
+    Comprovacions d'entorn que abans es feien en importar cfg: mostra la
+    plataforma i verifica que l'arrel de la col·lecció existeix. Els scripts
+    la criden a l'inici; per defecte surt amb sys.exit(1) si alguna falla.
+    """
+    import platform
+    running_platform = platform.system()
+    rsys = {"Windows": 1, "Linux": 2, "Darwin": 3}.get(running_platform, 0)
+    ok = True
+    if rsys > 0 :
+        print("Running on: " + running_platform + " ({})\n".format(rsys))
+    else:
+        print("ERROR: Platform unknown!")
+        ok = False
+    if ok and not os.path.isdir(config.root_dir):
+        print("ERROR: ROOT_DIR inexistent!")
+        ok = False
+    if not ok and exit_on_error:
+        sys.exit(1)
+    return ok
 
 
 def get_root() -> str:
     """Retorna el local pathname complet de la col·lecció d'imatges."""
-    return os.path.realpath(ROOT_DIR)
+    return config.root_real
 
 def get_uuid(filename: str = "") -> str:
     """Retorna el UUID d'un path."""
+    import uuid
     return uuid.uuid5(uuid.NAMESPACE_URL, filename)
 
 def get_canonical_pathfile(filename: str) -> str:
     """Retorna el pathname relatiu amb un format universal."""
     """Exemple: subdir1/subdir2/image01.png"""
     file = os.path.normpath(filename)
-    file = os.path.relpath(file, ROOT_DIR)
+    file = os.path.relpath(file, config.root_dir)
     file = file.replace(os.sep, '/')
     return  file
 
@@ -84,10 +170,11 @@ def get_one_file(mode: int = 0) -> str:
     """Retorna el local pathname complet de la darrera imatge a la col·lecció."""
     """Si el valor és 1 retorna la imatge per defecte envers cercar-la."""
     """Funció d'exemple, no utilizar a la pràctica directament!"""
-    file = os.path.realpath(os.path.join(ROOT_DIR, IMAGE_DEFAULT))
-    print("get_one_file(): ", ROOT_DIR , IMAGE_DEFAULT, file )
+    root_dir = config.root_dir
+    file = os.path.realpath(os.path.join(root_dir, IMAGE_DEFAULT))
+    print("get_one_file(): ", root_dir , IMAGE_DEFAULT, file )
     if mode != 1 :
-        for root, dirs, files in os.walk(ROOT_DIR):
+        for root, dirs, files in os.walk(root_dir):
             for filename in files:
                 if filename.lower().endswith(tuple(['.png', '.jpg', '.jpeg'])):
                     print("found:  " + os.path.join(root, filename))
@@ -96,14 +183,102 @@ def get_one_file(mode: int = 0) -> str:
     return file
 
 
-def read_png_metadata(filename):
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_TEXT_CHUNKS = (b'tEXt', b'zTXt', b'iTXt')
+
+# Mida màxima d'un chunk de text descomprimit (protecció contra "zip bombs")
+MAX_TEXT_CHUNK = 1024 * 1024
+
+
+def _iter_png_chunks(f, wanted=_TEXT_CHUNKS, stop_at_idat=False):
+    """
+    Recorre els chunks d'un PNG obert (posicionat just després de la signatura)
+    i retorna (tipus, dades) només dels chunks de `wanted`.
+    
+    Els chunks que no interessen (p.ex. els IDAT de diversos MB) se salten amb
+    f.seek() sense llegir-los. Si `stop_at_idat` és True s'atura al primer
+    IDAT, útil quan se sap que totes les metadades el precedeixen.
+    """
+    while True:
+        # length (4 bytes, big-endian) + tipus (4 bytes ASCII)
+        head = f.read(8)
+        if len(head) < 8:
+            return  # EOF
+        length = int.from_bytes(head[0:4], byteorder='big')
+        chunk_type = head[4:8]
+        
+        if chunk_type in wanted:
+            chunk_data = f.read(length) if length > 0 else b''
+            if len(chunk_data) < length:
+                return  # EOF inesperat
+            yield chunk_type, chunk_data
+            # CRC (4 bytes) - no el validem però l'hem de saltar
+            f.seek(4, os.SEEK_CUR)
+        elif chunk_type == b'IEND' or (stop_at_idat and chunk_type == b'IDAT'):
+            return
+        else:
+            f.seek(length + 4, os.SEEK_CUR)
+
+
+def _inflate(data):
+    d = zlib.decompressobj()
+    text = d.decompress(data, MAX_TEXT_CHUNK)
+    if d.unconsumed_tail:
+        raise ValueError("chunk de text massa gran")
+    return text
+
+
+def _decode_text_chunk(chunk_type, chunk_data, errors='strict'):
+    """
+    Descodifica un chunk tEXt, zTXt o iTXt (comprimit o no).
+    
+    Returns:
+        tuple: (keyword, text) o None si el chunk és invàlid
+    """
+    try:
+        null_pos = chunk_data.index(b'\x00')
+        keyword = chunk_data[:null_pos].decode('latin-1')
+        rest = chunk_data[null_pos + 1:]
+        
+        if chunk_type == b'tEXt':
+            # Format: keyword\0text
+            return keyword, rest.decode('latin-1')
+        
+        if chunk_type == b'zTXt':
+            # Format: keyword\0compression_method text_comprimit
+            if not rest or rest[0] != 0:
+                return None
+            return keyword, _inflate(rest[1:]).decode('latin-1')
+        
+        # iTXt - Format: keyword\0compression_flag compression_method language\0translated_keyword\0text
+        if len(rest) < 2:
+            return None
+        compression_flag, compression_method = rest[0], rest[1]
+        parts = rest[2:].split(b'\x00', 2)
+        if len(parts) < 3:
+            return None
+        text_data = parts[2]
+        if compression_flag:
+            if compression_method != 0:
+                return None
+            text_data = _inflate(text_data)
+        return keyword, text_data.decode('utf-8', errors=errors)
+    
+    except (ValueError, UnicodeDecodeError, zlib.error):
+        # Si hi ha error, ignorem aquest chunk
+        return None
+
+
+def read_png_metadata(filename, stop_at_idat=False):
     """
     Llegeix les metadades embegudes en un arxiu PNG.
     
-    Suporta chunks tEXt i iTXt (Unicode).
+    Suporta chunks tEXt, zTXt i iTXt (Unicode, comprimit o no). Els chunks
+    que no són de text se salten sense llegir-los del disc.
     
     Args:
         filename (str): Path a l'arxiu PNG
+        stop_at_idat (bool): Atura la lectura al primer chunk IDAT
         
     Returns:
         dict: Diccionari amb les metadades. Retorna {} si no n'hi ha.
@@ -115,91 +290,20 @@ def read_png_metadata(filename):
             prompt = metadata.get('Prompt', 'None')
             model = metadata.get('Model', 'None')
     """
-    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
     metadata = {}
     
     try:
         with open(filename, 'rb') as f:
             # Verificar signatura PNG
             signature = f.read(8)
-            if signature != PNG_SIGNATURE:
+            if signature != _PNG_SIGNATURE:
                 print(f"ERROR: {filename} no és un PNG vàlid")
                 return None
             
-            # Llegir chunks
-            while True:
-                # Llegir length del chunk (4 bytes, big-endian)
-                length_bytes = f.read(4)
-                if len(length_bytes) < 4:
-                    break  # EOF
-                
-                length = int.from_bytes(length_bytes, byteorder='big')
-                
-                # Llegir tipus del chunk (4 bytes ASCII)
-                chunk_type_bytes = f.read(4)
-                if len(chunk_type_bytes) < 4:
-                    break
-                
-                chunk_type = chunk_type_bytes.decode('ascii', errors='ignore')
-                
-                # Llegir dades del chunk
-                if length > 0:
-                    chunk_data = f.read(length)
-                    if len(chunk_data) < length:
-                        break  # EOF inesperat
-                else:
-                    chunk_data = b''
-                
-                # Llegir CRC (4 bytes) - no el validem però l'hem de saltar
-                crc = f.read(4)
-                if len(crc) < 4:
-                    break
-                
-                # Processar chunks de text
-                if chunk_type == 'tEXt':
-                    # Format: keyword\0text
-                    try:
-                        null_pos = chunk_data.index(b'\x00')
-                        keyword = chunk_data[:null_pos].decode('latin-1')
-                        text = chunk_data[null_pos + 1:].decode('latin-1')
-                        metadata[keyword] = text
-                    except (ValueError, UnicodeDecodeError) as e:
-                        # Si hi ha error, ignorem aquest chunk
-                        pass
-                
-                elif chunk_type == 'iTXt':
-                    # Format: keyword\0compression_flag\0compression_method\0language\0translated_keyword\0text
-                    try:
-                        null_pos = chunk_data.index(b'\x00')
-                        keyword = chunk_data[:null_pos].decode('latin-1')
-                        rest = chunk_data[null_pos + 1:]
-                        
-                        # Saltem compression flag (1 byte) i compression method (1 byte)
-                        if len(rest) >= 2:
-                            compression_flag = rest[0]
-                            rest = rest[2:]
-                            
-                            # Saltem language tag (fins al següent \0)
-                            if b'\x00' in rest:
-                                null_pos = rest.index(b'\x00')
-                                rest = rest[null_pos + 1:]
-                                
-                                # Saltem translated keyword (fins al següent \0)
-                                if b'\x00' in rest:
-                                    null_pos = rest.index(b'\x00')
-                                    text_data = rest[null_pos + 1:]
-                                    
-                                    # Si està comprimit, no el processem (necessitaria zlib)
-                                    if compression_flag == 0:
-                                        text = text_data.decode('utf-8', errors='ignore')
-                                        metadata[keyword] = text
-                    except (ValueError, UnicodeDecodeError) as e:
-                        # Si hi ha error, ignorem aquest chunk
-                        pass
-                
-                # Si trobem IEND, hem acabat
-                elif chunk_type == 'IEND':
-                    break
+            for chunk_type, chunk_data in _iter_png_chunks(f, stop_at_idat=stop_at_idat):
+                item = _decode_text_chunk(chunk_type, chunk_data, errors='ignore')
+                if item is not None:
+                    metadata[item[0]] = item[1]
         
         return metadata
     
@@ -255,3 +359,47 @@ def get_png_dimensions(filename):
         return (None, None)
 
 
+
+def read_png_info(filename, stop_at_idat=False):
+    """
+    Llegeix en una sola passada les metadades de text i les dimensions
+    (chunk IHDR) d'un arxiu PNG, sense passar per PIL.
+    
+    Igual que read_png_metadata() salta els chunks que no són de text i
+    descomprimeix zTXt/iTXt. Si l'arxiu no és un PNG vàlid retorna None perquè
+    el cridador pugui recórrer a un lector complet (p.ex. PIL).
+    No imprimeix cap missatge.
+    
+    Args:
+        filename (str): Path a l'arxiu PNG
+        stop_at_idat (bool): Atura la lectura al primer chunk IDAT
+        
+    Returns:
+        tuple: (metadata, (width, height)) o None
+    """
+    metadata = {}
+    
+    try:
+        with open(filename, 'rb') as f:
+            if f.read(8) != _PNG_SIGNATURE:
+                return None
+            
+            # El primer chunk ha de ser IHDR: length (4) + type (4) + width (4) + height (4)
+            header = f.read(16)
+            if len(header) < 16 or header[4:8] != b'IHDR':
+                return None
+            ihdr_length = int.from_bytes(header[0:4], byteorder='big')
+            width = int.from_bytes(header[8:12], byteorder='big')
+            height = int.from_bytes(header[12:16], byteorder='big')
+            # Resta de l'IHDR + CRC
+            f.seek(ihdr_length - 8 + 4, os.SEEK_CUR)
+            
+            for chunk_type, chunk_data in _iter_png_chunks(f, stop_at_idat=stop_at_idat):
+                item = _decode_text_chunk(chunk_type, chunk_data)
+                if item is not None:
+                    metadata[item[0]] = item[1]
+        
+        return (metadata, (width, height))
+    
+    except Exception:
+        return None
@@ -6,6 +6,10 @@ p1_main.py : Script de proves per a Func 1, 2 i 3
 import cfg  # Necessari per obtenir el ROOT_DIR
 import time
 
+# Arrel de la col·lecció: --root PATH, variable DS_ROOT_DIR o cfg.ROOT_DIR
+cfg.configure_from_args()
+cfg.validate()
+
 # Importem TOTES les classes que necessitem
 from ImageFiles import ImageFiles
 from ImageID import ImageID
@@ -52,15 +56,17 @@ for path_relatiu in arxius_per_afegir:
     # Func 3: Afegim la imatge al registre de dades
     gestor_dades.add_image(uuid_nou, path_relatiu)
     
-    # Func 3: Carreguem les seves metadades des del disc
-    gestor_dades.load_metadata(uuid_nou)
-    
     comptador_exit += 1
     llista_uuids.append(uuid_nou)
 
+# Func 3: Carreguem les metadades des del disc en paral·lel
+#         (equivalent a cridar load_metadata() per a cada UUID)
+errors_lectura = gestor_dades.load_metadata_many(llista_uuids, executor="thread")
+
 print(f"\nProcés de càrrega completat.")
 print(f"  Imatges processades amb èxit: {comptador_exit}")
 print(f"  Errors de generació d'UUID: {comptador_error_id}")
+print(f"  Errors de lectura de metadades: {len(errors_lectura)}")
 
 # -----------------------------------------------------------------
 # PAS 2: Comprovem els mètodes __len__ i __str__
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+test-dedup.py : Script de proves de la detecció de duplicats (Duplicates)
+
+Crea una col·lecció temporal amb còpies exactes d'un PNG i un PNG que només
+es diferencia d'un altre en les metadades, i comprova find_duplicates()
+(amb idat_only i sense, amb memòria cau i sense), el Deduplicator
+incremental i ingest_stream(dedup=...).
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import cfg
+from PIL import Image, PngImagePlugin
+
+from Duplicates import Deduplicator, content_hash, find_duplicates
+from ImageData import ImageData
+from ImageFiles import ImageFiles
+from ImageID import ImageID
+from Ingest import ingest_stream
+from MetadataCache import MetadataCache
+
+
+def crear_png(path: str, llavor: int, prompt: str) -> None:
+    """PNG de soroll (no es comprimeix, així cada llavor té una mida diferent)."""
+    rnd = random.Random(llavor)
+    img = Image.new("L", (32 + llavor, 32))
+    img.putdata([rnd.randrange(256) for _ in range(img.width * img.height)])
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Prompt", prompt)
+    img.save(path, format="PNG", pnginfo=info)
+
+
+def grups(llista) -> set:
+    """Grups de paths (relatius a l'arrel) sense tenir en compte l'ordre."""
+    return {frozenset(os.path.relpath(p, arrel).replace(os.sep, "/") for p in g) for g in llista}
+
+
+errors = 0
+
+
+def comprovar(nom: str, ok: bool) -> None:
+    global errors
+    print(("  OK    " if ok else "  ERROR ") + nom)
+    if not ok:
+        errors += 1
+
+
+arrel = tempfile.mkdtemp(prefix="ds_dedup_")
+try:
+    os.makedirs(os.path.join(arrel, "a"))
+    os.makedirs(os.path.join(arrel, "b"))
+    crear_png(os.path.join(arrel, "a", "x.png"), 1, "castell")
+    shutil.copy(os.path.join(arrel, "a", "x.png"), os.path.join(arrel, "b", "x_copia.png"))
+    crear_png(os.path.join(arrel, "a", "y.png"), 2, "castell")
+    # mateixos píxels, metadades diferents
+    crear_png(os.path.join(arrel, "a", "z.png"), 3, "gat")
+    crear_png(os.path.join(arrel, "b", "z_meta.png"), 3, "gos")
+    cfg.configure(arrel, os.path.join(arrel, ".cache"))
+
+    exactes = {frozenset(("a/x.png", "b/x_copia.png"))}
+    pixels = exactes | {frozenset(("a/z.png", "b/z_meta.png"))}
+
+    print("[find_duplicates]")
+    fitxers = ImageFiles()
+    fitxers.reload_fs(arrel)
+    comprovar("contingut idèntic", grups(fitxers.duplicates()) == exactes)
+    comprovar("idat_only: també les que només canvien metadades",
+              grups(fitxers.duplicates(idat_only=True)) == pixels)
+    comprovar("un sol fil", grups(fitxers.duplicates(idat_only=True, workers=1)) == pixels)
+    with MetadataCache(os.path.join(arrel, ".cache")) as cache:
+        primer = grups(fitxers.duplicates(idat_only=True, cache=cache))
+        segon = grups(fitxers.duplicates(idat_only=True, cache=cache))
+        comprovar("amb memòria cau", primer == segon == pixels)
+    ordre = list(fitxers._stats)
+    comprovar("el primer de cada grup és el primer de l'escaneig",
+              all(g[0] == min(g, key=ordre.index) for g in fitxers.duplicates(idat_only=True)))
+    print("")
+
+    print("[Deduplicator]")
+    # mateixa mida i contingut diferent: el prefiltre no n'ha de fer duplicats
+    for nom, dades in (("p.bin", b"a" * 100), ("q.bin", b"b" * 100), ("r.bin", b"a" * 100)):
+        with open(os.path.join(arrel, nom), "wb") as fh:
+            fh.write(dades)
+    dedup = Deduplicator()
+    res = [dedup.check(os.path.join(arrel, n)) for n in ("p.bin", "q.bin", "r.bin")]
+    comprovar("mateixa mida, contingut diferent", res[:2] == [None, None])
+    comprovar("còpia detectada", res[2] == os.path.join(arrel, "p.bin"))
+    comprovar("collapsed", dedup.collapsed == {os.path.join(arrel, "p.bin"): [os.path.join(arrel, "r.bin")]}
+              and len(dedup) == 1)
+    comprovar("content_hash", content_hash(os.path.join(arrel, "p.bin")) != content_hash(os.path.join(arrel, "q.bin")))
+    for nom in ("p.bin", "q.bin", "r.bin"):
+        os.remove(os.path.join(arrel, nom))
+    print("")
+
+    for idat_only, esperats in ((False, exactes), (True, pixels)):
+        print(f"[ingest_stream, idat_only={idat_only}]")
+        ids, dades = ImageID(), ImageData()
+        dedup = Deduplicator(idat_only=idat_only)
+        uuids = list(ingest_stream(ImageFiles(), ids, dades, root=arrel, workers=3, batch=1, dedup=dedup))
+        comprovar("imatges registrades", len(uuids) == len(dades) == len(ids) == 5 - len(esperats))
+        comprovar("grups col·lapsats", grups(dedup.duplicates()) == esperats)
+        comprovar("els duplicats no tenen UUID",
+                  all(ids.get_uuid(d, exact=True) is None for g in dedup.duplicates() for d in g[1:]))
+        print("")
+finally:
+    shutil.rmtree(arrel, ignore_errors=True)
+
+
+print("Final! errors: {}".format(errors))
+sys.exit(1 if errors else 0)
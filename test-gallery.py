@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+test-gallery.py : Script de proves del format binari de galeries (".galb")
+
+Desa galeries en binari i les torna a carregar (comparant la seqüència i la
+capçalera), modifica una galeria mapejada i la desa sobre el mateix arxiu,
+i comprova que els arxius truncats o amb un magic incorrecte es rebutgen.
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import uuid as uuid_mod
+
+from Gallery import Gallery
+
+
+def carregar(path: str):
+    """Carrega `path` en una galeria nova; retorna (galeria, sortida per pantalla)."""
+    g = Gallery()
+    sortida = io.StringIO()
+    with contextlib.redirect_stdout(sortida):
+        g.load_file(path)
+    return g, sortida.getvalue()
+
+
+errors = 0
+
+
+def comprovar(nom: str, ok: bool) -> None:
+    global errors
+    print(("  OK    " if ok else "  ERROR ") + nom)
+    if not ok:
+        errors += 1
+
+
+uuids = [str(uuid_mod.UUID(int=i * 7919 + 1)) for i in range(5000)]
+tmp = tempfile.mkdtemp(prefix="ds_galb_")
+try:
+    arxiu = os.path.join(tmp, "galeria.galb")
+
+    # Desar -> carregar
+    print("[desar i carregar]")
+    g = Gallery()
+    g.images_uuid_list = uuids + uuids[:10]          # amb repetits
+    g.gallery_name, g.description, g.created_date = "Ciutats", "Nit de neó · ñ", "2025-09-30"
+    g.save_file(arxiu)
+    g2, sortida = carregar(arxiu)
+    comprovar("sense avisos", sortida == "")
+    comprovar("mateixa seqüència", list(g2) == uuids + uuids[:10])
+    comprovar("images_uuid_list", g2.images_uuid_list == tuple(uuids + uuids[:10]))
+    comprovar("capçalera", (g2.gallery_name, g2.description, g2.created_date)
+              == ("Ciutats", "Nit de neó · ñ", "2025-09-30"))
+    comprovar("index_of / contains", g2.index_of(uuids[1234]) == 1234 and uuids[9] in g2
+              and g2.index_of(str(uuid_mod.UUID(int=0))) == -1)
+    buida = os.path.join(tmp, "buida.galb")
+    Gallery().save_file(buida)
+    comprovar("galeria buida", len(carregar(buida)[0]) == 0)
+
+    # Modificar una galeria mapejada i desar-la sobre el mateix arxiu
+    print("[modificar i desar sobre el mateix arxiu]")
+    g3, _ = carregar(arxiu)
+    esperat = uuids + uuids[:10]
+    g3.remove_first_image()
+    g3.remove_last_image()
+    g3.insert_at(100, uuids[0])
+    g3.add_image_at_end(uuids[-1])
+    del esperat[0], esperat[-1]
+    esperat.insert(100, uuids[0])
+    esperat.append(uuids[-1])
+    comprovar("seqüència modificada", list(g3) == esperat)
+    g3.save_file(arxiu)
+    g4, sortida = carregar(arxiu)
+    comprovar("es torna a carregar", sortida == "" and list(g4) == esperat)
+
+    # Sense modificar-la: la vista es desenganxa de l'arxiu abans de substituir-lo
+    g4.gallery_name = "Reanomenada"
+    g4.save_file(arxiu)
+    comprovar("desada sobre si mateixa", list(g4) == esperat)
+    g5, _ = carregar(arxiu)
+    comprovar("nom nou i mateixa seqüència", g5.gallery_name == "Reanomenada" and list(g5) == esperat)
+    g5.close()
+    comprovar("close() conserva el contingut", list(g5) == esperat)
+
+    # Arxius invàlids
+    print("[arxius invàlids]")
+    with open(arxiu, "rb") as fh:
+        dades = fh.read()
+    for nom, contingut in (("truncat (UUID)", dades[:-5]),
+                           ("truncat (capçalera)", dades[:12]),
+                           ("magic incorrecte", b"XSGALB01" + dades[8:])):
+        dolent = os.path.join(tmp, "dolent.galb")
+        with open(dolent, "wb") as fh:
+            fh.write(contingut)
+        g6, _ = carregar(arxiu)
+        g6.close()
+        with contextlib.redirect_stdout(io.StringIO()) as sortida:
+            g6.load_file(dolent)
+        comprovar(nom, "WARNING (Gallery)" in sortida.getvalue() and len(g6) == 0 and list(g6) == [])
+finally:
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+print("Final! errors: {}".format(errors))
+sys.exit(1 if errors else 0)
@@ -5,6 +5,8 @@ test-images.py : Script de proves per visualitzar imatges generades amb IA
 
 import cfg      # Necessari per a la pràctica !!
                 # Mireu el contingut de l'arxiu
+cfg.configure_from_args()
+cfg.validate()
 
 import os.path
 import sys
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+test-phash.py : Script de proves del hash perceptual (PerceptualHash)
+
+Crea una col·lecció temporal, en calcula els dHash, reescriu una imatge amb
+un contingut diferent i comprova que en tornar-ne a carregar les metadades
+(load_metadata i load_metadata_many, amb memòria cau i sense) el hash i el
+PerceptualIndex reflecteixen l'arxiu nou.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cfg
+from PIL import Image, PngImagePlugin
+
+from ImageData import ImageData
+from MetadataCache import MetadataCache
+from PerceptualHash import PerceptualIndex
+
+
+def crear_png(path: str, invertit: bool) -> None:
+    """Degradat horitzontal (d'esquerra a dreta o al revés)."""
+    img = Image.new("L", (64, 32))
+    img.putdata([(255 - x * 4) if invertit else x * 4 for _ in range(32) for x in range(64)])
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Prompt", "degradat invertit" if invertit else "degradat")
+    tmp = path + ".tmp"
+    img.save(tmp, format="PNG", pnginfo=info)
+    os.replace(tmp, path)
+
+
+errors = 0
+
+
+def comprovar(nom: str, ok: bool) -> None:
+    global errors
+    print(("  OK    " if ok else "  ERROR ") + nom)
+    if not ok:
+        errors += 1
+
+
+for amb_cache in (False, True):
+    for carrega in ("load_metadata", "load_metadata_many"):
+        arrel = tempfile.mkdtemp(prefix="ds_phash_")
+        cache = None
+        try:
+            cfg.configure(arrel)
+            a = os.path.join(arrel, "a.png")
+            b = os.path.join(arrel, "b.png")
+            crear_png(a, False)
+            crear_png(b, False)
+            cache = MetadataCache(os.path.join(arrel, "cache")) if amb_cache else None
+            dades = ImageData(cache=cache) if amb_cache else ImageData()
+            dades.add_image("a", a)
+            dades.add_image("b", b)
+            dades.load_metadata_many(["a", "b"])
+            dades.load_phash_many(["a", "b"])
+            index = PerceptualIndex(dades)
+            abans = dades.get_phash("b")
+
+            print(f"[cache={amb_cache}, {carrega}]")
+            comprovar("hashos calculats", abans is not None and dades.get_phash("a") == abans)
+            comprovar("quasi-duplicats", index.within("a", 0) == [("b", 0)])
+
+            # mtime diferent per als sistemes amb poca resolució
+            time.sleep(0.05)
+            crear_png(b, True)
+            if carrega == "load_metadata":
+                dades.load_metadata("b")
+            else:
+                dades.load_metadata_many(["a", "b"])
+            despres = dades.get_phash("b")
+            comprovar("metadades noves", dades.get_prompt("b") == "degradat invertit")
+            comprovar("hash recalculat", despres is not None and despres != abans)
+            comprovar("índex actualitzat", index.within("a", 0) == [] and index.within(despres, 0) == [("b", 0)])
+            print("")
+        finally:
+            if cache is not None:
+                cache.close()
+            shutil.rmtree(arrel, ignore_errors=True)
+
+
+print("Final! errors: {}".format(errors))
+sys.exit(1 if errors else 0)
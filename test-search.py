@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+test-search.py : Script de proves de les cerques per rang i de l'ordenació
+
+Crea una col·lecció temporal amb valors extrems (seeds de 64 bits, un CFG
+Scale "nan") i comprova que SearchMetadata els troba i els ordena bé, amb
+índexs i sense.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import cfg
+from PIL import Image, PngImagePlugin
+
+from ImageData import ImageData
+from SearchMetadata import SearchMetadata
+
+
+def crear_png(path: str, seed: str, cfg_scale: str) -> None:
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Prompt", "castell")
+    info.add_text("Seed", seed)
+    info.add_text("CFG_Scale", cfg_scale)
+    Image.new("RGB", (16, 8)).save(path, format="PNG", pnginfo=info)
+
+
+errors = 0
+
+
+def comprovar(nom: str, ok: bool) -> None:
+    global errors
+    print(("  OK    " if ok else "  ERROR ") + nom)
+    if not ok:
+        errors += 1
+
+
+# seed -> CFG Scale de cada imatge (en ordre d'alta)
+IMATGES = [
+    ("18446744073709551615", "7.5"),    # 2**64 - 1
+    ("9007199254740993", "nan"),        # 2**53 + 1: no es pot representar en float
+    ("9007199254740992", "12"),         # 2**53
+    ("42", "3.0"),
+    ("1e3", "inf"),
+]
+
+arrel = tempfile.mkdtemp(prefix="ds_search_")
+try:
+    cfg.configure(arrel)
+    dades = ImageData()
+    uuids = []
+    for i, (seed, escala) in enumerate(IMATGES):
+        path = os.path.join(arrel, "img_%d.png" % i)
+        crear_png(path, seed, escala)
+        uuid = "%032x" % i
+        dades.add_image(uuid, path)
+        uuids.append(uuid)
+    dades.load_metadata_many(uuids)
+
+    for use_index in (False, True):
+        print(f"[use_index={use_index}]")
+        cerca = SearchMetadata(dades, use_index=use_index)
+        comprovar("seed_range 2**64 - 1",
+                  cerca.seed_range(18446744073709551615, 18446744073709551615) == [uuids[0]])
+        comprovar("seed_range 2**53 + 1",
+                  cerca.seed_range(9007199254740993, 9007199254740993) == [uuids[1]])
+        comprovar("seed_range 2**53",
+                  cerca.seed_range(9007199254740992, 9007199254740992) == [uuids[2]])
+        comprovar("seed amb exponent", cerca.seed_range(1000, 1000) == [uuids[4]])
+        comprovar("order_by seed",
+                  cerca.prompt("castell", order_by="seed") == [uuids[i] for i in (3, 4, 2, 1, 0)])
+        comprovar("order_by -seed",
+                  cerca.prompt("castell", order_by="-seed") == [uuids[i] for i in (0, 1, 2, 4, 3)])
+        comprovar("cfg_scale_range sense NaN", cerca.cfg_scale_range(None, None) == [uuids[i] for i in (0, 2, 3, 4)])
+        comprovar("cfg_scale_range 5..20", cerca.cfg_scale_range(5, 20) == [uuids[0], uuids[2]])
+        ordre = cerca.prompt("castell", order_by="cfg_scale")
+        comprovar("order_by cfg_scale amb NaN", ordre[:4] == [uuids[i] for i in (3, 0, 2, 4)]
+                  and sorted(ordre) == sorted(uuids))
+        print("")
+finally:
+    shutil.rmtree(arrel, ignore_errors=True)
+
+
+print("Final! errors: {}".format(errors))
+sys.exit(1 if errors else 0)
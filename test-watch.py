@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+test-watch.py : Script de proves del mode watch (ImageWatcher)
+
+Crea una col·lecció temporal, hi fa altes, modificacions i baixes de PNG i
+comprova que ImageID i ImageData s'actualitzen sols, amb cada backend
+disponible (inotify i poll).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import Image, PngImagePlugin
+
+from ImageFiles import ImageFiles
+from ImageID import ImageID
+from ImageData import ImageData
+from ImageWatcher import ImageWatcher
+
+
+def crear_png(path: str, prompt: str) -> None:
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Prompt", prompt)
+    info.add_text("Model", "SD2")
+    tmp = path + ".tmp"
+    Image.new("RGB", (16, 8)).save(tmp, format="PNG", pnginfo=info)
+    os.replace(tmp, path)
+
+
+def esperar(condicio, timeout: float = 5.0) -> bool:
+    limit = time.monotonic() + timeout
+    while time.monotonic() < limit:
+        if condicio():
+            return True
+        time.sleep(0.05)
+    return condicio()
+
+
+def prompt_de(ids, dades, path):
+    uuid = ids.get_uuid(path, exact=True)
+    return dades.get_prompt(uuid) if uuid else None
+
+
+errors = 0
+
+
+def comprovar(nom: str, ok: bool) -> None:
+    global errors
+    print(("  OK    " if ok else "  ERROR ") + nom)
+    if not ok:
+        errors += 1
+
+
+for backend in ("inotify", "poll"):
+    arrel = tempfile.mkdtemp(prefix="ds_watch_")
+    try:
+        crear_png(os.path.join(arrel, "inicial.png"), "imatge inicial")
+
+        gestor_arxius = ImageFiles()
+        gestor_id = ImageID()
+        gestor_dades = ImageData()
+        lots = []
+        try:
+            watcher = ImageWatcher(gestor_arxius, gestor_id, gestor_dades, root=arrel,
+                                   backend=backend, interval=0.1, debounce=0.1,
+                                   on_batch=lots.append)
+        except OSError as e:
+            print(f"[{backend}] no disponible: {e}\n")
+            continue
+
+        print(f"[{backend}] {watcher}")
+        with watcher:
+            comprovar("sincronització inicial",
+                      prompt_de(gestor_id, gestor_dades, os.path.join(arrel, "inicial.png")) == "imatge inicial")
+
+            # Alta en un subdirectori nou
+            sub = os.path.join(arrel, "sub")
+            os.makedirs(sub)
+            nou = os.path.join(sub, "nou.png")
+            crear_png(nou, "gat en un castell")
+            comprovar("alta", esperar(lambda: prompt_de(gestor_id, gestor_dades, nou) == "gat en un castell"))
+
+            # Modificació (mtime diferent per als sistemes amb poca resolució)
+            time.sleep(0.05)
+            crear_png(nou, "gos en un castell")
+            comprovar("modificació", esperar(lambda: prompt_de(gestor_id, gestor_dades, nou) == "gos en un castell"))
+
+            # Baixa
+            os.remove(os.path.join(arrel, "inicial.png"))
+            comprovar("baixa", esperar(lambda: gestor_id.get_uuid(os.path.join(arrel, "inicial.png"), exact=True) is None
+                                       and len(gestor_dades) == 1))
+
+            # Directori mogut fora de la col·lecció: baixa, i el que s'hi
+            # escrigui després ja no es veu (ni amb el path antic)
+            mogut = os.path.join(arrel, "mogut")
+            os.makedirs(os.path.join(mogut, "dins"))
+            crear_png(os.path.join(mogut, "dins", "m.png"), "imatge moguda")
+            comprovar("alta en subdirectori", esperar(lambda: len(gestor_dades) == 2))
+            fora = tempfile.mkdtemp(prefix="ds_watch_fora_")
+            try:
+                os.rename(mogut, os.path.join(fora, "mogut"))
+                comprovar("directori mogut fora", esperar(lambda: len(gestor_dades) == 1 and len(gestor_id) == 1))
+                crear_png(os.path.join(fora, "mogut", "dins", "fantasma.png"), "fora de la col·lecció")
+                time.sleep(0.5)
+                comprovar("sense altes del directori mogut", len(gestor_dades) == 1)
+                if watcher._inotify is not None:
+                    comprovar("watches del directori mogut retirats",
+                              not any(p.startswith(mogut) for p in watcher._inotify._wds.values()))
+            finally:
+                shutil.rmtree(fora, ignore_errors=True)
+
+            # Baixa d'un directori sencer
+            shutil.rmtree(sub)
+            comprovar("baixa de directori", esperar(lambda: len(gestor_dades) == 0 and len(gestor_id) == 0))
+
+        comprovar("lots notificats", len(lots) >= 4)
+        print("")
+    finally:
+        shutil.rmtree(arrel, ignore_errors=True)
+
+
+print("Final! errors: {}".format(errors))
+sys.exit(1 if errors else 0)